@@ -1,27 +1,33 @@
 # app.py - Main Flask Application for FiSi-Quiz-Cyberpunk
 
-import logging
 import os
+
+# Green-thread modes need the standard library patched before anything else is
+# imported; Gunicorn's eventlet and gevent workers do this themselves
+if __name__ == '__main__':
+    if os.environ.get('SOCKETIO_ASYNC_MODE') == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif os.environ.get('SOCKETIO_ASYNC_MODE') == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+
+import logging
 from datetime import timedelta
 
-from flask import Flask, render_template, session
+import click
+from flask import Flask, render_template, request, session
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_socketio import SocketIO
 
 # Import configuration
 from config import get_config
+# Shared extension instances (models and socket handlers bind to these)
+from extensions import db, migrate, socketio
 # Import models
 import models
 
-# Initialize extensions
-db = SQLAlchemy()
-migrate = Migrate()
-socketio = SocketIO()
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +37,8 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+ASYNC_MODES = ('threading', 'eventlet', 'gevent', 'asgi')
+
 def create_app(config_name=None):
     """Create and configure the Flask application."""
     app = Flask(__name__)
@@ -39,10 +47,53 @@ def create_app(config_name=None):
     config = get_config(config_name)
     app.config.from_object(config)
     
+    check_worker_setup(config)
+    check_metrics_setup(config)
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
-    socketio.init_app(app, cors_allowed_origins="*", async_mode='threading')
+    socketio.init_app(app, cors_allowed_origins="*", **socketio_server_options(config))
+    
+    # Room phase deadlines (question timers, reveal delays)
+    from utils.room_scheduler import scheduler
+    scheduler.init_app(app)
+    
+    # Answer registration, scores and phase claims shared by all workers
+    from utils.room_store import room_store
+    room_store.init_app(app)
+    
+    # Room ownership and event routing when several workers run
+    from utils.sharding import shard_router
+    shard_router.init_app(app)
+    
+    # Write-behind buffer for user statistics
+    from utils.user_stats import user_stats
+    user_stats.init_app(app)
+    
+    # Fuzzy matching algorithm for text answers
+    from utils.text_matcher import text_matcher
+    text_matcher.init_app(app)
+    
+    # Latency and error metrics of socket events and routes
+    from utils.metrics import metrics
+    metrics.init_app(app)
+    
+    # SQL statements per route and socket event, N+1 suspects and query budgets
+    from utils.query_profiler import query_profiler
+    query_profiler.init_app(app)
+    
+    # Global leaderboard index, rolled up in ranglisten_eintrag
+    from utils.leaderboard import leaderboard
+    leaderboard.init_app(app)
+    
+    # Daily, weekly, monthly and per-Lernfeld leaderboards, old buckets expire
+    from utils.period_leaderboard import period_leaderboard
+    period_leaderboard.init_app(app)
+    
+    # Admin dashboard counters kept by model hooks
+    from utils.admin_stats import admin_stats
+    admin_stats.init_app(app)
     
     # Setup CORS
     cors_origins = config.CORS_ORIGINS
@@ -73,18 +124,47 @@ def create_app(config_name=None):
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(profile_bp, url_prefix='/profile')
     
+    # Prometheus scrapes more often than the default limit allows, only
+    # scrapes with the token are let through
+    if config.RATELIMIT_ENABLED and config.METRICS_TOKEN:
+        from views.main_routes import metrics_authorized
+        
+        @limiter.request_filter
+        def authorized_scrape():
+            return request.endpoint == 'main.metrics_endpoint' and metrics_authorized()
+    
     # Import SocketIO event handlers
     import socketio_events
     
+    # One-shot data migrations, run once per deploy instead of in every worker
+    @app.cli.command('migrate-answers')
+    def migrate_answers():
+        """Move legacy answers_data JSON of participations into spiel_antwort rows"""
+        from utils.schema import migrate_answers_data
+        moved = migrate_answers_data()
+        click.echo(f"{moved} answers migrated")
+    
     # Create database tables and initialize data
     with app.app_context():
         db.create_all()
         logger.info("Database tables created")
         
+        # Bring tables of older databases up to date
+        from utils.schema import upgrade_schema
+        upgrade_schema()
+        
         # Initialize default data
         from utils.init_data import initialize_default_data
         initialize_default_data()
         logger.info("Default data initialized")
+        
+        # Build the leaderboard index before the first request needs it
+        leaderboard.load()
+        
+        # Resume games interrupted by a restart, sharded workers adopt their rooms instead
+        if not config.SHARDING_ENABLED:
+            from utils.game_room import restore_running_rooms
+            restore_running_rooms()
     
     # Configure session
     app.permanent_session_lifetime = timedelta(seconds=config.PERMANENT_SESSION_LIFETIME)
@@ -95,11 +175,81 @@ def create_app(config_name=None):
         """Inject global variables into templates"""
         return {
             'current_lang': session.get('lang', 'de'),
-            'app_name': 'FiSi-Quiz Cyberpunk'
+            'app_name': 'FiSi-Quiz Cyberpunk',
+            'socketio_transports': config.SOCKETIO_TRANSPORTS
         }
     
     return app
 
+def check_metrics_setup(config):
+    """Refuse an unauthenticated /metrics outside development"""
+    if config.METRICS_ENABLED and not config.METRICS_TOKEN and not (getattr(config, 'DEBUG', False) or getattr(config, 'TESTING', False)):
+        raise RuntimeError("METRICS_ENABLED=True needs a METRICS_TOKEN outside development, /metrics would be public")
+
+def check_worker_setup(config):
+    """Refuse several workers that would each run their own copy of a room
+    
+    Without sharding, any worker receiving an event for a running room
+    restores it from the database and scores, advances and finalizes it
+    independently. More than one worker therefore needs a message queue,
+    room sharding and a room store all workers share. Separately started
+    instances cannot be detected here, the same applies to them.
+    """
+    if config.WEB_CONCURRENCY <= 1:
+        return
+    problems = []
+    if not config.SOCKETIO_MESSAGE_QUEUE:
+        problems.append("SOCKETIO_MESSAGE_QUEUE")
+    if not config.SHARDING_ENABLED:
+        problems.append("SHARDING_ENABLED=True")
+    elif config.SOCKETIO_ASYNC_MODE == 'asgi':
+        problems.append("a SOCKETIO_ASYNC_MODE other than asgi (no room sharding there)")
+    if config.ROOM_STORE_URL.startswith('memory://'):
+        problems.append("a shared ROOM_STORE_URL (sqlite:///... or redis://...)")
+    if problems:
+        raise RuntimeError(
+            f"WEB_CONCURRENCY={config.WEB_CONCURRENCY} needs {' and '.join(problems)}, "
+            f"otherwise every worker runs its own copy of a game room"
+        )
+
+def socketio_server_options(config):
+    """SocketIO options for the configured async mode and message queue"""
+    mode = config.SOCKETIO_ASYNC_MODE
+    if mode not in ASYNC_MODES:
+        raise ValueError(f"Unsupported SOCKETIO_ASYNC_MODE: {mode} (choose from {', '.join(ASYNC_MODES)})")
+    
+    # asgi.py replaces the server and owns the message queue, handlers run in threads
+    if mode == 'asgi':
+        return {'async_mode': 'threading', 'transports': config.SOCKETIO_TRANSPORTS}
+    
+    if mode in ('eventlet', 'gevent') and not is_monkey_patched(mode):
+        logger.warning(f"SOCKETIO_ASYNC_MODE={mode} without monkey patching, blocking calls stall the server")
+    
+    options = {'async_mode': mode, 'transports': config.SOCKETIO_TRANSPORTS}
+    
+    queue_url = config.SOCKETIO_MESSAGE_QUEUE
+    if not queue_url:
+        # A single worker, check_worker_setup() refuses more without a queue
+        return options
+    
+    from utils.message_queue import create_client_manager
+    manager = create_client_manager(queue_url, config.SOCKETIO_CHANNEL, routing=config.SHARDING_ENABLED)
+    if manager:
+        options['client_manager'] = manager
+    else:
+        options['message_queue'] = queue_url
+        options['channel'] = config.SOCKETIO_CHANNEL
+    logger.info(f"SocketIO message queue: {queue_url.split('://')[0]}")
+    return options
+
+def is_monkey_patched(mode):
+    """True if the green-thread library of mode patched the socket module"""
+    if mode == 'eventlet':
+        import eventlet.patcher
+        return eventlet.patcher.is_monkey_patched('socket')
+    from gevent import monkey
+    return monkey.is_module_patched('socket')
+
 def display_startup_info(config):
     """Display startup information"""
     print("\n" + "="*70)
@@ -107,6 +257,7 @@ def display_startup_info(config):
     print("="*70)
     print(f"🌐 Server: http://{config.FLASK_HOST}:{config.FLASK_PORT}")
     print(f"🎮 Mode: {'Development' if config.FLASK_DEBUG else 'Production'}")
+    print(f"⚡ Async Mode: {config.SOCKETIO_ASYNC_MODE}")
     print(f"🗄️  Database: {config.SQLALCHEMY_DATABASE_URI.split('://')[0]}")
     print(f"🔒 Security: {'Enhanced' if not config.FLASK_DEBUG else 'Development'}")
     print(f"🌍 CORS: {'All origins' if config.CORS_ORIGINS == '*' else 'Restricted'}")
@@ -139,6 +290,10 @@ if __name__ == '__main__':
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    if config.SOCKETIO_ASYNC_MODE == 'asgi':
+        print("⚠️  SOCKETIO_ASYNC_MODE=asgi runs on an ASGI server: uvicorn asgi:application")
+        sys.exit(1)
+    
     # Run development server
     try:
         logger.info("Starting SocketIO server...")
@@ -0,0 +1,253 @@
+# asgi.py - ASGI entry point: the game's SocketIO handlers on python-socketio's AsyncServer
+#
+# Run with any ASGI server, e.g.: uvicorn asgi:application --host 0.0.0.0 --port 5000
+#
+# Socket.IO connections live on the asyncio event loop of socketio.AsyncServer.
+# The handlers of socketio_events.py run unchanged in a thread pool: every call
+# gets a Flask request context carrying the connection's sid and session, and
+# their emits and room changes are passed back to the loop. HTTP routes are
+# the regular Flask app, also run in the pool.
+
+import os
+
+os.environ['SOCKETIO_ASYNC_MODE'] = 'asgi'
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import io
+import logging
+import sys
+import threading
+import time
+
+from flask import request, session
+import socketio
+
+from app import create_app
+from extensions import socketio as flask_socketio
+
+logger = logging.getLogger(__name__)
+
+class AsyncServerBridge:
+    """Synchronous stand-in for Flask-SocketIO's server, forwarding to an AsyncServer
+
+    Flask-SocketIO's emit, join_room, leave_room, start_background_task and
+    sleep call these methods from handler and scheduler threads.
+    """
+
+    def __init__(self, sio):
+        self.sio = sio
+        # Set by LoopCapture when the ASGI server first calls the app
+        self.loop = None
+
+    def _call(self, coro):
+        """Run a coroutine on the event loop and wait for it"""
+        if self.loop is None:
+            # The server is not running yet, so no client is connected either
+            coro.close()
+            return None
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def emit(self, event, data=None, to=None, room=None, skip_sid=None, namespace=None, callback=None, **kwargs):
+        self._call(self.sio.emit(event, data, to=to or room, skip_sid=skip_sid, namespace=namespace))
+
+    def send(self, data, to=None, room=None, skip_sid=None, namespace=None, callback=None, **kwargs):
+        self.emit('message', data, to=to, room=room, skip_sid=skip_sid, namespace=namespace)
+
+    def enter_room(self, sid, room, namespace=None):
+        self._call(self.sio.enter_room(sid, room, namespace=namespace))
+
+    def leave_room(self, sid, room, namespace=None):
+        self._call(self.sio.leave_room(sid, room, namespace=namespace))
+
+    def close_room(self, room, namespace=None):
+        self._call(self.sio.close_room(room, namespace=namespace))
+
+    def rooms(self, sid, namespace=None):
+        return self.sio.rooms(sid, namespace=namespace)
+
+    def start_background_task(self, target, *args, **kwargs):
+        # Background loops such as the room scheduler block, they get real threads
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+    def sleep(self, seconds=0):
+        time.sleep(seconds)
+
+class HandlerRunner:
+    """Run the Flask-SocketIO handlers of socketio_events.py for AsyncServer events"""
+
+    def __init__(self, app, sio, bridge, executor):
+        self.app = app
+        self.sio = sio
+        self.bridge = bridge
+        self.executor = executor
+        # sid -> Flask session loaded from the cookie at connect
+        self.sessions = {}
+
+    def register(self, handlers):
+        """Register {event: handler} of the default namespace on the AsyncServer"""
+        for event, handler in handlers.items():
+            if event == 'connect':
+                self.sio.on('connect', partial(self.on_connect, handler))
+            elif event == 'disconnect':
+                self.sio.on('disconnect', partial(self.on_disconnect, handler))
+            else:
+                self.sio.on(event, partial(self.on_event, handler))
+
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args))
+
+    async def on_connect(self, handler, sid, environ, auth=None):
+        self.sessions[sid] = await self.run(self.load_session, environ)
+        await self.run(self.dispatch, handler, sid)
+
+    async def on_disconnect(self, handler, sid):
+        await self.run(self.dispatch, handler, sid)
+        self.sessions.pop(sid, None)
+
+    async def on_event(self, handler, sid, *args):
+        return await self.run(self.dispatch, handler, sid, *args)
+
+    def load_session(self, environ):
+        """Flask session of the connecting browser, read from its cookie"""
+        with self.app.test_request_context('/socket.io/', headers={'Cookie': environ.get('HTTP_COOKIE', '')}):
+            return dict(session)
+
+    def dispatch(self, handler, sid, *args):
+        """Call a handler as Flask-SocketIO would: request context with sid, namespace and session"""
+        with self.app.test_request_context('/socket.io/'):
+            request.sid = sid
+            request.namespace = '/'
+            session.update(self.sessions.get(sid, {}))
+            return handler(*args)
+
+class WSGIAdapter:
+    """Minimal ASGI wrapper running a WSGI app in a thread pool, HTTP requests only"""
+
+    def __init__(self, wsgi_app, executor):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+
+        body = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+
+        environ = self.build_environ(scope, b''.join(body))
+        status, headers, chunks = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.call_app, environ
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        })
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+
+    def build_environ(self, scope, body):
+        server_name, server_port = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server_name,
+            'SERVER_PORT': str(server_port),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f"HTTP_{name}"
+            if name in environ:
+                value = f"{environ[name]}{'; ' if name == 'HTTP_COOKIE' else ','}{value}"
+            environ[name] = value
+        return environ
+
+    def call_app(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = headers
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            chunks = list(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], chunks
+
+class LoopCapture:
+    """ASGI wrapper handing the server's event loop to the bridge on the first call
+
+    ASGI servers call the app first for lifespan startup, before any
+    connection, so timers and background emits find the loop set.
+    """
+
+    def __init__(self, asgi_app, bridge):
+        self.asgi_app = asgi_app
+        self.bridge = bridge
+
+    async def __call__(self, scope, receive, send):
+        if self.bridge.loop is None:
+            self.bridge.loop = asyncio.get_running_loop()
+        await self.asgi_app(scope, receive, send)
+
+def async_client_manager(url, channel):
+    """AsyncServer message queue for redis:// or amqp:// URLs, None otherwise"""
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.AsyncRedisManager(url, channel=channel)
+    if url.startswith('amqp://'):
+        return socketio.AsyncAioPikaManager(url, channel=channel)
+    logger.warning(f"SOCKETIO_MESSAGE_QUEUE {url.split('://')[0]}:// is not supported with asgi, broadcasts stay within one worker")
+    return None
+
+def create_asgi_app(config_name=None):
+    """Flask app and game handlers served by a python-socketio AsyncServer"""
+    app = create_app(config_name)
+    config = app.config
+    executor = ThreadPoolExecutor(max_workers=config['ASGI_THREADS'], thread_name_prefix='asgi')
+
+    options = {}
+    if config['SOCKETIO_MESSAGE_QUEUE']:
+        manager = async_client_manager(config['SOCKETIO_MESSAGE_QUEUE'], config['SOCKETIO_CHANNEL'])
+        if manager:
+            options['client_manager'] = manager
+    sio = socketio.AsyncServer(
+        async_mode='asgi', cors_allowed_origins='*',
+        transports=config['SOCKETIO_TRANSPORTS'], **options
+    )
+
+    # Same handlers as under Flask-SocketIO, then route their emits to the AsyncServer
+    handlers = {
+        event: getattr(handler, '__wrapped__', handler)
+        for event, handler in flask_socketio.server.handlers.get('/', {}).items()
+    }
+    bridge = AsyncServerBridge(sio)
+    HandlerRunner(app, sio, bridge, executor).register(handlers)
+    flask_socketio.server = bridge
+    logger.info(f"ASGI app with {len(handlers)} SocketIO handlers")
+
+    return LoopCapture(socketio.ASGIApp(sio, other_asgi_app=WSGIAdapter(app, executor)), bridge)
+
+application = create_asgi_app()
@@ -0,0 +1,171 @@
+# benchmarks/bench_async_modes.py - Compare SocketIO async modes under the same game traffic
+#
+# Usage: python benchmarks/bench_async_modes.py [--clients 100] [--modes threading,eventlet,gevent,asgi]
+#
+# For every mode one server process is started on a fresh SQLite file:
+#   threading, eventlet, gevent  python app server via socketio.run() with SOCKETIO_ASYNC_MODE
+#   asgi                         asgi.py on uvicorn (python-socketio AsyncServer)
+# Modes whose packages are missing are skipped. Then --clients guests log
+# in and connect, and all of them join one room: every join is broadcast
+# to the players already in the room, n * (n + 1) / 2 player_joined
+# deliveries in total. Reported per mode:
+#   connected   clients whose Socket.IO connect succeeded, and how long it took
+#   msgs/s      player_joined deliveries per second during the join storm
+#   KB/conn     growth of the server's resident memory per connected client
+# Clients use long-polling (benchmarks/sio_client.py), the same for every mode.
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.cross_worker_broadcast import start_worker
+from benchmarks.sio_client import SocketIOClient
+
+MODES = ('threading', 'eventlet', 'gevent', 'asgi')
+# Package each mode needs besides the base requirements
+MODE_PACKAGES = {'eventlet': 'eventlet', 'gevent': 'gevent', 'asgi': 'uvicorn'}
+
+def serve(port):
+    """Server process, the mode comes from SOCKETIO_ASYNC_MODE"""
+    mode = os.environ['SOCKETIO_ASYNC_MODE']
+    if mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    os.chdir(ROOT)
+
+    if mode == 'asgi':
+        import uvicorn
+        uvicorn.run('asgi:application', host='127.0.0.1', port=port, log_level='warning')
+        return
+
+    from app import create_app
+    from extensions import socketio
+    app = create_app('development')
+    socketio.run(app, host='127.0.0.1', port=port, debug=False, use_reloader=False,
+                 log_output=False, allow_unsafe_werkzeug=True)
+
+def rss_kb(pid):
+    """Resident memory of a process in KB (Linux)"""
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+def connect_client(base_url, n):
+    client = SocketIOClient(base_url)
+    client.guest_login(f"bench{n}")
+    client.connect()
+    return client
+
+def run_mode(mode, args):
+    port = args.port
+    workdir = tempfile.mkdtemp(prefix='fisi-modes-')
+    env = dict(os.environ,
+               SOCKETIO_ASYNC_MODE=mode,
+               DATABASE_URL=f"sqlite:///{workdir}/quiz_app.db",
+               RATELIMIT_ENABLED='False')
+    server = start_worker(port, env, __file__)
+    base_url = f"http://127.0.0.1:{port}"
+    clients = []
+    try:
+        rss_before = rss_kb(server.pid)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.connect_threads) as pool:
+            futures = [pool.submit(connect_client, base_url, n) for n in range(args.clients)]
+            for future in futures:
+                try:
+                    clients.append(future.result())
+                except Exception:
+                    pass
+        connect_sek = time.perf_counter() - start
+        time.sleep(1)
+        rss_after = rss_kb(server.pid)
+
+        # Join storm: every join is broadcast to all players already in the room
+        delivered = [0]
+        lock = threading.Lock()
+        expected = len(clients) * (len(clients) + 1) // 2
+        done = threading.Event()
+
+        def on_event(name, data, received_at):
+            if name == 'player_joined':
+                with lock:
+                    delivered[0] += 1
+                    if delivered[0] >= expected:
+                        done.set()
+
+        lernfeld_id, schwierigkeit = first_group(workdir)
+        room_code = clients[0].create_game(lernfeld_id, schwierigkeit)
+        for client in clients:
+            client.on_event = on_event
+        start = time.perf_counter()
+        for client in clients:
+            client.emit('join_game', {'room_code': room_code})
+        done.wait(args.timeout)
+        storm_sek = time.perf_counter() - start
+
+        return {
+            'connected': len(clients),
+            'connect_sek': connect_sek,
+            'delivered': delivered[0],
+            'expected': expected,
+            'msgs_per_sek': delivered[0] / storm_sek,
+            'kb_per_conn': (rss_after - rss_before) / max(len(clients), 1)
+        }
+    finally:
+        for client in clients:
+            client.close()
+        server.terminate()
+        server.wait()
+
+def first_group(workdir):
+    """Lernfeld and difficulty of a seeded question, read from the mode's database"""
+    import sqlite3
+    conn = sqlite3.connect(f"{workdir}/quiz_app.db")
+    try:
+        return conn.execute("SELECT lernfeld_id, schwierigkeit FROM frage LIMIT 1").fetchone()
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare SocketIO async modes')
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--port', type=int, default=5160)
+    parser.add_argument('--connect-threads', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    print(f"{args.clients} clients, long-polling")
+    print(f"{'mode':<10} {'connected':>10} {'connect s':>10} {'delivered':>12} {'msgs/s':>9} {'KB/conn':>8}")
+    for mode in args.modes.split(','):
+        package = MODE_PACKAGES.get(mode)
+        if package and importlib.util.find_spec(package) is None:
+            print(f"{mode:<10} skipped, {package} is not installed")
+            continue
+        result = run_mode(mode, args)
+        print(f"{mode:<10} {result['connected']:>10} {result['connect_sek']:>10.2f} "
+              f"{result['delivered']:>5}/{result['expected']:<6} {result['msgs_per_sek']:>9.0f} "
+              f"{result['kb_per_conn']:>8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_batch_grader.py - Grade one room's TEXT answers at question close
+#
+# Usage: python benchmarks/bench_batch_grader.py [--players 500] [--rounds 50]
+#
+# Compares grading a full room of buffered answers with grade_batch()
+# against grading them one by one with grade_answer(), and checks that
+# both produce the same decisions. Needs NumPy for the vectorized path.
+
+from pathlib import Path
+import argparse
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import Fragetyp
+from utils.answer_keys import AnswerKey, grade_answer
+from utils.batch_grader import grade_batch, np
+from utils.text_matcher import MODES, text_matcher
+
+KEYWORDS = [
+    ('Dynamic Host Configuration Protocol', 0.85),
+    ('DHCP', 0.9),
+    ('DHCP-Server', 0.8),
+]
+
+UNRELATED = ['keine ahnung', 'DNS', 'ipconfig /all', 'router neu starten', '']
+
+def make_answers(count, rng):
+    """Mostly typo'd keywords with some duplicates and unrelated answers"""
+    answers = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.7:
+            answer = list(rng.choice(KEYWORDS)[0])
+            for _ in range(rng.randint(0, 3)):
+                answer[rng.randrange(len(answer))] = rng.choice(string.ascii_lowercase)
+            answers.append(''.join(answer))
+        elif roll < 0.85:
+            answers.append(rng.choice(KEYWORDS)[0].lower())
+        else:
+            answers.append(rng.choice(UNRELATED))
+    return answers
+
+def timed(label, grade, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decisions = grade()
+    per_round = (time.perf_counter() - start) / rounds * 1000
+    print(f"  {label:<12} {per_round:8.2f} ms per room")
+    return decisions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark grading TEXT answers at question close')
+    parser.add_argument('--players', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if np is None:
+        print("NumPy is not installed, grade_batch() falls back to per-answer grading")
+
+    answers = make_answers(args.players, random.Random(args.seed))
+    print(f"{args.players} answers, {len(set(answers))} distinct\n")
+
+    for mode in MODES:
+        text_matcher.set_mode(mode)
+        key = AnswerKey(1, 'de', Fragetyp.TEXT, [], [
+            (text_matcher.normalize(keyword), keyword, threshold) for keyword, threshold in KEYWORDS
+        ])
+        print(mode)
+        one_by_one = timed('one by one', lambda: [grade_answer(key, a) for a in answers], args.rounds)
+        batched = timed('batched', lambda: grade_batch(key, answers), args.rounds)
+        print(f"  {'':<12} {'same decisions' if batched == one_by_one else 'DECISIONS DIFFER'}")
+
+if __name__ == '__main__':
+    main()
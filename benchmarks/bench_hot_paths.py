@@ -0,0 +1,254 @@
+# benchmarks/bench_hot_paths.py - Micro-benchmarks of the game's CPU hot paths with JSON baselines
+#
+# Usage: python benchmarks/bench_hot_paths.py [--questions 200] [--text-share 0.3] [--rounds 7]
+#        python benchmarks/bench_hot_paths.py --save        # write the baseline
+#        python benchmarks/bench_hot_paths.py --check 0.25  # exit 1 if a case got >25 % slower
+#
+# Runs on an in-memory SQLite app (TestingConfig) with a generated question
+# bank of --questions questions (benchmarks/fixtures.py). Every case runs
+# over the whole bank, repeated for at least --min-time seconds per round;
+# the best of --rounds rounds counts:
+#   text_match      grade_answer() of typo'd / unrelated answers, TEXT keys
+#   mc_grade        grade_answer() of single and multi-select MC answers
+#   get_points      Frage.get_points() on ORM rows
+#   time_bonus      calculate_points() as applied to correct answers
+#   payload_build   QuestionPayload of every question in both languages (cold cache)
+#   payload_render  shuffled_order() + render() for both languages, as send_next_question
+#   json_encode     Socket.IO packet encoding of new_question and scores_batch payloads
+#   rank_update     RoomScoreboard.set() + rank() per scored answer in a 1000-player room
+#   round_close     RoomScoreboard.close_round() of a 1000-player room, per player
+#
+# Results are compared with the baseline file (default
+# benchmarks/baselines/hot_paths.json). Baselines are machine dependent:
+# compare runs from the same host, and --save a new one when the host changes.
+
+from pathlib import Path
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_BASELINE = ROOT / 'benchmarks' / 'baselines' / 'hot_paths.json'
+
+def timed(func, rounds, min_time):
+    """Best of rounds, each repeating func for at least min_time seconds, returns seconds per operation"""
+    samples = []
+    for _ in range(rounds):
+        operations = 0
+        start = time.perf_counter()
+        while True:
+            operations += func()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        samples.append(elapsed / operations)
+    return min(samples)
+
+def build_cases(app, args):
+    """{name: callable returning its operation count}, set up inside the app context"""
+    from socketio import packet
+    from benchmarks.bench_text_matcher import UNRELATED, typo
+    from benchmarks.fixtures import add_question_bank
+    from models import Frage, Fragetyp
+    from socketio_events import calculate_points
+    from utils.answer_keys import LANGUAGES, answer_keys, grade_answer
+    from utils.game_room import load_questions
+    from utils.question_payloads import QuestionPayload, shuffled_order
+    from utils.room_scoreboard import RoomScoreboard
+
+    rng = random.Random(args.seed)
+    _, frage_ids = add_question_bank(args.questions, text_share=args.text_share, seed=args.seed)
+    answer_keys.clear()
+    answer_keys.warm(frage_ids)
+    fragen = load_questions(frage_ids)
+    rows = Frage.query.filter(Frage.id.in_(frage_ids)).all()
+
+    # Ten answers per question: correct, typo'd and unrelated for TEXT, single and multi for MC
+    text_answers, mc_answers = [], []
+    for frage_id in frage_ids:
+        for lang in LANGUAGES:
+            key = answer_keys.get(frage_id, lang)
+            for _ in range(5):
+                if key.typ == Fragetyp.TEXT:
+                    keyword = rng.choice(key.keywords)[1]
+                    roll = rng.random()
+                    if roll < 0.6:
+                        answer = typo(typo(keyword, rng), rng)
+                    elif roll < 0.8:
+                        answer = keyword.lower()
+                    else:
+                        answer = rng.choice(UNRELATED)
+                    text_answers.append((key, answer))
+                else:
+                    options = [a[0] for a in fragen[frage_id].antworten]
+                    answer = rng.sample(options, 2) if rng.random() < 0.2 else rng.choice(options)
+                    mc_answers.append((key, answer))
+    elapsed = [(fragen[f], rng.uniform(0, 30)) for f in frage_ids for _ in range(10)]
+
+    def text_match():
+        for key, answer in text_answers:
+            grade_answer(key, answer)
+        return len(text_answers)
+
+    def mc_grade():
+        for key, answer in mc_answers:
+            grade_answer(key, answer)
+        return len(mc_answers)
+
+    def get_points():
+        for frage in rows:
+            frage.get_points()
+        return len(rows)
+
+    def time_bonus():
+        for frage, time_elapsed in elapsed:
+            calculate_points(frage, time_elapsed)
+        return len(elapsed)
+
+    def payload_build():
+        for frage in fragen.values():
+            for lang in LANGUAGES:
+                QuestionPayload(frage, lang)
+        return len(fragen) * len(LANGUAGES)
+
+    payloads = {(f, lang): QuestionPayload(fragen[f], lang) for f in frage_ids for lang in LANGUAGES}
+
+    def payload_render():
+        for n, frage in enumerate(fragen.values()):
+            order = shuffled_order(frage) if frage.typ == Fragetyp.MC else None
+            for lang in LANGUAGES:
+                payloads[(frage.id, lang)].render(n + 1, order)
+        return len(fragen)
+
+    # One scores_batch of a full room per question
+    scores = {'scores': [
+        {'user_id': n, 'username': f"spieler{n}", 'score': n * 250, 'points_change': 500} for n in range(30)
+    ]}
+    rendered = [payloads[(f, 'de')].render(1) for f in frage_ids]
+
+    def json_encode():
+        for payload in rendered:
+            packet.Packet(packet.EVENT, data=['new_question', payload]).encode()
+            packet.Packet(packet.EVENT, data=['scores_batch', scores]).encode()
+        return len(rendered) * 2
+
+    # A 1000-player room a few questions in, then a stream of correct answers
+    room_scores = {user_id: rng.randrange(0, 4000, 50) for user_id in range(1, 1001)}
+    scoreboard = RoomScoreboard(room_scores)
+    scoreboard.close_round()
+    answers = [(rng.randrange(1, 1001), rng.randrange(100, 1500)) for _ in range(5000)]
+
+    def rank_update():
+        for user_id, points in answers:
+            room_scores[user_id] += points
+            scoreboard.set(user_id, room_scores[user_id])
+            scoreboard.rank(user_id)
+        return len(answers)
+
+    def round_close():
+        return len(scoreboard.close_round())
+
+    return {
+        'text_match': text_match,
+        'mc_grade': mc_grade,
+        'get_points': get_points,
+        'time_bonus': time_bonus,
+        'payload_build': payload_build,
+        'payload_render': payload_render,
+        'json_encode': json_encode,
+        'rank_update': rank_update,
+        'round_close': round_close,
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the game hot paths')
+    parser.add_argument('--questions', type=int, default=200, help='Size of the generated question bank')
+    parser.add_argument('--text-share', type=float, default=0.3)
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per round')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='Write the results as new baseline')
+    parser.add_argument('--check', type=float, metavar='TOLERANCE',
+                        help='Exit with 1 if a case is slower than baseline * (1 + TOLERANCE)')
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    logging.disable(logging.WARNING)
+    from app import create_app
+
+    app = create_app('testing')
+    with app.app_context():
+        cases = build_cases(app, args)
+        results = {}
+        for name, func in cases.items():
+            func()  # warm-up
+            seconds = timed(func, args.rounds, args.min_time)
+            results[name] = {
+                'us_per_op': round(seconds * 1e6, 4),
+                'ops_per_sek': round(1 / seconds)
+            }
+
+    baseline = None
+    if args.baseline.exists():
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{args.questions} questions, text share {args.text_share}, best of {args.rounds} rounds")
+    if baseline:
+        meta = baseline['meta']
+        print(f"baseline {args.baseline.name}: {meta.get('git_revision')} on {meta.get('machine')}, "
+              f"Python {meta.get('python')}")
+    print(f"\n{'case':<16} {'us/op':>10} {'ops/s':>12} {'baseline':>10} {'change':>8}")
+    regressions = []
+    for name, result in results.items():
+        line = f"{name:<16} {result['us_per_op']:>10.3f} {result['ops_per_sek']:>12,}"
+        before = baseline['results'].get(name) if baseline else None
+        if before:
+            change = result['us_per_op'] / before['us_per_op'] - 1
+            line += f" {before['us_per_op']:>10.3f} {change * 100:>+7.1f}%"
+            if args.check is not None and change > args.check:
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'meta': {
+                    'git_revision': git_revision(),
+                    'python': platform.python_version(),
+                    'machine': f"{platform.system()} {platform.machine()}, {os.cpu_count()} cores",
+                    'questions': args.questions,
+                    'text_share': args.text_share,
+                    'rounds': args.rounds,
+                    'min_time': args.min_time,
+                    'seed': args.seed
+                },
+                'results': results
+            }, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline written to {args.baseline}")
+
+    if regressions:
+        print(f"\nSlower than baseline by more than {args.check * 100:.0f} %: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_leaderboard.py - Leaderboard index against the SQL rank queries it replaced
+#
+# Usage: python benchmarks/bench_leaderboard.py [--users 1000000] [--lookups 20000] [--seed 1]
+#
+# Fills a Leaderboard with --users players (skewed points, many ties) and
+# times top 10, rank, the window around a player and a points update. For
+# comparison, the former queries (ORDER BY fisi_punkte DESC LIMIT 10 and
+# COUNT(*) WHERE fisi_punkte > x, no index) run on an in-memory SQLite
+# table of the same size.
+
+from pathlib import Path
+import argparse
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.leaderboard import Leaderboard, make_key
+from utils.rank_index import RankIndex
+
+def make_points(users, rng):
+    """Most players have few points, a long tail has many"""
+    return {user_id: int(rng.paretovariate(1.2) * 20) for user_id in range(1, users + 1)}
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed / count * 1e6:>10.1f} µs")
+
+def main():
+    parser = argparse.ArgumentParser(description='Leaderboard index against SQL rank queries')
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=20_000)
+    parser.add_argument('--sql-lookups', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    points = make_points(args.users, rng)
+    user_ids = list(points)
+
+    board = Leaderboard()
+    start = time.perf_counter()
+    board._points = dict(points)
+    board._index = RankIndex(make_key(user_id, p) for user_id, p in points.items())
+    print(f"{args.users} players, index built in {time.perf_counter() - start:.2f}s\n")
+
+    print("Leaderboard index")
+    timed('top(10)', args.lookups, lambda: board.top(10))
+    timed('rank(user)', args.lookups, lambda: board.rank(rng.choice(user_ids)))
+    timed('around(user, 5)', args.lookups, lambda: board.around(rng.choice(user_ids), 5))
+    timed('add_points(user, 10)', args.lookups, lambda: board.add_points(rng.choice(user_ids), 10))
+
+    db = sqlite3.connect(':memory:')
+    db.execute('CREATE TABLE user (id INTEGER PRIMARY KEY, fisi_punkte INTEGER)')
+    db.executemany('INSERT INTO user VALUES (?, ?)', points.items())
+    print(f"\nSQL without index ({args.sql_lookups} lookups)")
+    timed('ORDER BY ... LIMIT 10', args.sql_lookups,
+          lambda: db.execute('SELECT id FROM user WHERE fisi_punkte > 0 ORDER BY fisi_punkte DESC LIMIT 10').fetchall())
+    timed('COUNT(*) rank', args.sql_lookups,
+          lambda: db.execute('SELECT COUNT(*) FROM user WHERE fisi_punkte > ?',
+                             (board.points(rng.choice(user_ids)),)).fetchone())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/bench_rooms_per_core.py - Rooms one worker can serve, and scaling over sharded workers
+#
+# Usage: python benchmarks/bench_rooms_per_core.py [--rooms 120] [--players 8] [--questions 10]
+#                                                   [--workers 1,2,4] [--question-interval 15]
+#
+# Each worker process owns the rooms that owner_of() assigns to it among
+# the worker IDs of a run, loads them into memory and plays every question
+# through the real handlers: send_next_question, one submit_answer per
+# player (called in a request context, as routed events are), question
+# close and end_game. Sockets are not involved, emits go to rooms without
+# clients. Every worker has its own SQLite file and an in-process room
+# store, i.e. the hot state of a room never leaves its owner.
+#
+# Reports CPU time per room-question and derives rooms per core: how many
+# rooms a core keeps up with when each room asks a question every
+# --question-interval seconds. With several workers the aggregate
+# throughput shows how close the scaling comes to linear; it cannot exceed
+# the number of cores of the machine.
+
+from pathlib import Path
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+def setup_rooms(room_codes, players, questions, rng):
+    """Create users, sessions and MC questions, open the rooms, returns answer IDs per question"""
+    from datetime import datetime, timezone
+    from extensions import db
+    from models import Antwort, Frage, Schwierigkeit, SpielSitzung, SpielTeilnahme, Spielmodus, User
+    from utils.game_room import open_room
+    from benchmarks.fixtures import add_question_bank
+
+    lernfeld_id, _ = add_question_bank(questions)
+    frage_ids = [f.id for f in Frage.query.filter_by(lernfeld_id=lernfeld_id, schwierigkeit=Schwierigkeit.HEAVY)]
+    antworten = {}
+    for antwort in Antwort.query.filter(Antwort.frage_id.in_(frage_ids)):
+        antworten.setdefault(antwort.frage_id, []).append(antwort.id)
+
+    users = {}
+    for room_code in room_codes:
+        members = []
+        for p in range(players):
+            user = User(username=f"{room_code}_{p}", password_hash='-')
+            db.session.add(user)
+            members.append(user)
+        db.session.flush()
+        sitzung = SpielSitzung(raum_code=room_code, modus=Spielmodus.KLASSISCH,
+                               schwierigkeit_level=Schwierigkeit.HEAVY, lernfeld_id=lernfeld_id,
+                               ersteller_id=members[0].id, started_at=datetime.now(timezone.utc),
+                               aktueller_frage_index=0, fragen_deck=rng.sample(frage_ids, len(frage_ids)))
+        db.session.add(sitzung)
+        db.session.flush()
+        for user in members:
+            db.session.add(SpielTeilnahme(sitzung_id=sitzung.id, user_id=user.id))
+        users[room_code] = [user.id for user in members]
+    db.session.commit()
+
+    for room_code in room_codes:
+        open_room(SpielSitzung.query.filter_by(raum_code=room_code).first())
+    return users, antworten
+
+def run_worker(worker_id, worker_ids, args, results):
+    """One worker process: play all questions of the rooms it owns"""
+    os.chdir(ROOT)
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{args.workdir}/{worker_id}.db",
+        RATELIMIT_ENABLED='False',
+        # Timers never fire during the run, the loop below drives every phase
+        QUESTION_GRACE_SEK='3600',
+        QUESTION_REVEAL_DELAY_SEK='3600'
+    )
+    logging.disable(logging.WARNING)
+
+    from flask import request, session
+    from app import create_app
+    from socketio_events import handle_submit_answer, send_next_question, end_game
+    from utils.game_room import get_room
+    from utils.sharding import owner_of
+
+    rng = random.Random(worker_id)
+    room_codes = [f"B{n:05d}" for n in range(args.rooms)]
+    owned = [code for code in room_codes if owner_of(code, worker_ids) == worker_id]
+
+    app = create_app('development')
+    with app.app_context():
+        users, antworten = setup_rooms(owned, args.players, args.questions, rng)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    played = 0
+    for _ in range(args.questions):
+        for room_code in owned:
+            with app.app_context():
+                send_next_question(room_code)
+                room = get_room(room_code)
+                frage_id = room.current_frage_id if room else None
+            if frage_id is None:
+                continue
+            for user_id in users[room_code]:
+                with app.test_request_context('/socket.io/'):
+                    request.sid = f"bench-{user_id}"
+                    request.namespace = '/'
+                    session['user_id'] = user_id
+                    handle_submit_answer({
+                        'room_code': room_code,
+                        'frage_id': frage_id,
+                        'answer': rng.choice(antworten[frage_id]),
+                        'time_elapsed': rng.uniform(1, 20)
+                    })
+            played += 1
+    with app.app_context():
+        for room_code in owned:
+            end_game(room_code)
+    results.put({
+        'worker_id': worker_id,
+        'rooms': len(owned),
+        'room_questions': played,
+        'wall_sek': time.perf_counter() - wall_start,
+        'cpu_sek': time.process_time() - cpu_start
+    })
+
+def run(worker_count, args):
+    """Run worker_count workers in parallel over the same set of rooms"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    worker_ids = tuple(f"worker-{n}" for n in range(worker_count))
+    args.workdir = tempfile.mkdtemp(prefix='fisi-shards-')
+    processes = [context.Process(target=run_worker, args=(w, worker_ids, args, results)) for w in worker_ids]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return reports
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rooms per core with sharded workers')
+    parser.add_argument('--rooms', type=int, default=120)
+    parser.add_argument('--players', type=int, default=8)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--question-interval', type=float, default=15,
+                        help='Seconds between two questions of a room')
+    args = parser.parse_args()
+
+    print(f"{args.rooms} rooms x {args.players} players x {args.questions} questions, "
+          f"{os.cpu_count()} cores")
+    print(f"{'workers':>7} {'rooms/worker':>14} {'CPU ms/room-q':>14} {'room-q/s':>10} "
+          f"{'speedup':>8} {'rooms/core':>11}")
+    baseline = None
+    for worker_count in (int(w) for w in args.workers.split(',')):
+        reports = run(worker_count, args)
+        room_questions = sum(r['room_questions'] for r in reports)
+        cpu_sek = sum(r['cpu_sek'] for r in reports)
+        wall_sek = max(r['wall_sek'] for r in reports)
+        throughput = room_questions / wall_sek
+        cpu_ms = cpu_sek / room_questions * 1000
+        baseline = baseline or throughput
+        spread = f"{min(r['rooms'] for r in reports)}-{max(r['rooms'] for r in reports)}"
+        print(f"{worker_count:>7} {spread:>14} {cpu_ms:>14.2f} {throughput:>10.1f} "
+              f"{throughput / baseline:>7.2f}x {args.question_interval / (cpu_ms / 1000):>11.0f}")
+
+if __name__ == '__main__':
+    main()
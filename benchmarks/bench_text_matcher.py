@@ -0,0 +1,110 @@
+# benchmarks/bench_text_matcher.py - Compare text answer matchers against difflib
+#
+# Usage: python benchmarks/bench_text_matcher.py [--answers 20000] [--seed 1]
+#
+# Grades a synthetic stream of typo'd, unrelated and exact answers against
+# the seed keywords with every matcher mode and the original
+# SequenceMatcher(...).ratio() loop. Reports throughput and how many
+# decisions differ from the original grading.
+
+from difflib import SequenceMatcher
+from pathlib import Path
+import argparse
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.text_matcher import MODES, TextMatcher
+
+# (keyword, threshold) lists as found in the question catalog
+KEYWORD_SETS = [
+    [('apt update', 0.9), ('apt-get update', 0.9)],
+    [('Falsches Gateway', 0.7), ('Fehlerhaftes Routing', 0.7), ('Kein Route', 0.7)],
+    [('Subnetzmaske', 0.8), ('Netzmaske', 0.8)],
+    [('Größenordnung', 0.8)],
+    [('Dynamic Host Configuration Protocol', 0.85), ('DHCP', 0.9)],
+    [('Übertragungsrate', 0.8), ('Bandbreite', 0.8)],
+]
+
+UNRELATED = [
+    'keine ahnung', 'ping', 'ipconfig /all', 'DNS', 'router neu starten',
+    'sudo apt upgrade', 'Switch', 'Firewall blockiert', 'x', '',
+]
+
+def typo(text, rng):
+    """Apply one random edit: swap, drop, insert, replace or umlaut spelling"""
+    if not text:
+        return text
+    i = rng.randrange(len(text))
+    kind = rng.randrange(5)
+    if kind == 0 and i + 1 < len(text):
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    if kind == 1:
+        return text[:i] + text[i + 1:]
+    if kind == 2:
+        return text[:i] + rng.choice(string.ascii_lowercase) + text[i:]
+    if kind == 3:
+        return text[:i] + rng.choice(string.ascii_lowercase) + text[i + 1:]
+    return text.replace('ö', 'oe').replace('ü', 'ue').replace('Ü', 'Ue').replace('ß', 'ss')
+
+def make_workload(count, rng):
+    workload = []
+    for _ in range(count):
+        keywords = rng.choice(KEYWORD_SETS)
+        roll = rng.random()
+        if roll < 0.3:
+            answer = rng.choice(keywords)[0]
+        elif roll < 0.8:
+            answer = rng.choice(keywords)[0]
+            for _ in range(rng.randint(1, 3)):
+                answer = typo(answer, rng)
+            if rng.random() < 0.3:
+                answer = answer.upper()
+        else:
+            answer = rng.choice(UNRELATED)
+        workload.append((answer, keywords))
+    return workload
+
+def grade_original(answer, keywords):
+    """The grading loop used before the bounded matcher"""
+    answer_text = str(answer).strip().lower()
+    for keyword, threshold in keywords:
+        if SequenceMatcher(None, answer_text, keyword.lower()).ratio() >= threshold:
+            return keyword
+    return None
+
+def run(label, grade, workload):
+    start = time.perf_counter()
+    decisions = [grade(answer, keywords) for answer, keywords in workload]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed * 1000:9.1f} ms  {len(workload) / elapsed:12,.0f} answers/s  "
+          f"{sum(d is not None for d in decisions):6} correct")
+    return decisions
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare text answer matchers against difflib')
+    parser.add_argument('--answers', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    workload = make_workload(args.answers, random.Random(args.seed))
+    print(f"{args.answers} answers, {len(KEYWORD_SETS)} keyword sets\n")
+
+    baseline = run('original', grade_original, workload)
+    for mode in MODES:
+        matcher = TextMatcher(mode)
+        # Keywords are normalized once per question, as in the answer-key cache
+        compiled = {
+            id(keywords): tuple((matcher.normalize(k), k, t) for k, t in keywords)
+            for keywords in KEYWORD_SETS
+        }
+        decisions = run(mode, lambda answer, keywords: matcher.match(
+            matcher.normalize(answer), compiled[id(keywords)]), workload)
+        changed = sum((a is None) != (b is None) for a, b in zip(baseline, decisions))
+        print(f"{'':<12} {changed} decisions differ from original")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# benchmarks/cross_worker_broadcast.py - Check room broadcasts across worker processes
+#
+# Usage: python benchmarks/cross_worker_broadcast.py [--queue local://127.0.0.1:6391]
+#
+# Starts the bundled message queue broker (unless --queue points elsewhere,
+# e.g. redis://localhost:6379/0) and two app servers sharing one SQLite
+# file, like two workers behind a load balancer. The host opens a room on
+# worker A, a player joins it on worker B, then the host starts the game.
+# Passes when
+#   - the host on A receives player_joined emitted by worker B, and
+#   - the player on B receives game_started and new_question emitted by A.
+# Exits with status 1 otherwise.
+
+from pathlib import Path
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.sio_client import SocketIOClient
+
+TIMEOUT_SEK = 15
+
+def serve(port):
+    """Worker process: one app server on its own port"""
+    os.chdir(ROOT)
+    from app import create_app
+    from extensions import socketio
+
+    app = create_app('development')
+    socketio.run(app, host='127.0.0.1', port=port, debug=False, use_reloader=False,
+                 log_output=False, allow_unsafe_werkzeug=True)
+
+def start_worker(port, env, script=__file__):
+    """Run script --serve PORT in a subprocess, returns once the server answers"""
+    process = subprocess.Popen(
+        [sys.executable, script, '--serve', str(port)], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return process
+        except Exception:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Worker on port {port} did not start")
+
+def first_question_filter():
+    """Lernfeld and difficulty with the most seeded questions, so the deck is not empty"""
+    os.chdir(ROOT)
+    from sqlalchemy import func
+    from app import create_app
+    from extensions import db
+    from models import Frage
+
+    app = create_app('development')
+    with app.app_context():
+        lernfeld_id, schwierigkeit, _ = (
+            db.session.query(Frage.lernfeld_id, Frage.schwierigkeit, func.count())
+            .group_by(Frage.lernfeld_id, Frage.schwierigkeit)
+            .order_by(func.count().desc())
+            .first()
+        )
+        return lernfeld_id, schwierigkeit.name
+
+def main():
+    parser = argparse.ArgumentParser(description='Check SocketIO room broadcasts across worker processes')
+    parser.add_argument('--queue', default='local://127.0.0.1:6391')
+    parser.add_argument('--ports', default='5101,5102')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    if args.queue.startswith('local://'):
+        from utils.message_queue import LocalBroker
+        host, port = args.queue[len('local://'):].split(':')
+        broker = LocalBroker(host, int(port))
+        threading.Thread(target=broker.serve_forever, daemon=True).start()
+
+    workdir = tempfile.mkdtemp(prefix='fisi-quiz-')
+    env = dict(os.environ,
+               SOCKETIO_MESSAGE_QUEUE=args.queue,
+               DATABASE_URL=f"sqlite:///{workdir}/quiz_app.db",
+               RATELIMIT_ENABLED='False',
+               QUESTION_START_DELAY_SEK='0.5')
+    os.environ.update(env)
+    port_a, port_b = (int(p) for p in args.ports.split(','))
+
+    # Worker A creates and seeds the database before B starts
+    workers = [start_worker(port_a, env)]
+    try:
+        workers.append(start_worker(port_b, env))
+        lernfeld_id, schwierigkeit = first_question_filter()
+
+        host = SocketIOClient(f"http://127.0.0.1:{port_a}")
+        host.guest_login('host')
+        room_code = host.create_game(lernfeld_id, schwierigkeit)
+        host.connect()
+        host.emit('join_game', {'room_code': room_code})
+        host.wait_for('update_lobby')
+        print(f"Room {room_code} opened on worker A (port {port_a})")
+
+        player = SocketIOClient(f"http://127.0.0.1:{port_b}")
+        player.guest_login('player')
+        player.connect()
+        player.emit('join_game', {'room_code': room_code})
+        player.wait_for('update_lobby')
+        print(f"Player joined on worker B (port {port_b})")
+
+        # player_joined of the B join is emitted by worker B
+        host_ok = host.wait_for('player_joined', TIMEOUT_SEK) is not None
+        host.clear()
+
+        # game_started and new_question are emitted by worker A
+        host.emit('start_game', {'room_code': room_code})
+        player_ok = (player.wait_for('game_started', TIMEOUT_SEK) is not None
+                     and player.wait_for('new_question', TIMEOUT_SEK) is not None)
+
+        print(f"Host on A received:   {sorted(set(host.received()))}")
+        print(f"Player on B received: {sorted(set(player.received()))}")
+        host.close()
+        player.close()
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+
+    ok = host_ok and player_ok
+    print('PASS' if ok else 'FAIL')
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/fixtures.py - Question bank fixtures for benchmark scripts
+#
+# Call inside an app context of create_app(); the default data (Lernfelder,
+# seeded questions) must already exist.
+
+import random
+
+from extensions import db
+from models import Antwort, Frage, Fragetyp, Lernfeld, Schwierigkeit, TextAntwortSchluessel
+
+# Keywords of generated TEXT questions, also used by simulated players
+KEYWORDS = [
+    'Dynamic Host Configuration Protocol', 'Subnetzmaske', 'Standardgateway', 'Router',
+    'Switch', 'Firewall', 'Domain Name System', 'Virtual Private Network', 'Hypervisor',
+    'Active Directory', 'Datensicherung', 'Verschlüsselung',
+]
+
+def add_question_bank(count, schwierigkeit=Schwierigkeit.HEAVY, text_share=0.0, zeitlimit_sek=30, seed=1):
+    """Add count MC and TEXT questions to the first Lernfeld, returns (lernfeld_id, frage_ids)
+
+    MC questions get four options, the first one correct. TEXT questions
+    accept one keyword in both languages.
+    """
+    rng = random.Random(seed)
+    lernfeld = Lernfeld.query.first()
+    frage_ids = []
+    for n in range(count):
+        is_text = rng.random() < text_share
+        frage = Frage(
+            lernfeld_id=lernfeld.id,
+            typ=Fragetyp.TEXT if is_text else Fragetyp.MC,
+            schwierigkeit=schwierigkeit,
+            frage_text_de=f"Benchmark-Frage {n}",
+            frage_text_en=f"Benchmark question {n}",
+            zeitlimit_sek=zeitlimit_sek
+        )
+        db.session.add(frage)
+        db.session.flush()
+        if is_text:
+            keyword = rng.choice(KEYWORDS)
+            for lang in ('de', 'en'):
+                db.session.add(TextAntwortSchluessel(
+                    frage_id=frage.id, schluesselwort=keyword, mindest_uebereinstimmung=0.85, sprache=lang
+                ))
+        else:
+            for a in range(4):
+                db.session.add(Antwort(
+                    frage_id=frage.id, antwort_text_de=f"Antwort {a}",
+                    antwort_text_en=f"Answer {a}", ist_korrekt=a == 0
+                ))
+        frage_ids.append(frage.id)
+    db.session.commit()
+    return lernfeld.id, frage_ids
@@ -0,0 +1,345 @@
+# benchmarks/load_test.py - Simulate full classrooms against one server on localhost
+#
+# Usage: python benchmarks/load_test.py [--rooms 5] [--players 20] [--questions 5]
+#                                       [--think-min 1] [--think-max 6] [--text-share 0.2]
+#        python benchmarks/load_test.py --url http://127.0.0.1:5000 --lernfeld-id 1 [--server-pid PID]
+#
+# Without --url a server process is started on a fresh SQLite file with a
+# generated question bank (benchmarks/fixtures.py); SOCKETIO_ASYNC_MODE and
+# the game timing variables are passed through. Every simulated player logs
+# in via /auth/guest_login, the first player of a room creates it via
+# /game/create and starts it once everyone joined. Players answer each
+# question after a random think time, MC with a random option, TEXT with a
+# random keyword. The run ends when every room received game_over.
+#
+# Reported:
+#   latency     emit -> reply per event (join_game -> update_lobby,
+#               start_game -> game_started, submit_answer -> answer_result
+#               or answer_received), p50/p95/p99
+#   fan-out     spread between the first and last player of a room
+#               receiving the same broadcast (new_question, question_closed,
+#               game_over), p50/p95/p99
+#   errors      error events, failed logins and replies that never came,
+#               relative to all requests
+#   server      CPU (% of one core) and RSS, sampled every second from /proc
+#               (needs the server PID: own server or --server-pid)
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.bench_async_modes import serve
+from benchmarks.cross_worker_broadcast import start_worker
+from benchmarks.fixtures import KEYWORDS
+from benchmarks.sio_client import SocketIOClient
+
+# Request event -> reply events that complete it
+REPLIES = {
+    'join_game': ('update_lobby',),
+    'start_game': ('game_started',),
+    'submit_answer': ('answer_result', 'answer_received'),
+}
+
+# Room broadcasts whose delivery spread is measured, with the key telling sends apart
+BROADCASTS = {
+    'new_question': 'frage_id',
+    'question_closed': 'frage_id',
+    'game_over': None,
+}
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list, None when empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+class Metrics:
+    """Latency samples, broadcast receive times and error counts of all players"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.broadcasts = {}
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def request(self):
+        with self.lock:
+            self.requests += 1
+
+    def error(self):
+        with self.lock:
+            self.errors += 1
+
+    def latency(self, event, seconds):
+        with self.lock:
+            self.latencies.setdefault(event, []).append(seconds)
+
+    def broadcast(self, room_code, name, key, received_at):
+        with self.lock:
+            self.broadcasts.setdefault((room_code, name, key), []).append(received_at)
+
+    def fan_out(self):
+        """{event: [spread seconds]} over broadcasts received by more than one player"""
+        spreads = {}
+        for (_, name, _), times in self.broadcasts.items():
+            if len(times) > 1:
+                spreads.setdefault(name, []).append(max(times) - min(times))
+        return spreads
+
+class Player:
+    """Simulated browser: answers every question after a think time"""
+
+    def __init__(self, base_url, name, metrics, args, rng):
+        self.client = SocketIOClient(base_url, timeout=args.timeout)
+        self.name = name
+        self.metrics = metrics
+        self.args = args
+        self.rng = rng
+        self.room_code = None
+        self.pending = {}
+        self.game_over = threading.Event()
+        self.lock = threading.Lock()
+        self.client.on_event = self.on_event
+
+    def login(self):
+        self.metrics.request()
+        status, location = self.client.guest_login(self.name)
+        if status != 302 or location != '/dashboard':
+            self.metrics.error()
+            raise RuntimeError(f"Guest login failed with status {status}")
+        self.client.connect()
+
+    def emit(self, event, data):
+        self.metrics.request()
+        if event in REPLIES:
+            with self.lock:
+                self.pending[event] = time.perf_counter()
+        self.client.emit(event, dict(data, room_code=self.room_code))
+
+    def on_event(self, name, data, received_at):
+        # Replies complete the request waiting for them
+        for request_event, replies in REPLIES.items():
+            if name in replies:
+                with self.lock:
+                    sent_at = self.pending.pop(request_event, None)
+                if sent_at is not None:
+                    self.metrics.latency(request_event, received_at - sent_at)
+
+        if name in BROADCASTS:
+            key = BROADCASTS[name]
+            self.metrics.broadcast(self.room_code, name, data.get(key) if key else None, received_at)
+
+        if name == 'error':
+            self.metrics.error()
+        elif name == 'new_question':
+            think = min(self.rng.uniform(self.args.think_min, self.args.think_max), data['zeitlimit_sek'])
+            timer = threading.Timer(think, self.answer, args=(data,))
+            timer.daemon = True
+            timer.start()
+        elif name == 'game_over':
+            self.game_over.set()
+
+    def answer(self, question):
+        if question.get('antworten'):
+            answer = self.rng.choice(question['antworten'])['id']
+        else:
+            answer = self.rng.choice(KEYWORDS)
+        self.emit('submit_answer', {
+            'frage_id': question['frage_id'],
+            'answer': answer,
+            'time_elapsed': 0
+        })
+
+    def unanswered(self):
+        with self.lock:
+            return len(self.pending)
+
+class ServerMonitor:
+    """Samples CPU and RSS of a process from /proc once per second"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.cpu_percent = []
+        self.rss_kb = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _cpu_seconds(self):
+        with open(f"/proc/{self.pid}/stat") as stat:
+            # Fields after the command name; utime and stime are fields 14 and 15
+            fields = stat.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    def _rss(self):
+        with open(f"/proc/{self.pid}/status") as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+        return 0
+
+    def _run(self):
+        last_cpu, last_time = self._cpu_seconds(), time.perf_counter()
+        while not self._stop.wait(1):
+            try:
+                cpu, now = self._cpu_seconds(), time.perf_counter()
+                self.rss_kb.append(self._rss())
+            except OSError:
+                return
+            self.cpu_percent.append((cpu - last_cpu) / (now - last_time) * 100)
+            last_cpu, last_time = cpu, now
+
+def prepare_database(workdir, args):
+    """Fresh database with default data and a generated question bank"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{workdir}/quiz_app.db"
+    os.chdir(ROOT)
+    from app import create_app
+    from benchmarks.fixtures import add_question_bank
+
+    app = create_app('development')
+    with app.app_context():
+        lernfeld_id, _ = add_question_bank(args.questions, text_share=args.text_share, zeitlimit_sek=args.zeitlimit)
+    return lernfeld_id
+
+def run_room(n, base_url, lernfeld_id, metrics, args):
+    """Create one room with its players, play it to the end, returns the players"""
+    rng = random.Random(n)
+    players = [Player(base_url, f"room{n}-p{m}", metrics, args, rng) for m in range(args.players)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        logged_in = list(pool.map(lambda player: _try_login(player), players))
+    players = [player for player, ok in zip(players, logged_in) if ok]
+    if not players:
+        return []
+
+    host = players[0]
+    metrics.request()
+    try:
+        room_code = host.client.create_game(lernfeld_id, args.schwierigkeit)
+    except RuntimeError:
+        metrics.error()
+        return players
+    for player in players:
+        player.room_code = room_code
+        player.emit('join_game', {})
+        time.sleep(rng.uniform(0, args.join_spread))
+    for player in players:
+        player.client.wait_for('update_lobby', args.timeout)
+
+    host.emit('start_game', {})
+    for player in players:
+        player.game_over.wait(args.timeout + args.questions * (args.zeitlimit + 10))
+    return players
+
+def _try_login(player):
+    try:
+        player.login()
+        return True
+    except Exception:
+        return False
+
+def report(metrics, players, monitor, elapsed):
+    unanswered = sum(player.unanswered() for player in players)
+    unfinished = sum(not player.game_over.is_set() for player in players)
+    errors = metrics.errors + unanswered
+    print(f"\nDuration {elapsed:.1f} s, {len(players)} players connected, {unfinished} without game_over")
+
+    print(f"\n{'latency (ms)':<16} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for event, samples in sorted(metrics.latencies.items()):
+        print(f"{event:<16} {len(samples):>7} " + ' '.join(
+            f"{percentile(samples, pct) * 1000:>8.1f}" for pct in (50, 95, 99)
+        ))
+
+    print(f"\n{'fan-out (ms)':<16} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for event, spreads in sorted(metrics.fan_out().items()):
+        print(f"{event:<16} {len(spreads):>7} " + ' '.join(
+            f"{percentile(spreads, pct) * 1000:>8.1f}" for pct in (50, 95, 99)
+        ))
+
+    rate = errors / metrics.requests * 100 if metrics.requests else 0
+    print(f"\nErrors: {errors} of {metrics.requests} requests ({rate:.2f} %), "
+          f"{metrics.errors} error events/failed logins, {unanswered} missing replies")
+
+    if monitor and monitor.cpu_percent:
+        print(f"Server CPU: avg {sum(monitor.cpu_percent) / len(monitor.cpu_percent):.0f} %, "
+              f"max {max(monitor.cpu_percent):.0f} % of one core; "
+              f"RSS: peak {max(monitor.rss_kb) / 1024:.1f} MB, end {monitor.rss_kb[-1] / 1024:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO load test with simulated classrooms')
+    parser.add_argument('--rooms', type=int, default=5)
+    parser.add_argument('--players', type=int, default=20, help='Players per room, the first one hosts')
+    parser.add_argument('--questions', type=int, default=5, help='Size of the generated question bank')
+    parser.add_argument('--text-share', type=float, default=0.2, help='Share of TEXT questions in the bank')
+    parser.add_argument('--zeitlimit', type=int, default=20, help='Time limit of generated questions')
+    parser.add_argument('--think-min', type=float, default=1)
+    parser.add_argument('--think-max', type=float, default=6)
+    parser.add_argument('--join-spread', type=float, default=0.1, help='Max pause between two joins of a room')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--url', help='Running server instead of starting one')
+    parser.add_argument('--server-pid', type=int, help='PID of the --url server for CPU/RSS sampling')
+    parser.add_argument('--lernfeld-id', type=int, help='Lernfeld of the rooms with --url')
+    parser.add_argument('--schwierigkeit', default='HEAVY')
+    parser.add_argument('--port', type=int, default=5190)
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    server = None
+    if args.url:
+        base_url, lernfeld_id, pid = args.url.rstrip('/'), args.lernfeld_id, args.server_pid
+        if lernfeld_id is None:
+            parser.error('--url needs --lernfeld-id')
+    else:
+        workdir = tempfile.mkdtemp(prefix='fisi-load-')
+        lernfeld_id = prepare_database(workdir, args)
+        env = dict(os.environ, RATELIMIT_ENABLED='False')
+        env.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+        server = start_worker(args.port, env, __file__)
+        base_url, pid = f"http://127.0.0.1:{args.port}", server.pid
+
+    print(f"{args.rooms} rooms x {args.players} players, {args.questions} questions, "
+          f"think time {args.think_min}-{args.think_max} s, server {base_url}")
+    metrics = Metrics()
+    monitor = ServerMonitor(pid) if pid else None
+    try:
+        if monitor:
+            monitor.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.rooms) as pool:
+            rooms = list(pool.map(
+                lambda n: run_room(n, base_url, lernfeld_id, metrics, args), range(args.rooms)
+            ))
+        elapsed = time.perf_counter() - start
+        if monitor:
+            monitor.stop()
+        players = [player for room in rooms for player in room]
+        report(metrics, players, monitor, elapsed)
+        for player in players:
+            player.client.close()
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
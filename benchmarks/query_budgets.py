@@ -0,0 +1,137 @@
+# benchmarks/query_budgets.py - Check SQL statement counts of routes and socket events
+#
+# Usage: python benchmarks/query_budgets.py [--players 4] [--repeat-threshold 5]
+#
+# Plays one game on an in-memory SQLite app (TestingConfig) with the query
+# profiler on: guest logins, dashboard, leaderboard, profile pages, game
+# creation, joins, answers until game_over, results. Every route and socket
+# event is one profiler scope. Prints statements per call for each of them
+# and exits with 1 if a scope exceeded the budget declared with
+# @query_profiler.budget(n) or repeated one statement --repeat-threshold
+# times (N+1 suspect).
+#
+# For tests, utils.query_profiler.query_budget() fails a block directly:
+#     with query_budget(6, max_repeats=1):
+#         client.get('/profile/stats')
+
+from pathlib import Path
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+def play_game(app, players):
+    """One classic game through the HTTP routes and socket handlers"""
+    from extensions import socketio
+    from models import Frage, Lernfeld
+
+    clients = []
+    for n in range(players):
+        client = app.test_client()
+        client.post('/auth/guest_login', data={'guest_name': f"budget{n}"})
+        clients.append(client)
+    host = clients[0]
+
+    for path in ('/dashboard', '/admin/', '/leaderboard', '/leaderboard?zeitraum=woche', '/achievements', '/profile/stats', '/game/create'):
+        host.get(path)
+
+    with app.app_context():
+        # Lernfeld and difficulty with the most questions, so the game has a deck
+        from sqlalchemy import func
+        from extensions import db
+        lernfeld_id, schwierigkeit, _ = (
+            db.session.query(Frage.lernfeld_id, Frage.schwierigkeit, func.count(Frage.id))
+            .group_by(Frage.lernfeld_id, Frage.schwierigkeit)
+            .order_by(func.count(Frage.id).desc())
+            .first()
+        )
+    response = host.post('/game/create', data={
+        'lernfeld_id': lernfeld_id, 'modus': 'KLASSISCH', 'schwierigkeit': schwierigkeit.name
+    })
+    room_code = response.headers['Location'].rsplit('/', 1)[1]
+    host.get(f"/game/lobby/{room_code}")
+
+    sockets = [socketio.test_client(app, flask_test_client=client) for client in clients]
+    for sock in sockets:
+        sock.emit('join_game', {'room_code': room_code})
+    sockets[0].emit('start_game', {'room_code': room_code})
+
+    deadline = time.time() + 120
+    finished = False
+    while not finished and time.time() < deadline:
+        received = sockets[-1].get_received()
+        for message in received:
+            if message['name'] == 'game_over':
+                finished = True
+            elif message['name'] == 'new_question':
+                question = message['args'][0]
+                for n, sock in enumerate(sockets):
+                    options = question.get('antworten')
+                    answer = options[n % len(options)]['id'] if options else 'Subnetzmaske'
+                    sock.emit('submit_answer', {
+                        'room_code': room_code, 'frage_id': question['frage_id'],
+                        'answer': answer, 'time_elapsed': 2
+                    })
+        time.sleep(0.05)
+
+    for client in clients:
+        client.get(f"/game/results/{room_code}")
+        client.get('/dashboard')
+        client.get(f"/leaderboard?zeitraum=tag&lernfeld={lernfeld_id}")
+    host.get('/admin/')
+    for sock in sockets:
+        sock.disconnect()
+    return finished
+
+def main():
+    parser = argparse.ArgumentParser(description='Check SQL statement counts of routes and socket events')
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--repeat-threshold', type=int, default=5)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    os.environ.update(
+        QUERY_PROFILER_ENABLED='True',
+        QUERY_REPEAT_THRESHOLD=str(args.repeat_threshold),
+        QUERY_PROFILER_REPORT_SEK='0',
+        QUESTION_START_DELAY_SEK='0.1',
+        QUESTION_REVEAL_DELAY_SEK='0.1'
+    )
+    logging.disable(logging.WARNING)
+    from app import create_app
+    from utils.query_profiler import query_profiler
+
+    app = create_app('testing')
+    query_profiler.reset()
+    finished = play_game(app, args.players)
+
+    print(f"{args.players} players, game {'finished' if finished else 'did not finish'}\n")
+    print(f"{'scope':<32} {'calls':>6} {'avg':>7} {'max':>5} {'budget':>7}  repeated")
+    failed = not finished
+    for kind, name, stats in query_profiler.top_offenders(limit=None):
+        budget = budget_of(app, kind, name)
+        repeated = ', '.join(f"{count}x" for count in sorted(stats.repeated.values(), reverse=True))
+        flag = ''
+        if stats.over_budget or stats.repeated:
+            flag = '  <-- ' + ('over budget' if stats.over_budget else 'N+1 suspect')
+            failed = True
+        print(f"{kind + ' ' + name:<32} {stats.calls:>6} {stats.queries / stats.calls:>7.1f} "
+              f"{stats.max_queries:>5} {budget if budget is not None else '-':>7}  {repeated or '-'}{flag}")
+        for statement in stats.repeated:
+            print(f"{'':<34}{statement[:110]}")
+
+    sys.exit(1 if failed else 0)
+
+def budget_of(app, kind, name):
+    """Budget declared on a view or socket handler"""
+    if kind == 'http':
+        return getattr(app.view_functions.get(name), 'query_budget', None)
+    import socketio_events
+    return getattr(getattr(socketio_events, f"handle_{name}", None), 'query_budget', None)
+
+if __name__ == '__main__':
+    main()
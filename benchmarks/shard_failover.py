@@ -0,0 +1,140 @@
+# benchmarks/shard_failover.py - Check room sharding, event routing and failover between workers
+#
+# Usage: python benchmarks/shard_failover.py
+#
+# Starts the bundled message queue broker, the RESP stand-in as shared room
+# store and two app servers with SHARDING_ENABLED and fixed worker IDs.
+# A room is opened so that its host connects to the owning worker and the
+# player to the other one. Passes when
+#   - the player's answers, sent to the non-owner, are graded by the owner
+#     and answered with answer_result, and
+#   - after the owner is killed, the surviving worker adopts the room and
+#     sends the next question to the player and grades the answer.
+# Exits with status 1 otherwise.
+
+from pathlib import Path
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.cross_worker_broadcast import serve, start_worker, first_question_filter
+from benchmarks.sio_client import SocketIOClient
+
+WORKER_IDS = ('worker-a', 'worker-b')
+
+def answer_question(clients, room_code, timeout):
+    """Every client answers the next question wrong, returns the number of answer_result events"""
+    results = 0
+    for client in clients:
+        question = client.wait_for('new_question', timeout)
+        if question is None:
+            continue
+        client.clear()
+        client.emit('submit_answer', {
+            'room_code': room_code,
+            'frage_id': question['frage_id'],
+            'answer': -1,
+            'time_elapsed': 1
+        })
+    for client in clients:
+        if client.wait_for('answer_result', timeout) is not None:
+            results += 1
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Check room sharding and failover between worker processes')
+    parser.add_argument('--ports', default='5111,5112')
+    parser.add_argument('--queue-port', type=int, default=6392)
+    parser.add_argument('--store-port', type=int, default=6393)
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    from utils.message_queue import LocalBroker
+    from utils.resp import RespStandIn
+    from utils.sharding import owner_of
+    for server in (LocalBroker('127.0.0.1', args.queue_port), RespStandIn('127.0.0.1', args.store_port)):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    workdir = tempfile.mkdtemp(prefix='fisi-quiz-')
+    env = dict(os.environ,
+               SOCKETIO_MESSAGE_QUEUE=f"local://127.0.0.1:{args.queue_port}",
+               ROOM_STORE_URL=f"redis://127.0.0.1:{args.store_port}/0",
+               SHARDING_ENABLED='True',
+               SHARD_HEARTBEAT_SEK='0.5',
+               SHARD_WORKER_TIMEOUT_SEK='2',
+               DATABASE_URL=f"sqlite:///{workdir}/quiz_app.db",
+               RATELIMIT_ENABLED='False',
+               QUESTION_START_DELAY_SEK='0.5',
+               QUESTION_REVEAL_DELAY_SEK='3')
+    # This process only reads the database, it must not join the shards
+    os.environ['DATABASE_URL'] = env['DATABASE_URL']
+    ports = dict(zip(WORKER_IDS, (int(p) for p in args.ports.split(','))))
+
+    # The first worker creates and seeds the database before the second starts
+    workers = {}
+    for worker_id in WORKER_IDS:
+        workers[worker_id] = start_worker(ports[worker_id], dict(env, WORKER_ID=worker_id), __file__)
+    timeout = 15
+    routed_ok = failover_ok = False
+    try:
+        lernfeld_id, schwierigkeit = first_question_filter()
+        # Let both workers see each other
+        time.sleep(1.5)
+
+        # Open rooms until one is owned by worker A, its host connects there
+        host = SocketIOClient(f"http://127.0.0.1:{ports['worker-a']}")
+        host.guest_login('host')
+        room_code = host.create_game(lernfeld_id, schwierigkeit)
+        while owner_of(room_code, WORKER_IDS) != 'worker-a':
+            room_code = host.create_game(lernfeld_id, schwierigkeit)
+        host.connect()
+        host.emit('join_game', {'room_code': room_code})
+        host.wait_for('update_lobby')
+        print(f"Room {room_code} owned by worker-a (port {ports['worker-a']})")
+
+        player = SocketIOClient(f"http://127.0.0.1:{ports['worker-b']}")
+        player.guest_login('player')
+        player.connect()
+        player.emit('join_game', {'room_code': room_code})
+        lobby_ok = player.wait_for('update_lobby', timeout) is not None
+        print(f"Player on worker-b joined through routing: {lobby_ok}")
+
+        host.emit('start_game', {'room_code': room_code})
+        routed = answer_question([host, player], room_code, timeout)
+        routed_ok = lobby_ok and routed == 2
+        print(f"Answers graded by the owner, one of them routed from worker-b: {routed}/2")
+
+        # Kill the owner during the reveal pause, the host's connection dies with it
+        player.wait_for('question_closed', timeout)
+        player.clear()
+        workers.pop('worker-a').kill()
+        killed_at = time.time()
+        print("worker-a killed")
+        question = player.wait_for('new_question', timeout)
+        if question is not None:
+            print(f"worker-b resumed the room after {time.time() - killed_at:.1f} s")
+        after = answer_question([player], room_code, timeout)
+        failover_ok = question is not None and after == 1
+        print(f"Answers graded by worker-b after failover: {after}/1")
+        player.close()
+    finally:
+        for process in workers.values():
+            process.terminate()
+            process.wait()
+
+    ok = routed_ok and failover_ok
+    print('PASS' if ok else 'FAIL')
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# benchmarks/sio_client.py - Minimal stdlib Socket.IO client for benchmark scripts
+#
+# Speaks Engine.IO 4 long-polling, so scripts run without the optional
+# python-socketio client dependencies (requests, websocket-client). Each
+# client keeps its own cookie jar, i.e. its own Flask session.
+
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+import json
+import threading
+import time
+import urllib.request
+
+SEPARATOR = '\x1e'
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class SocketIOClient:
+    """Logged-in browser stand-in: HTTP form posts plus a Socket.IO connection"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar()), _NoRedirect()
+        )
+        self.sid = None
+        self.events = []
+        self.connected = threading.Event()
+        self.closed = False
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._thread = None
+        # Optional callback(name, data, received_at) for every event
+        self.on_event = None
+
+    # HTTP
+
+    def post_form(self, path, data):
+        """POST a form, returns (status, Location header)"""
+        request = urllib.request.Request(
+            self.base_url + path, data=urlencode(data).encode('utf-8'), method='POST'
+        )
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.headers.get('Location')
+        except HTTPError as e:
+            return e.code, e.headers.get('Location')
+
+    def guest_login(self, name):
+        return self.post_form('/auth/guest_login', {'guest_name': name})
+
+    def create_game(self, lernfeld_id, schwierigkeit, modus='KLASSISCH'):
+        """Create a game room, returns its room code"""
+        status, location = self.post_form('/game/create', {
+            'lernfeld_id': lernfeld_id, 'modus': modus, 'schwierigkeit': schwierigkeit
+        })
+        if not location or '/game/' not in location:
+            raise RuntimeError(f"Game creation failed with status {status}")
+        return location.rstrip('/').rsplit('/', 1)[1]
+
+    # Engine.IO long-polling
+
+    def _url(self):
+        query = {'EIO': 4, 'transport': 'polling', 't': f"{time.time():.6f}"}
+        if self.sid:
+            query['sid'] = self.sid
+        return f"{self.base_url}/socket.io/?{urlencode(query)}"
+
+    def _get(self):
+        with self.opener.open(self._url(), timeout=self.timeout + 30) as response:
+            return response.read().decode('utf-8')
+
+    def _post(self, body):
+        request = urllib.request.Request(self._url(), data=body.encode('utf-8'), method='POST')
+        request.add_header('Content-Type', 'text/plain;charset=UTF-8')
+        with self.opener.open(request, timeout=self.timeout) as response:
+            response.read()
+
+    def connect(self):
+        """Open the Engine.IO session and the default Socket.IO namespace"""
+        handshake = self._get()
+        if not handshake.startswith('0'):
+            raise RuntimeError(f"Unexpected handshake: {handshake[:80]}")
+        self.sid = json.loads(handshake[1:])['sid']
+        self._post('40')
+        self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+        self._thread.start()
+        if not self.connected.wait(self.timeout):
+            raise RuntimeError('Socket.IO namespace connect timed out')
+
+    def _poll_loop(self):
+        while not self.closed:
+            try:
+                payload = self._get()
+            except Exception:
+                self.closed = True
+                break
+            for packet in payload.split(SEPARATOR):
+                self._handle_packet(packet)
+
+    def _handle_packet(self, packet):
+        if packet == '2':
+            # Engine.IO ping
+            self._post('3')
+        elif packet.startswith('40'):
+            self.connected.set()
+        elif packet.startswith('42'):
+            received_at = time.perf_counter()
+            message = json.loads(packet[2:])
+            name, data = message[0], message[1] if len(message) > 1 else None
+            if self.on_event:
+                self.on_event(name, data, received_at)
+            with self._cond:
+                self.events.append((name, data))
+                self._cond.notify_all()
+        elif packet == '1':
+            self.closed = True
+
+    def emit(self, event, data=None):
+        self._post('42' + json.dumps([event, data], separators=(',', ':')))
+
+    def wait_for(self, name, timeout=None):
+        """Block until an event with this name arrived, returns its data or None"""
+        deadline = time.time() + (self.timeout if timeout is None else timeout)
+        with self._cond:
+            while True:
+                for event_name, data in self.events:
+                    if event_name == name:
+                        return data
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def received(self):
+        with self._lock:
+            return [name for name, _ in self.events]
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+
+    def close(self):
+        if self.sid and not self.closed:
+            self.closed = True
+            try:
+                self._post('41')
+                self._post('1')
+            except Exception:
+                pass
@@ -59,6 +59,65 @@ class Config:
     MAX_PLAYERS_PER_GAME = int(os.environ.get('MAX_PLAYERS_PER_GAME', 50))
     MAX_QUESTIONS_PER_QUIZ = int(os.environ.get('MAX_QUESTIONS_PER_QUIZ', 100))
     
+    # Game timing (handled by the room scheduler)
+    QUESTION_START_DELAY_SEK = float(os.environ.get('QUESTION_START_DELAY_SEK', 2))
+    QUESTION_REVEAL_DELAY_SEK = float(os.environ.get('QUESTION_REVEAL_DELAY_SEK', 3))
+    QUESTION_GRACE_SEK = float(os.environ.get('QUESTION_GRACE_SEK', 1))  # Network latency allowance
+    SCHEDULER_TICK_MS = int(os.environ.get('SCHEDULER_TICK_MS', 100))
+    SCORE_BATCH_MS = int(os.environ.get('SCORE_BATCH_MS', 200))  # Coalescing window for scores_batch
+    RANKING_TOP_K = int(os.environ.get('RANKING_TOP_K', 10))  # Players in the ranking_update sent at question close
+    USER_STATS_FLUSH_SEK = float(os.environ.get('USER_STATS_FLUSH_SEK', 5))  # Write-behind interval for user stats
+    LEADERBOARD_SYNC_SEK = float(os.environ.get('LEADERBOARD_SYNC_SEK', 30))  # Reread leaderboard rows of other workers
+    # Period leaderboards: calendar of LEADERBOARD_TIMEZONE, buckets kept per period
+    LEADERBOARD_TIMEZONE = os.environ.get('LEADERBOARD_TIMEZONE', 'Europe/Berlin')
+    LEADERBOARD_KEEP_DAYS = int(os.environ.get('LEADERBOARD_KEEP_DAYS', 14))
+    LEADERBOARD_KEEP_WEEKS = int(os.environ.get('LEADERBOARD_KEEP_WEEKS', 8))
+    LEADERBOARD_KEEP_MONTHS = int(os.environ.get('LEADERBOARD_KEEP_MONTHS', 12))
+    LEADERBOARD_EXPIRE_SEK = float(os.environ.get('LEADERBOARD_EXPIRE_SEK', 3600))
+    ADMIN_STATS_RECONCILE_SEK = float(os.environ.get('ADMIN_STATS_RECONCILE_SEK', 300))  # Recount cached admin dashboard counters
+    
+    # Text answer matching: damerau, levenshtein or difflib (original SequenceMatcher decisions)
+    TEXT_MATCH_MODE = os.environ.get('TEXT_MATCH_MODE', 'damerau')
+    # Buffer TEXT answers and grade them in one batch when the question closes
+    GRADE_TEXT_AT_CLOSE = os.environ.get('GRADE_TEXT_AT_CLOSE', 'False').lower() == 'true'
+    
+    # Concurrency model of the SocketIO server: threading, eventlet, gevent or asgi.
+    # gunicorn.conf.py picks the matching worker class; asgi is set by asgi.py,
+    # which serves the same handlers on python-socketio's AsyncServer
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 64))  # Handler thread pool of asgi.py
+    
+    # Scaling: SocketIO message queue shared by all workers
+    # (redis://, amqp://, kafka:// or local://host:port, see utils/message_queue.py)
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'fisi-quiz')
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))  # Gunicorn worker processes
+    # Long-polling needs every request of a client on the same worker; without a
+    # sticky load balancer several workers only work with websocket transport
+    STICKY_SESSIONS = os.environ.get('STICKY_SESSIONS', 'False').lower() == 'true'
+    SOCKETIO_TRANSPORTS = ['polling', 'websocket'] if WEB_CONCURRENCY == 1 or STICKY_SESSIONS else ['websocket']
+    # Shared room state: memory:// (one process), sqlite:////dev/shm/fisi-rooms.db (one host)
+    # or redis://host:6379/0 (several hosts, see utils/room_store.py)
+    ROOM_STORE_URL = os.environ.get('ROOM_STORE_URL', 'memory://')
+    # Room sharding: one worker owns each running room, events of other workers
+    # are forwarded to it (needs a message queue and a shared room store)
+    SHARDING_ENABLED = os.environ.get('SHARDING_ENABLED', 'False').lower() == 'true'
+    WORKER_ID = os.environ.get('WORKER_ID') or None  # Default: hostname-pid, keep unset under Gunicorn
+    SHARD_HEARTBEAT_SEK = float(os.environ.get('SHARD_HEARTBEAT_SEK', 2))
+    SHARD_WORKER_TIMEOUT_SEK = float(os.environ.get('SHARD_WORKER_TIMEOUT_SEK', 6))  # Rooms of silent workers move
+    
+    # Monitoring: per-event latency, errors and queries, Prometheus text format at /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'False').lower() == 'true'
+    # /metrics needs "Authorization: Bearer <token>"; required when enabled outside development
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+    # Query profiler: statements per route/socket event, identical statements repeated
+    # QUERY_REPEAT_THRESHOLD times are logged as N+1 suspects, top offenders every
+    # QUERY_PROFILER_REPORT_SEK; strict mode raises when a declared budget is exceeded
+    QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'False').lower() == 'true'
+    QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False').lower() == 'true'
+    QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5))
+    QUERY_PROFILER_REPORT_SEK = float(os.environ.get('QUERY_PROFILER_REPORT_SEK', 300))
+    
     # Server settings - Default to network accessible
     FLASK_HOST = os.environ.get('FLASK_HOST', '0.0.0.0')  # Allow external connections
     FLASK_PORT = int(os.environ.get('FLASK_PORT', 5000))
@@ -0,0 +1,23 @@
+# gunicorn.conf.py - Gunicorn settings derived from SOCKETIO_ASYNC_MODE
+#
+# Gunicorn loads this file from the working directory, so Procfile and
+# render.yaml only name the app. The worker class always matches the async
+# mode create_app() configures for Flask-SocketIO.
+
+import os
+
+WORKER_CLASSES = {
+    'threading': 'gthread',
+    'eventlet': 'eventlet',
+    'gevent': 'geventwebsocket.gunicorn.workers.GeventWebSocketWorker',
+}
+
+async_mode = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
+if async_mode not in WORKER_CLASSES:
+    raise RuntimeError(f"SOCKETIO_ASYNC_MODE={async_mode} cannot run on Gunicorn (asgi: uvicorn asgi:application)")
+
+worker_class = WORKER_CLASSES[async_mode]
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+# Threads per worker, only used by the threading mode
+threads = int(os.environ.get('GUNICORN_THREADS', 100))
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
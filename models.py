@@ -186,6 +186,10 @@ class SpielSitzung(db.Model):
     schwierigkeit_level = db.Column(SQLEnum(Schwierigkeit), nullable=False)
     
     aktueller_frage_index = db.Column(db.Integer, default=0)
+    # Shuffled question IDs drawn at game start; aktueller_frage_index points into it
+    fragen_deck = db.Column(JSON, nullable=True)
+    # Immutable final standings written once when the game ends
+    ergebnis = db.Column(JSON, nullable=True)
     ist_aktiv = db.Column(db.Boolean, default=True)
     
     lernfeld_id = db.Column(db.Integer, db.ForeignKey('lernfeld.id'), nullable=False)
@@ -223,17 +227,47 @@ class SpielTeilnahme(db.Model):
     hat_ueberlebt = db.Column(db.Boolean, default=True)
     ausgeschieden_bei_frage = db.Column(db.Integer, default=0)  # 0 = Nicht ausgeschieden
     
-    # Answer tracking
-    answers_data = db.Column(JSON, default=list)  # Store answer history
+    # Legacy answer history, moved to SpielAntwort by `flask migrate-answers`
+    answers_data = db.Column(JSON, nullable=True)
     
     joined_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     
+    # Relationships
+    antworten = db.relationship('SpielAntwort', backref='teilnahme', lazy='dynamic', cascade='all, delete-orphan')
+    
     # Unique constraint
     __table_args__ = (db.UniqueConstraint('sitzung_id', 'user_id', name='_user_sitzung_uc'),)
     
     def __repr__(self):
         return f'<SpielTeilnahme User:{self.user_id} Sitzung:{self.sitzung_id}>'
 
+class SpielAntwort(db.Model):
+    """Single answer of a player to a question (append-only)"""
+    __tablename__ = 'spiel_antwort'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    teilnahme_id = db.Column(db.Integer, db.ForeignKey('spiel_teilnahme.id'), nullable=False)
+    sitzung_id = db.Column(db.Integer, db.ForeignKey('spiel_sitzung.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # No foreign key: answer history outlives deleted questions
+    frage_id = db.Column(db.Integer, nullable=False)
+    
+    answer = db.Column(JSON)  # Answer ID(s) for MC or text
+    is_correct = db.Column(db.Boolean, default=False)
+    points_earned = db.Column(db.Integer, default=0)
+    time_elapsed = db.Column(db.Float, default=0)
+    
+    answered_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        db.UniqueConstraint('teilnahme_id', 'frage_id', name='_teilnahme_frage_uc'),
+        db.Index('ix_spiel_antwort_sitzung_frage', 'sitzung_id', 'frage_id'),
+        db.Index('ix_spiel_antwort_user', 'user_id'),
+    )
+    
+    def __repr__(self):
+        return f'<SpielAntwort Teilnahme:{self.teilnahme_id} Frage:{self.frage_id}>'
+
 class Achievement(db.Model):
     """Achievement definitions"""
     __tablename__ = 'achievement'
@@ -286,6 +320,34 @@ class AchievementStatus(db.Model):
     def __repr__(self):
         return f'<AchievementStatus User:{self.user_id} Achievement:{self.achievement_id}>'
 
+class RanglistenEintrag(db.Model):
+    """Rollup of the global leaderboard, loaded into utils.leaderboard on start"""
+    __tablename__ = 'ranglisten_eintrag'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    punkte = db.Column(db.Integer, nullable=False, default=0, index=True)
+    # Workers pick up rows changed by others since their last sync
+    aktualisiert_am = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<RanglistenEintrag User:{self.user_id} {self.punkte}>'
+
+class ZeitraumPunkte(db.Model):
+    """FiSi-Punkte per period bucket and Lernfeld, rolled up at game end (utils.period_leaderboard)"""
+    __tablename__ = 'zeitraum_punkte'
+    
+    zeitraum = db.Column(db.String(10), primary_key=True)  # 'tag', 'woche', 'monat', 'gesamt'
+    bucket = db.Column(db.String(10), primary_key=True)  # '2026-10-16', '2026-W42', '2026-10', '' (gesamt)
+    lernfeld_id = db.Column(db.Integer, primary_key=True)  # 0 = alle Lernfelder
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    punkte = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Top-k of one bucket is a backwards range scan
+    __table_args__ = (db.Index('ix_zeitraum_punkte_rangliste', 'zeitraum', 'bucket', 'lernfeld_id', 'punkte'),)
+    
+    def __repr__(self):
+        return f'<ZeitraumPunkte {self.zeitraum} {self.bucket} LF:{self.lernfeld_id} User:{self.user_id} {self.punkte}>'
+
 # Legacy models for compatibility with existing flask-quiz-app
 class Game(db.Model):
     """Legacy game model for backward compatibility"""
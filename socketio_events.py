@@ -1,28 +1,48 @@
 # socketio_events.py - Real-time SocketIO event handlers
 
-from flask import session, request
+from flask import session, request, current_app
 from flask_socketio import emit, join_room, leave_room, rooms
 from extensions import socketio, db
-from models import (
-    SpielSitzung, SpielTeilnahme, User, Frage, Antwort,
-    TextAntwortSchluessel, Fragetyp, Achievement, AchievementStatus
-)
+from models import SpielSitzung, SpielTeilnahme, User, Fragetyp
+from utils import game_room
+from utils.game_room import get_room, load_room, open_room, close_room, draw_deck
+from utils.room_scheduler import scheduler
+from utils.room_store import room_store
+from utils.sharding import shard_router
+from utils.metrics import metrics
+from utils.query_profiler import query_profiler
+from utils.score_batcher import score_batcher
+from utils.user_stats import user_stats
+from utils.achievements import achievement_engine
+from utils.answer_keys import LANGUAGES, answer_keys, grade_answer
+from utils.batch_grader import grade_batch
+from utils.question_payloads import question_payloads, shuffled_order
 from datetime import datetime, timezone
 import logging
-import random
-from difflib import SequenceMatcher
 
 logger = logging.getLogger(__name__)
 
-# Store active connections
-active_connections = {}
+def host_room(room_code):
+    """SocketIO room that only the game host joins"""
+    return f"{room_code}:host"
+
+def lang_room(room_code, lang):
+    """SocketIO sub-room of the players of a game using one language"""
+    return f"{room_code}:{lang if lang in LANGUAGES else LANGUAGES[0]}"
+
+def user_room(user_id):
+    """Personal SocketIO room of a user, reachable outside request context"""
+    return f"user:{user_id}"
 
 @socketio.on('connect')
+@metrics.socket_event
 def handle_connect():
     """Handle client connection"""
+    metrics.connection_opened()
     user_id = session.get('user_id')
     if user_id:
-        active_connections[request.sid] = user_id
+        room_store.set_connection(request.sid, user_id)
+        join_room(user_room(user_id))
         logger.info(f"User {user_id} connected (sid: {request.sid})")
         emit('connected', {'status': 'success'})
     else:
@@ -30,13 +50,18 @@ def handle_connect():
         emit('error', {'message': 'Not authenticated'})
 
 @socketio.on('disconnect')
+@metrics.socket_event
 def handle_disconnect():
     """Handle client disconnection"""
-    user_id = active_connections.pop(request.sid, None)
+    metrics.connection_closed()
+    user_id = room_store.pop_connection(request.sid)
     if user_id:
         logger.info(f"User {user_id} disconnected (sid: {request.sid})")
 
 @socketio.on('join_game')
+@shard_router.routed
+@metrics.socket_event
+@query_profiler.budget(10)
 def handle_join_game(data):
     """Player joins a game room"""
     user_id = session.get('user_id')
@@ -46,58 +71,96 @@ def handle_join_game(data):
         emit('error', {'message': 'Invalid request'})
         return
     
-    # Get game session
-    sitzung = SpielSitzung.query.filter_by(raum_code=room_code).first()
-    user = User.query.get(user_id)
-    
-    if not sitzung or not user:
-        emit('error', {'message': 'Game or user not found'})
-        return
+    # Running games are served from memory
+    room = load_room(room_code)
+    player = room.get_player(user_id) if room else None
     
-    # Join SocketIO room
-    join_room(room_code)
-    logger.info(f"User {user.username} joined room {room_code}")
-    
-    # Get or create participation
-    teilnahme = SpielTeilnahme.query.filter_by(
-        sitzung_id=sitzung.id,
-        user_id=user.id
-    ).first()
-    
-    if not teilnahme:
-        teilnahme = SpielTeilnahme(
+    if not player:
+        # Get game session
+        sitzung = SpielSitzung.query.filter_by(raum_code=room_code).first()
+        user = User.query.get(user_id)
+        
+        if not sitzung or not user:
+            emit('error', {'message': 'Game or user not found'})
+            return
+        
+        # Get or create participation
+        teilnahme = SpielTeilnahme.query.filter_by(
             sitzung_id=sitzung.id,
             user_id=user.id
-        )
-        db.session.add(teilnahme)
-        db.session.commit()
+        ).first()
+        
+        if not teilnahme:
+            teilnahme = SpielTeilnahme(
+                sitzung_id=sitzung.id,
+                user_id=user.id
+            )
+            db.session.add(teilnahme)
+            db.session.commit()
+        
+        if room:
+            player = room.add_player(teilnahme, user.username)
+    
+    # Join SocketIO room and the sub-room of the player's language
+    lang = session.get('lang', 'de')
+    join_room(room_code)
+    for room_lang in LANGUAGES:
+        if lang_room(room_code, room_lang) != lang_room(room_code, lang):
+            leave_room(lang_room(room_code, room_lang))
+    join_room(lang_room(room_code, lang))
+    
+    if room:
+        is_host = room.ersteller_id == user_id
+        username = player.username
+        teilnehmer_list = [p.to_dict() for p in room.players.values()]
+        lobby_state = {
+            'modus': room.modus.value,
+            'schwierigkeit': room.schwierigkeit.value,
+            'lernfeld': room.lernfeld_namen.get(lang, room.lernfeld_namen['en']),
+            'is_active': room.is_active
+        }
+    else:
+        is_host = sitzung.ersteller_id == user_id
+        username = user.username
+        # Lobby participants in a single joined query
+        teilnehmer_list = [
+            {'user_id': t_user_id, 'username': t_username, 'score': score}
+            for t_user_id, t_username, score in (
+                db.session.query(User.id, User.username, SpielTeilnahme.aktueller_punktestand)
+                .join(SpielTeilnahme, User.id == SpielTeilnahme.user_id)
+                .filter(SpielTeilnahme.sitzung_id == sitzung.id)
+                .all()
+            )
+        ]
+        lobby_state = {
+            'modus': sitzung.modus.value,
+            'schwierigkeit': sitzung.schwierigkeit_level.value,
+            'lernfeld': sitzung.lernfeld.get_name(lang),
+            'is_active': sitzung.ist_aktiv
+        }
+    
+    if is_host:
+        join_room(host_room(room_code))
+    
+    logger.info(f"User {username} joined room {room_code}")
     
     # Broadcast player joined to all in room
     emit('player_joined', {
-        'user_id': user.id,
-        'username': user.username,
-        'player_count': sitzung.teilnahmen.count()
+        'user_id': user_id,
+        'username': username,
+        'player_count': len(teilnehmer_list)
     }, room=room_code)
     
     # Send current lobby state to joining player
-    teilnehmer_list = []
-    for t in sitzung.teilnahmen:
-        teilnehmer_list.append({
-            'user_id': t.spieler.id,
-            'username': t.spieler.username,
-            'score': t.aktueller_punktestand
-        })
-    
     emit('update_lobby', {
         'room_code': room_code,
-        'modus': sitzung.modus.value,
-        'schwierigkeit': sitzung.schwierigkeit_level.value,
-        'lernfeld': sitzung.lernfeld.get_name(session.get('lang', 'de')),
         'teilnehmer': teilnehmer_list,
-        'is_active': sitzung.ist_aktiv
+        **lobby_state
     })
 
 @socketio.on('leave_game')
+@shard_router.routed
+@metrics.socket_event
 def handle_leave_game(data):
     """Player leaves a game room"""
     user_id = session.get('user_id')
@@ -105,16 +168,27 @@ def handle_leave_game(data):
     
     if room_code:
         leave_room(room_code)
-        user = User.query.get(user_id)
-        logger.info(f"User {user.username if user else user_id} left room {room_code}")
+        for lang in LANGUAGES:
+            leave_room(lang_room(room_code, lang))
+        room = get_room(room_code)
+        player = room.get_player(user_id) if room else None
+        if player:
+            username = player.username
+        else:
+            user = User.query.get(user_id)
+            username = user.username if user else None
+        logger.info(f"User {username or user_id} left room {room_code}")
         
         # Broadcast player left
         emit('player_left', {
             'user_id': user_id,
-            'username': user.username if user else 'Unknown'
+            'username': username or 'Unknown'
         }, room=room_code)
 
 @socketio.on('start_game')
+@shard_router.routed
+@metrics.socket_event
+@query_profiler.budget(15)
 def handle_start_game(data):
     """Host starts the game"""
     user_id = session.get('user_id')
@@ -126,79 +200,266 @@ def handle_start_game(data):
         emit('error', {'message': 'Unauthorized or game not found'})
         return
     
-    # Update game state
+    # Update game state and draw the question deck once
     sitzung.started_at = datetime.now(timezone.utc)
     sitzung.aktueller_frage_index = 0
+    sitzung.fragen_deck = draw_deck(sitzung, current_app.config['MAX_QUESTIONS_PER_QUIZ'])
     db.session.commit()
     
+    # Load session, participants and questions into memory once
+    open_room(sitzung)
+    
     logger.info(f"Game {room_code} started by user {user_id}")
     
-    # Broadcast game started
-    emit('game_started', {
-        'room_code': room_code,
-        'message': 'Spiel startet!' if session.get('lang', 'de') == 'de' else 'Game starting!'
-    }, room=room_code)
+    # Broadcast game started, localized per language sub-room
+    for lang in LANGUAGES:
+        emit('game_started', {
+            'room_code': room_code,
+            'message': 'Spiel startet!' if lang == 'de' else 'Game starting!'
+        }, room=lang_room(room_code, lang))
     
     # Send first question after a short delay
-    socketio.sleep(2)
-    send_next_question(room_code)
+    scheduler.schedule(
+        current_app.config['QUESTION_START_DELAY_SEK'],
+        room_code, advance_after, room_code, None
+    )
 
 def send_next_question(room_code):
     """Send the next question to all players"""
-    sitzung = SpielSitzung.query.filter_by(raum_code=room_code).first()
-    if not sitzung:
+    room = get_room(room_code)
+    if not room:
         return
     
-    # Get questions for this game
-    fragen = Frage.query.filter_by(
-        lernfeld_id=sitzung.lernfeld_id,
-        schwierigkeit=sitzung.schwierigkeit_level
-    ).all()
+    # Answers buffered for a question the host skipped before it closed
+    if room.current_frage_id is not None:
+        reveal_deferred(room_code, room, room.current_frage_id)
     
-    if not fragen:
+    # Persist the closed question before opening the next one
+    room.checkpoint()
+    
+    # Take the next question from the pre-drawn deck
+    frage = room.advance()
+    if not frage:
         # No more questions, end game
         end_game(room_code)
         return
+    frage_nummer = room.frage_index
     
-    # Select random question if not already selected
-    if sitzung.aktueller_frage_index >= len(fragen):
-        end_game(room_code)
+    # Cached localized payloads, one answer order for all languages
+    order = shuffled_order(frage) if frage.typ == Fragetyp.MC else None
+    
+    logger.info(f"Sending question {frage.id} to room {room_code}")
+    
+    # Broadcast question to each language sub-room
+    for lang in LANGUAGES:
+        socketio.emit(
+            'new_question',
+            question_payloads.get(frage, lang).render(frage_nummer, order),
+            room=lang_room(room_code, lang)
+        )
+    
+    # Close the question when its timer runs out
+    scheduler.schedule(
+        frage.zeitlimit_sek + current_app.config['QUESTION_GRACE_SEK'],
+        room_code, close_current_question, room_code, frage.id
+    )
+
+def advance_after(room_code, frage_id):
+    """Scheduled advance, skipped if the room moved on in the meantime"""
+    room = get_room(room_code)
+    if room and room.current_frage_id == frage_id:
+        send_next_question(room_code)
+
+def close_current_question(room_code, frage_id):
+    """Close a question (all answered or timer expired) and schedule the next one"""
+    room = get_room(room_code)
+    if not room or not room.close_question(frage_id):
         return
     
-    # Get random question
-    frage = random.choice(fragen)
-    sitzung.aktueller_frage_index += 1
-    db.session.commit()
+    # Grade answers buffered in grade-at-close mode
+    reveal_deferred(room_code, room, frage_id)
     
-    lang = session.get('lang', 'de')
+    # Deliver outstanding score changes before the reveal
+    score_batcher.flush(room_code)
+    broadcast_ranking(room_code, room, frage_id)
+    
+    answered_count, total_players = room.answer_progress(frage_id)
+    logger.info(f"Question {frage_id} closed in room {room_code} ({answered_count}/{total_players} answered)")
+    
+    socketio.emit('question_closed', {
+        'frage_id': frage_id,
+        'answered': answered_count,
+        'total': total_players
+    }, room=room_code)
+    
+    # Short delay to show results
+    scheduler.schedule(
+        current_app.config['QUESTION_REVEAL_DELAY_SEK'],
+        room_code, advance_after, room_code, frage_id
+    )
+
+def broadcast_ranking(room_code, room, frage_id):
+    """Send the top players and all rank changes to the room, and every player their own rank"""
+    rows = room.close_ranking_round()
+    total = len(rows)
+    top_k = current_app.config['RANKING_TOP_K']
+    
+    socketio.emit('ranking_update', {
+        'frage_id': frage_id,
+        'total': total,
+        'top': [
+            {'rank': rank, 'user_id': user_id, 'username': room.players[user_id].username, 'score': score}
+            for rank, user_id, score, _, _ in rows[:top_k]
+        ],
+        # [user_id, rank, change] of players who moved, change > 0 means places gained
+        'deltas': [
+            [user_id, rank, previous_rank - rank]
+            for rank, user_id, _, previous_rank, _ in rows
+            if previous_rank is not None and previous_rank != rank
+        ]
+    }, room=room_code)
+    
+    for rank, user_id, score, previous_rank, points_to_next in rows:
+        socketio.emit('your_rank', {
+            'room_code': room_code,
+            'frage_id': frage_id,
+            'rank': rank,
+            'previous_rank': previous_rank,
+            'change': previous_rank - rank if previous_rank is not None else 0,
+            'score': score,
+            'points_to_next': points_to_next,
+            'total': total
+        }, room=user_room(user_id))
+
+def resume_room(room_code):
+    """Re-arm the pending deadline of a room restored after a restart or taken over from another worker"""
+    room = get_room(room_code)
+    if not room:
+        return
+    
+    frage_id, closed = room.sync_phase()
+    frage = room.get_question(frage_id) if frage_id else None
+    if frage is None:
+        # Started, first question not sent yet
+        scheduler.schedule(
+            current_app.config['QUESTION_START_DELAY_SEK'],
+            room_code, advance_after, room_code, frage_id
+        )
+    elif closed:
+        scheduler.schedule(
+            current_app.config['QUESTION_REVEAL_DELAY_SEK'],
+            room_code, advance_after, room_code, frage_id
+        )
+    else:
+        # The question timer restarts in full, late answers are still accepted
+        scheduler.schedule(
+            frage.zeitlimit_sek + current_app.config['QUESTION_GRACE_SEK'],
+            room_code, close_current_question, room_code, frage_id
+        )
+
+def hand_over_room(room_code):
+    """Stop serving a room that moved to another worker"""
+    room = get_room(room_code)
+    if not room:
+        return
+    scheduler.cancel_room(room_code)
+    # Buffered answers are graded now, the next owner cannot see them
+    if room.current_frage_id is not None:
+        reveal_deferred(room_code, room, room.current_frage_id)
+    score_batcher.flush(room_code)
+
+game_room.on_restore = resume_room
+shard_router.on_release = hand_over_room
+
+def calculate_points(frage, time_elapsed):
+    """Points for a correct answer: base points plus up to 50 % time bonus"""
+    # Time bonus: faster answers get more points
+    time_bonus = max(0, 1 - (time_elapsed / frage.zeitlimit_sek)) * 0.5
+    return int(frage.punkte * (1 + time_bonus))
+
+def apply_answer(room_code, room, player, frage, answer, is_correct, time_elapsed):
+    """Score a graded answer and queue its side effects, returns (points_earned, total_score)"""
+    # Calculate points
+    points_earned = calculate_points(frage, time_elapsed) if is_correct else 0
+    metrics.answer()
+    
+    with room.lock:
+        if is_correct:
+            # Update participation
+            room.add_points(player, points_earned)
+        elif room.is_survival:
+            # Survival mode logic
+            player.hat_ueberlebt = False
+            player.ausgeschieden_bei_frage = room.frage_index
+        
+        # Store answer in history
+        room.record_answer(player, frage.id, answer, is_correct, points_earned, time_elapsed)
+        total_score = player.score
+    
+    achievement_engine.on_answer(room_code, player.user_id, is_correct)
+    
+    # Buffer user stats, written in batches by the scheduler
+    if user_stats.record_answer(player.user_id, is_correct, points_earned):
+        scheduler.schedule(
+            current_app.config['USER_STATS_FLUSH_SEK'],
+            'user_stats', user_stats.flush
+        )
+    
+    logger.info(f"User {player.user_id} answered question {frage.id}: {'correct' if is_correct else 'wrong'}")
     
-    # Prepare question data
-    question_data = {
-        'frage_id': frage.id,
-        'frage_text': frage.get_text(lang),
-        'typ': frage.typ.value,
-        'zeitlimit_sek': frage.zeitlimit_sek,
-        'frage_nummer': sitzung.aktueller_frage_index,
-        'punkte': frage.get_points()
-    }
-    
-    # Add answers for MC questions
-    if frage.typ == Fragetyp.MC:
-        antworten = []
-        for antwort in frage.antworten:
-            antworten.append({
-                'id': antwort.id,
-                'text': antwort.get_text(lang)
+    # Queue score update for the next room broadcast
+    if score_batcher.add(room_code, player.user_id, player.username, total_score, points_earned):
+        scheduler.schedule(
+            current_app.config['SCORE_BATCH_MS'] / 1000,
+            room_code, score_batcher.flush, room_code
+        )
+    
+    return points_earned, total_score
+
+def reveal_deferred(room_code, room, frage_id):
+    """Grade buffered TEXT answers of a question in one batch and broadcast the results"""
+    deferred = room.take_deferred(frage_id)
+    frage = room.get_question(frage_id)
+    if not deferred or not frage:
+        return
+    
+    # One batch per answer language, keywords differ between languages
+    by_lang = {}
+    for entry in deferred:
+        by_lang.setdefault(entry[1], []).append(entry)
+    
+    results = []
+    for lang, entries in by_lang.items():
+        key = answer_keys.get(frage_id, lang)
+        if key is None:
+            continue
+        graded = grade_batch(key, [answer for _, _, answer, _ in entries])
+        for (user_id, _, answer, time_elapsed), (is_correct, correct_answer) in zip(entries, graded):
+            player = room.get_player(user_id)
+            if player is None:
+                continue
+            points_earned, total_score = apply_answer(
+                room_code, room, player, frage, answer, is_correct, time_elapsed
+            )
+            results.append({
+                'user_id': user_id,
+                'is_correct': is_correct,
+                'points_earned': points_earned,
+                'correct_answer': correct_answer,
+                'total_score': total_score
             })
-        random.shuffle(antworten)  # Randomize answer order
-        question_data['antworten'] = antworten
     
-    logger.info(f"Sending question {frage.id} to room {room_code}")
+    logger.info(f"Graded {len(results)} buffered answers to question {frage_id} in room {room_code}")
     
-    # Broadcast question to all players
-    socketio.emit('new_question', question_data, room=room_code)
+    socketio.emit('answers_revealed', {
+        'frage_id': frage_id,
+        'results': results
+    }, room=room_code)
 
 @socketio.on('submit_answer')
+@shard_router.routed
+@metrics.socket_event
+@query_profiler.budget(2)
 def handle_submit_answer(data):
     """Player submits an answer"""
     user_id = session.get('user_id')
@@ -211,154 +472,93 @@ def handle_submit_answer(data):
         emit('error', {'message': 'Invalid request'})
         return
     
-    sitzung = SpielSitzung.query.filter_by(raum_code=room_code).first()
-    teilnahme = SpielTeilnahme.query.filter_by(
-        sitzung_id=sitzung.id,
-        user_id=user_id
-    ).first()
-    frage = Frage.query.get(frage_id)
+    room = load_room(room_code)
+    player = room.get_player(user_id) if room else None
+    frage = room.get_question(frage_id) if room else None
+    # Compiled answer key, TEXT keywords are per language
+    key = answer_keys.get(frage_id, session.get('lang', 'de')) if frage else None
     
-    if not all([sitzung, teilnahme, frage]):
+    if not all([room, player, frage, key]):
         emit('error', {'message': 'Data not found'})
         return
     
-    # Check if player already answered this question
-    answers_data = teilnahme.answers_data or []
-    if any(a.get('frage_id') == frage_id for a in answers_data):
-        emit('error', {'message': 'Already answered'})
+    # Answers to earlier or already closed questions are not graded
+    if not room.is_open(frage_id):
+        emit('error', {'message': 'Question closed'})
+        return
+    
+    # Grade-at-close mode: acknowledge now, grade the whole batch when the question closes
+    if frage.typ == Fragetyp.TEXT and current_app.config['GRADE_TEXT_AT_CLOSE']:
+        with room.lock:
+            # Checked again under the lock, the buffer is graded once the question closed
+            if not room.is_open(frage_id):
+                emit('error', {'message': 'Question closed'})
+                return
+            if not room.register_answer(user_id, frage_id):
+                emit('error', {'message': 'Already answered'})
+                return
+            room.defer_answer(frage_id, user_id, key.lang, answer, time_elapsed)
+        emit('answer_received', {'frage_id': frage_id})
+        check_all_answered(room_code, frage_id)
         return
     
     # Validate answer
-    is_correct = False
-    correct_answer = None
-    
-    if frage.typ == Fragetyp.MC:
-        # Multiple choice validation
-        if isinstance(answer, list):
-            # Multiple correct answers possible
-            correct_ids = [a.id for a in frage.antworten if a.ist_korrekt]
-            is_correct = set(answer) == set(correct_ids)
-        else:
-            # Single answer
-            antwort = Antwort.query.get(answer)
-            is_correct = antwort and antwort.ist_korrekt
-        
-        correct_answer = [a.id for a in frage.antworten if a.ist_korrekt]
-    
-    elif frage.typ == Fragetyp.TEXT:
-        # Text answer validation with fuzzy matching
-        lang = session.get('lang', 'de')
-        schluessel = TextAntwortSchluessel.query.filter_by(
-            frage_id=frage_id,
-            sprache=lang
-        ).all()
-        
-        answer_text = str(answer).strip().lower()
-        for sk in schluessel:
-            similarity = SequenceMatcher(None, answer_text, sk.schluesselwort.lower()).ratio()
-            if similarity >= sk.mindest_uebereinstimmung:
-                is_correct = True
-                correct_answer = sk.schluesselwort
-                break
-        
-        if not is_correct and schluessel:
-            correct_answer = schluessel[0].schluesselwort
+    is_correct, correct_answer = grade_answer(key, answer)
     
-    # Calculate points
-    points_earned = 0
-    if is_correct:
-        base_points = frage.get_points()
-        # Time bonus: faster answers get more points
-        time_bonus = max(0, 1 - (time_elapsed / frage.zeitlimit_sek)) * 0.5
-        points_earned = int(base_points * (1 + time_bonus))
-        
-        # Update teilnahme
-        teilnahme.aktueller_punktestand += points_earned
-        teilnahme.punkte_multiplayer_gesamt += points_earned
+    # Scored under the lock, so the question cannot close between the check and the points
+    with room.lock:
+        if not room.is_open(frage_id):
+            emit('error', {'message': 'Question closed'})
+            return
         
-        # Update user stats
-        user = User.query.get(user_id)
-        user.correct_answers += 1
-        user.current_streak += 1
-        if user.current_streak > user.best_streak:
-            user.best_streak = user.current_streak
-        user.fisi_punkte += points_earned
-    else:
-        # Wrong answer
-        user = User.query.get(user_id)
-        user.current_streak = 0
+        # Check if player already answered this question
+        if not room.register_answer(user_id, frage_id):
+            emit('error', {'message': 'Already answered'})
+            return
         
-        # Survival mode logic
-        if sitzung.modus.value in ['Survival_Normal', 'Survival_Hardcore']:
-            teilnahme.hat_ueberlebt = False
-            teilnahme.ausgeschieden_bei_frage = sitzung.aktueller_frage_index
-    
-    # Update user stats
-    user.questions_answered += 1
-    
-    # Store answer in history
-    answers_data.append({
-        'frage_id': frage_id,
-        'answer': answer,
-        'is_correct': is_correct,
-        'points_earned': points_earned,
-        'time_elapsed': time_elapsed
-    })
-    teilnahme.answers_data = answers_data
-    
-    db.session.commit()
-    
-    logger.info(f"User {user_id} answered question {frage_id}: {'correct' if is_correct else 'wrong'}")
+        points_earned, total_score = apply_answer(room_code, room, player, frage, answer, is_correct, time_elapsed)
     
     # Send result to player
     emit('answer_result', {
         'is_correct': is_correct,
         'points_earned': points_earned,
         'correct_answer': correct_answer,
-        'total_score': teilnahme.aktueller_punktestand
+        'total_score': total_score
     })
     
-    # Broadcast score update to room
-    socketio.emit('score_update', {
-        'user_id': user_id,
-        'username': user.username,
-        'score': teilnahme.aktueller_punktestand,
-        'points_change': points_earned
-    }, room=room_code)
-    
     # Check if all players answered
     check_all_answered(room_code, frage_id)
 
 def check_all_answered(room_code, frage_id):
     """Check if all players have answered the current question"""
-    sitzung = SpielSitzung.query.filter_by(raum_code=room_code).first()
-    if not sitzung:
+    room = get_room(room_code)
+    if not room:
         return
     
-    # Count answers for this question
-    answered_count = 0
-    total_players = sitzung.teilnahmen.count()
+    answered_count, total_players = room.answer_progress(frage_id)
     
-    for teilnahme in sitzung.teilnahmen:
-        answers_data = teilnahme.answers_data or []
-        if any(a.get('frage_id') == frage_id for a in answers_data):
-            answered_count += 1
+    # Live progress for the host
+    socketio.emit('answer_progress', {
+        'frage_id': frage_id,
+        'answered': answered_count,
+        'total': total_players
+    }, room=host_room(room_code))
     
-    # If all answered, proceed to next question
+    # If all answered, close the question without waiting for the timer
     if answered_count >= total_players:
-        logger.info(f"All players answered in room {room_code}, proceeding to next question")
-        socketio.sleep(3)  # Short delay to show results
-        send_next_question(room_code)
+        close_current_question(room_code, frage_id)
 
 @socketio.on('next_question')
+@shard_router.routed
+@metrics.socket_event
 def handle_next_question(data):
     """Host triggers next question"""
     user_id = session.get('user_id')
     room_code = data.get('room_code')
     
-    sitzung = SpielSitzung.query.filter_by(raum_code=room_code).first()
+    room = load_room(room_code)
     
-    if not sitzung or sitzung.ersteller_id != user_id:
+    if not room or room.ersteller_id != user_id:
         emit('error', {'message': 'Unauthorized'})
         return
     
@@ -366,29 +566,22 @@ def handle_next_question(data):
 
 def end_game(room_code):
     """End the game and show results"""
-    sitzung = SpielSitzung.query.filter_by(raum_code=room_code).first()
-    if not sitzung:
+    room = get_room(room_code)
+    if not room:
         return
     
-    sitzung.ist_aktiv = False
-    sitzung.ended_at = datetime.now(timezone.utc)
+    scheduler.cancel_room(room_code)
+    score_batcher.flush(room_code)
     
-    # Update user stats
-    for teilnahme in sitzung.teilnahmen:
-        user = User.query.get(teilnahme.user_id)
-        user.games_played += 1
-    
-    db.session.commit()
+    # Achievements below read the persisted user stats
+    user_stats.flush()
     
-    # Prepare final results
-    results = []
-    for teilnahme in sitzung.teilnahmen.order_by(SpielTeilnahme.aktueller_punktestand.desc()):
-        results.append({
-            'user_id': teilnahme.user_id,
-            'username': teilnahme.spieler.username,
-            'score': teilnahme.aktueller_punktestand,
-            'hat_ueberlebt': teilnahme.hat_ueberlebt
-        })
+    # Checkpoint, games_played, standings and results snapshot
+    results = room.finalize()
+    if results is None:
+        # Another end_game call finalized the session and announced it
+        close_room(room_code)
+        return
     
     logger.info(f"Game {room_code} ended")
     
@@ -399,94 +592,62 @@ def end_game(room_code):
     }, room=room_code)
     
     # Check and award achievements
-    check_achievements(room_code)
+    check_achievements(room_code, room.modus, results)
+    
+    close_room(room_code)
 
-def check_achievements(room_code):
+def check_achievements(room_code, modus, standings):
     """Check and award achievements for players"""
-    sitzung = SpielSitzung.query.filter_by(raum_code=room_code).first()
-    if not sitzung:
-        return
-    
-    for teilnahme in sitzung.teilnahmen:
-        user = User.query.get(teilnahme.user_id)
-        
-        # Check various achievement conditions
-        achievements_to_award = []
-        
-        # First Win
-        if user.games_played == 1:
-            ach = Achievement.query.filter_by(schluessel='FIRST_WIN').first()
-            if ach:
-                achievements_to_award.append(ach)
-        
-        # Streak achievements
-        if user.current_streak >= 5:
-            ach = Achievement.query.filter_by(schluessel='STREAK_5').first()
-            if ach:
-                achievements_to_award.append(ach)
-        
-        if user.current_streak >= 10:
-            ach = Achievement.query.filter_by(schluessel='STREAK_10').first()
-            if ach:
-                achievements_to_award.append(ach)
-        
-        # Perfect game
-        if user.accuracy == 100 and user.questions_answered > 0:
-            ach = Achievement.query.filter_by(schluessel='PERFECT_GAME').first()
-            if ach:
-                achievements_to_award.append(ach)
-        
-        # Award achievements
-        for ach in achievements_to_award:
-            # Check if already unlocked
-            status = AchievementStatus.query.filter_by(
-                user_id=user.id,
-                achievement_id=ach.id
-            ).first()
-            
-            if not status:
-                status = AchievementStatus(
-                    user_id=user.id,
-                    achievement_id=ach.id,
-                    is_unlocked=True,
-                    erreicht_am=datetime.now(timezone.utc)
-                )
-                db.session.add(status)
-                
-                # Notify player
-                socketio.emit('achievement_unlocked', {
-                    'achievement': {
-                        'titel': ach.get_titel(session.get('lang', 'de')),
-                        'icon': ach.icon,
-                        'points': ach.points
-                    }
-                }, room=request.sid)
-        
-        db.session.commit()
+    unlocked = achievement_engine.on_game_end(room_code, modus.value, standings)
+    
+    # Notify players
+    for player_id, lang, ach in unlocked:
+        socketio.emit('achievement_unlocked', {
+            'achievement': {
+                'titel': ach.get_titel(lang),
+                'icon': ach.icon,
+                'points': ach.points
+            }
+        }, room=user_room(player_id))
 
 @socketio.on('kick_player')
+@shard_router.routed
+@metrics.socket_event
 def handle_kick_player(data):
     """Host kicks a player from the game"""
     user_id = session.get('user_id')
     room_code = data.get('room_code')
     player_id = data.get('player_id')
     
-    sitzung = SpielSitzung.query.filter_by(raum_code=room_code).first()
+    room = get_room(room_code)
+    sitzung = None if room else SpielSitzung.query.filter_by(raum_code=room_code).first()
+    ersteller_id = room.ersteller_id if room else getattr(sitzung, 'ersteller_id', None)
     
-    if not sitzung or sitzung.ersteller_id != user_id:
+    if ersteller_id is None or ersteller_id != user_id:
         emit('error', {'message': 'Unauthorized'})
         return
     
     # Mark player as kicked
-    teilnahme = SpielTeilnahme.query.filter_by(
-        sitzung_id=sitzung.id,
-        user_id=player_id
-    ).first()
-    
-    if teilnahme:
-        teilnahme.hat_ueberlebt = False
-        db.session.commit()
-        
+    kicked = False
+    if room:
+        player = room.get_player(player_id)
+        if player:
+            with room.lock:
+                player.hat_ueberlebt = False
+                player.dirty = True
+            room.checkpoint()
+            kicked = True
+    else:
+        teilnahme = SpielTeilnahme.query.filter_by(
+            sitzung_id=sitzung.id,
+            user_id=player_id
+        ).first()
+        if teilnahme:
+            teilnahme.hat_ueberlebt = False
+            db.session.commit()
+            kicked = True
+    
+    if kicked:
         # Notify kicked player
         socketio.emit('kicked_out', {
             'message': 'Du wurdest aus dem Spiel entfernt'
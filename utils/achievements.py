@@ -0,0 +1,198 @@
+# utils/achievements.py - Incremental achievement rule engine
+
+from sqlalchemy import insert, update
+from extensions import db
+from models import Achievement, AchievementStatus, User
+from datetime import datetime, timezone
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class AchievementDef:
+    """Cached, detached copy of an active Achievement row"""
+    __slots__ = (
+        'id', 'schluessel', 'category', 'requirement_type', 'requirement_value',
+        'titel_de', 'titel_en', 'icon', 'points'
+    )
+
+    def __init__(self, achievement):
+        for attr in self.__slots__:
+            setattr(self, attr, getattr(achievement, attr))
+
+    def get_titel(self, lang='de'):
+        """Get title in specified language"""
+        return self.titel_de if lang == 'de' else self.titel_en
+
+class GameProgress:
+    """Answer statistics of one player within the current game"""
+    __slots__ = ('answered', 'correct', 'run', 'max_run')
+
+    def __init__(self):
+        self.answered = 0
+        self.correct = 0
+        self.run = 0
+        self.max_run = 0
+
+    def add_answer(self, is_correct):
+        self.answered += 1
+        if is_correct:
+            self.correct += 1
+            self.run += 1
+            self.max_run = max(self.max_run, self.run)
+        else:
+            self.run = 0
+
+class PlayerContext:
+    """Everything a rule may look at when a game ends"""
+    __slots__ = ('user', 'game', 'standing', 'modus')
+
+    def __init__(self, user, game, standing, modus):
+        self.user = user
+        self.game = game
+        self.standing = standing
+        self.modus = modus
+
+    @property
+    def won(self):
+        return self.standing is not None and self.standing['rank'] == 1 and self.standing['hat_ueberlebt']
+
+# Progress metrics by requirement_type. Each returns the new absolute
+# progress from the player context and the previously stored progress.
+def _count_progress(ctx, previous):
+    return ctx.user.games_played or 0
+
+def _streak_progress(ctx, previous):
+    return max(ctx.user.best_streak or 0, ctx.game.max_run)
+
+def _percentage_progress(ctx, previous):
+    if not ctx.game.answered:
+        return previous
+    return max(previous, int(ctx.game.correct * 100 / ctx.game.answered))
+
+REQUIREMENT_METRICS = {
+    'count': _count_progress,
+    'streak': _streak_progress,
+    'percentage': _percentage_progress,
+}
+
+def _wins_progress(ctx, previous):
+    return previous + (1 if ctx.won else 0)
+
+def _survival_wins_progress(ctx, previous):
+    won = ctx.won and ctx.modus == 'Survival_Hardcore'
+    return previous + (1 if won else 0)
+
+# Achievements whose meaning is narrower than their requirement_type
+SPECIAL_METRICS = {
+    'FIRST_WIN': _wins_progress,
+    'SURVIVAL_MASTER': _survival_wins_progress,
+}
+
+class AchievementEngine:
+    """Evaluate achievements from game events with cached definitions
+
+    Definitions are loaded once and kept until ``invalidate()``. Answer
+    events only update in-memory counters; ``on_game_end`` evaluates all
+    rules for all players and writes unlocks and progress in one
+    transaction.
+    """
+
+    def __init__(self):
+        self._definitions = None
+        self._progress = {}
+        self._lock = threading.Lock()
+
+    def definitions(self):
+        """Active achievement definitions keyed by schluessel"""
+        definitions = self._definitions
+        if definitions is None:
+            definitions = {
+                ach.schluessel: AchievementDef(ach)
+                for ach in Achievement.query.filter_by(is_active=True)
+            }
+            self._definitions = definitions
+        return definitions
+
+    def invalidate(self):
+        """Drop cached definitions after achievements were changed"""
+        self._definitions = None
+
+    def on_answer(self, room_code, user_id, is_correct):
+        with self._lock:
+            room_progress = self._progress.setdefault(room_code, {})
+            game = room_progress.get(user_id)
+            if game is None:
+                game = room_progress[user_id] = GameProgress()
+            game.add_answer(is_correct)
+
+    def on_game_end(self, room_code, modus, standings):
+        """Evaluate all rules for a finished game
+
+        Returns (user_id, lang, AchievementDef) tuples for every new unlock.
+        """
+        with self._lock:
+            room_progress = self._progress.pop(room_code, {})
+
+        definitions = self.definitions()
+        if not standings or not definitions:
+            return []
+
+        user_ids = [s['user_id'] for s in standings]
+        users = {u.id: u for u in User.query.filter(User.id.in_(user_ids))}
+        statuses = {
+            (status.user_id, status.achievement_id): status
+            for status in AchievementStatus.query.filter(AchievementStatus.user_id.in_(user_ids))
+        }
+
+        now = datetime.now(timezone.utc)
+        new_rows = []
+        updated_rows = []
+        unlocked = []
+
+        for standing in standings:
+            user = users.get(standing['user_id'])
+            if user is None:
+                continue
+            ctx = PlayerContext(user, room_progress.get(user.id, GameProgress()), standing, modus)
+
+            for ach in definitions.values():
+                status = statuses.get((user.id, ach.id))
+                if status is not None and status.is_unlocked:
+                    continue
+
+                metric = SPECIAL_METRICS.get(ach.schluessel) or REQUIREMENT_METRICS.get(ach.requirement_type)
+                if metric is None:
+                    continue
+
+                previous = (status.progress or 0) if status is not None else 0
+                progress = metric(ctx, previous)
+                is_unlocked = progress >= ach.requirement_value
+                if progress == previous and not is_unlocked:
+                    continue
+
+                row = {
+                    'progress': min(progress, ach.requirement_value),
+                    'is_unlocked': is_unlocked,
+                    'erreicht_am': now if is_unlocked else None
+                }
+                if status is None:
+                    new_rows.append({'user_id': user.id, 'achievement_id': ach.id, **row})
+                else:
+                    updated_rows.append({'id': status.id, **row})
+
+                if is_unlocked:
+                    unlocked.append((user.id, user.sprache or 'de', ach))
+
+        if new_rows:
+            # render_nulls keeps one column set, rows with and without erreicht_am share a batch
+            db.session.execute(insert(AchievementStatus).execution_options(render_nulls=True), new_rows)
+        if updated_rows:
+            db.session.execute(update(AchievementStatus), updated_rows)
+        db.session.commit()
+
+        logger.info(f"Achievements for room {room_code}: {len(unlocked)} unlocked, "
+                    f"{len(new_rows) + len(updated_rows)} progress rows written")
+        return unlocked
+
+achievement_engine = AchievementEngine()
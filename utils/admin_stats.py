@@ -0,0 +1,137 @@
+# utils/admin_stats.py - Cached admin dashboard counters, kept by model hooks and recounted periodically
+
+from datetime import datetime, timezone
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, attributes
+from extensions import db
+from models import Frage, Lernfeld, SpielSitzung, User
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Counter of each model's rows
+MODEL_COUNTERS = {
+    User: 'total_users',
+    SpielSitzung: 'total_games',
+    Frage: 'total_questions',
+    Lernfeld: 'total_lernfelder',
+}
+
+def _pending(session):
+    """Counter changes of the session's open transaction"""
+    return session.info.setdefault('admin_stats', {})
+
+def _add(pending, key, delta):
+    pending[key] = pending.get(key, 0) + delta
+
+@event.listens_for(Session, 'after_flush')
+def _on_flush(session, flush_context):
+    for objects, delta in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            key = MODEL_COUNTERS.get(type(obj))
+            if key is None:
+                continue
+            pending = _pending(session)
+            _add(pending, key, delta)
+            # Loaded state only, no SQL inside the flush
+            if key == 'total_games' and obj.__dict__.get('ist_aktiv'):
+                _add(pending, 'active_games', delta)
+    for obj in session.dirty:
+        if isinstance(obj, SpielSitzung):
+            history = attributes.get_history(obj, 'ist_aktiv', passive=attributes.PASSIVE_NO_INITIALIZE)
+            if history.added and history.deleted and bool(history.added[0]) != bool(history.deleted[0]):
+                _add(_pending(session), 'active_games', 1 if history.added[0] else -1)
+
+@event.listens_for(Session, 'after_commit')
+def _on_commit(session):
+    pending = session.info.pop('admin_stats', None)
+    if pending:
+        admin_stats.apply(pending)
+
+@event.listens_for(Session, 'after_rollback')
+def _on_rollback(session):
+    session.info.pop('admin_stats', None)
+
+class AdminStats:
+    """Counters of the admin dashboard without five COUNT(*) per page view
+
+    ORM inserts and deletes of User, SpielSitzung, Frage and Lernfeld (and
+    ist_aktiv changes of sessions) are collected per database session when
+    it flushes and applied once it commits; rolled back changes are dropped.
+    Writes outside the ORM report their change with count() inside the
+    transaction (finalize_game ends games with a bulk UPDATE). Every
+    reconcile_sek the counters are recounted in one statement, which also
+    corrects bulk imports and other workers' changes; the dashboard shows
+    the time of that recount. Nothing is counted before the first view.
+    """
+
+    def __init__(self):
+        self.reconcile_sek = 300
+        self._counts = None
+        self.reconciled_at = None
+        self._lock = threading.Lock()
+        self._reconcile_started = False
+
+    def init_app(self, app):
+        self.reconcile_sek = app.config.get('ADMIN_STATS_RECONCILE_SEK', 300)
+        # A new app (tests) starts with an empty database
+        with self._lock:
+            self._counts = None
+            self.reconciled_at = None
+        # One recount loop per process, also when several apps are created
+        if self.reconcile_sek and not self._reconcile_started:
+            self._reconcile_started = True
+            from utils.room_scheduler import scheduler
+            scheduler.schedule(self.reconcile_sek, 'admin_stats', self._periodic_reconcile)
+
+    def count(self, key, delta):
+        """Report a change made without ORM objects, applied when db.session commits"""
+        _add(_pending(db.session), key, delta)
+
+    def apply(self, changes):
+        with self._lock:
+            if self._counts is None:
+                return
+            for key, delta in changes.items():
+                self._counts[key] = max(0, self._counts[key] + delta)
+
+    def reconcile(self):
+        """Recount all counters from the database"""
+        active = select(func.count()).select_from(SpielSitzung).where(SpielSitzung.ist_aktiv == True)
+        statements = {key: select(func.count()).select_from(model) for model, key in MODEL_COUNTERS.items()}
+        statements['active_games'] = active
+        row = db.session.execute(select(*(s.scalar_subquery() for s in statements.values()))).one()
+        counts = dict(zip(statements, row))
+        with self._lock:
+            drift = {}
+            if self._counts is not None:
+                drift = {key: self._counts[key] - value for key, value in counts.items() if self._counts[key] != value}
+            self._counts = counts
+            self.reconciled_at = datetime.now(timezone.utc)
+        if drift:
+            logger.info(f"Admin stats reconciled, cached counters were off by {drift}")
+        return counts
+
+    def snapshot(self):
+        """(counters, time of the last recount), counting on first use"""
+        with self._lock:
+            counts = dict(self._counts) if self._counts is not None else None
+            reconciled_at = self.reconciled_at
+        if counts is None:
+            counts = self.reconcile()
+            reconciled_at = self.reconciled_at
+        return counts, reconciled_at
+
+    def _periodic_reconcile(self):
+        from utils.room_scheduler import scheduler
+        try:
+            # Counters nobody viewed yet stay uncounted
+            if self._counts is not None:
+                self.reconcile()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Admin stats reconcile failed: {e}")
+        scheduler.schedule(self.reconcile_sek, 'admin_stats', self._periodic_reconcile)
+
+admin_stats = AdminStats()
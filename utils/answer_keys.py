@@ -0,0 +1,114 @@
+# utils/answer_keys.py - Compiled answer keys for MC and TEXT grading
+
+from extensions import db
+from models import Frage, Antwort, TextAntwortSchluessel, Fragetyp
+from utils.text_matcher import text_matcher
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+LANGUAGES = ('de', 'en')
+
+class AnswerKey:
+    """Everything needed to grade one question in one language"""
+    __slots__ = ('frage_id', 'lang', 'typ', 'correct_ids', 'correct_list', 'keywords')
+
+    def __init__(self, frage_id, lang, typ, correct_list, keywords):
+        self.frage_id = frage_id
+        self.lang = lang
+        self.typ = typ
+        # Correct MC answer IDs, as set for grading and in database order for display
+        self.correct_ids = frozenset(correct_list)
+        self.correct_list = tuple(correct_list)
+        # (normalized keyword, original keyword, threshold) for TEXT questions
+        self.keywords = tuple(keywords)
+
+def grade_answer(key, answer):
+    """Grade an answer against a compiled key, returns (is_correct, correct_answer)"""
+    if key.typ == Fragetyp.MC:
+        if isinstance(answer, list):
+            # Multiple correct answers possible
+            is_correct = set(answer) == key.correct_ids
+        else:
+            # Single answer
+            is_correct = answer in key.correct_ids
+        return is_correct, list(key.correct_list)
+
+    if key.typ == Fragetyp.TEXT:
+        # Text answer validation with fuzzy matching
+        matched = text_matcher.match(text_matcher.normalize(answer), key.keywords)
+        if matched is not None:
+            return True, matched
+        return False, key.keywords[0][1] if key.keywords else None
+
+    return False, None
+
+class AnswerKeyCache:
+    """Answer keys per (frage_id, lang), built lazily or in bulk for a deck"""
+
+    def __init__(self):
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, frage_id, lang='de'):
+        """Compiled key of a question, loading it on first use"""
+        key = self._keys.get((frage_id, lang))
+        if key is None:
+            self.warm([frage_id])
+            key = self._keys.get((frage_id, lang))
+        return key
+
+    def warm(self, frage_ids):
+        """Compile keys of all given questions that are not cached yet"""
+        missing = [f for f in set(frage_ids) if (f, LANGUAGES[0]) not in self._keys]
+        if not missing:
+            return 0
+
+        typen = dict(db.session.query(Frage.id, Frage.typ).filter(Frage.id.in_(missing)))
+
+        correct_by_frage = {}
+        for frage_id, antwort_id in (
+            db.session.query(Antwort.frage_id, Antwort.id)
+            .filter(Antwort.frage_id.in_(missing), Antwort.ist_korrekt == True)
+            .order_by(Antwort.id)
+        ):
+            correct_by_frage.setdefault(frage_id, []).append(antwort_id)
+
+        keywords_by_frage = {}
+        for frage_id, sprache, schluesselwort, mindest in (
+            db.session.query(
+                TextAntwortSchluessel.frage_id, TextAntwortSchluessel.sprache,
+                TextAntwortSchluessel.schluesselwort, TextAntwortSchluessel.mindest_uebereinstimmung
+            )
+            .filter(TextAntwortSchluessel.frage_id.in_(missing))
+            .order_by(TextAntwortSchluessel.id)
+        ):
+            keywords_by_frage.setdefault((frage_id, sprache), []).append(
+                (text_matcher.normalize(schluesselwort), schluesselwort, mindest if mindest is not None else 0.9)
+            )
+
+        compiled = {}
+        for frage_id, typ in typen.items():
+            for lang in LANGUAGES:
+                compiled[(frage_id, lang)] = AnswerKey(
+                    frage_id, lang, typ,
+                    correct_by_frage.get(frage_id, []),
+                    keywords_by_frage.get((frage_id, lang), [])
+                )
+
+        with self._lock:
+            self._keys.update(compiled)
+        return len(typen)
+
+    def invalidate(self, frage_id):
+        """Forget compiled keys after a question was edited or deleted"""
+        with self._lock:
+            for lang in LANGUAGES:
+                self._keys.pop((frage_id, lang), None)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+answer_keys = AnswerKeyCache()
@@ -0,0 +1,88 @@
+# utils/batch_grader.py - Vectorized grading of buffered text answers
+
+from models import Fragetyp
+from utils.answer_keys import grade_answer
+from utils.text_matcher import text_matcher
+
+try:
+    import numpy as np
+except ImportError:  # Optional, batches are graded answer by answer without it
+    np = None
+
+def encode_batch(texts):
+    """Pad texts into an (n, width) array of code points, returns (codes, lengths)"""
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int32, count=len(texts))
+    width = int(lengths.max()) if len(texts) else 0
+    codes = np.zeros((len(texts), width), dtype=np.int32)
+    # Scatter all code points at once, row-major order matches the joined text
+    filled = np.arange(width) < lengths[:, None]
+    codes[filled] = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+    return codes, lengths
+
+def batch_distances(codes, lengths, keyword, transpositions=True):
+    """Edit distance of every padded row to one keyword
+
+    Rows of the DP matrix advance one keyword character at a time for the
+    whole batch. Insertions within a row are resolved with a running
+    minimum, so each keyword character costs a handful of array operations
+    regardless of the number of answers.
+    """
+    n, width = codes.shape
+    cols = np.arange(width + 1, dtype=np.int32)
+    prev = np.tile(cols, (n, 1))
+    prev_prev = None
+    keyword = [ord(c) for c in keyword]
+
+    for i, k in enumerate(keyword, 1):
+        cur = np.empty_like(prev)
+        cur[:, 0] = i
+        # Substitution or match, and deletion
+        np.minimum(prev[:, :-1] + (codes != k), prev[:, 1:] + 1, out=cur[:, 1:])
+        if transpositions and i > 1 and width > 1:
+            swapped = (codes[:, 1:] == keyword[i - 2]) & (codes[:, :-1] == k)
+            cur[:, 2:] = np.where(swapped, np.minimum(cur[:, 2:], prev_prev[:, :-2] + 1), cur[:, 2:])
+        # Insertion: cur[j] = min over l <= j of cur[l] + (j - l)
+        cur = np.minimum.accumulate(cur - cols, axis=1) + cols
+        prev_prev, prev = prev, cur
+
+    return prev[np.arange(n), lengths]
+
+def grade_batch(key, answers):
+    """Grade many answers to one question, returns [(is_correct, correct_answer)]
+
+    TEXT answers are matched in one vectorized pass per keyword with the
+    same decisions as ``grade_answer``. Everything else, the difflib mode
+    and installs without NumPy fall back to grading answers one by one.
+    """
+    if np is None or key.typ != Fragetyp.TEXT or text_matcher.mode == 'difflib' or not answers:
+        return [grade_answer(key, answer) for answer in answers]
+
+    # Identical answers are common, grade each distinct text once
+    texts = [text_matcher.normalize(answer) for answer in answers]
+    unique = list(dict.fromkeys(texts))
+    codes, lengths = encode_batch(unique)
+    transpositions = text_matcher.mode == 'damerau'
+    matched = [None] * len(unique)
+    open_rows = np.ones(len(unique), dtype=bool)
+
+    for keyword, original, threshold in key.keywords:
+        # Largest distance that still reaches the threshold, per answer
+        longest = np.maximum(lengths, len(keyword))
+        max_dist = np.floor((1 - threshold) * longest + 1e-9).astype(np.int32)
+        rows = np.flatnonzero(open_rows & (np.abs(lengths - len(keyword)) <= max_dist))
+        if not rows.size:
+            continue
+
+        row_lengths = lengths[rows]
+        distances = batch_distances(codes[rows, :row_lengths.max()], row_lengths, keyword, transpositions)
+        hits = rows[distances <= max_dist[rows]]
+        for row in hits:
+            matched[row] = original
+        open_rows[hits] = False
+
+    fallback = key.keywords[0][1] if key.keywords else None
+    results = {
+        text: (m is not None, m if m is not None else fallback)
+        for text, m in zip(unique, matched)
+    }
+    return [results[text] for text in texts]
@@ -0,0 +1,480 @@
+# utils/game_room.py - In-memory game room state engine
+
+from sqlalchemy import insert, select, update
+from extensions import db
+from models import SpielSitzung, SpielTeilnahme, SpielAntwort, User, Frage, Antwort
+from utils.answer_keys import answer_keys
+from utils.room_store import room_store
+from utils.period_leaderboard import period_leaderboard
+from utils.room_scoreboard import RoomScoreboard
+from utils.admin_stats import admin_stats
+from datetime import datetime, timezone
+import logging
+import random
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Running game rooms keyed by room code
+_rooms = {}
+_rooms_lock = threading.Lock()
+# Set by socketio_events: re-arm the deadlines of a room restored by load_room
+on_restore = None
+
+class PlayerState:
+    """Compact per-player state of a running game"""
+    __slots__ = (
+        'user_id', 'username', 'teilnahme_id', 'score', 'punkte_gesamt',
+        'hat_ueberlebt', 'ausgeschieden_bei_frage', 'dirty'
+    )
+
+    def __init__(self, user_id, username, teilnahme_id, score=0, punkte_gesamt=0,
+                 hat_ueberlebt=True, ausgeschieden_bei_frage=0):
+        self.user_id = user_id
+        self.username = username
+        self.teilnahme_id = teilnahme_id
+        self.score = score or 0
+        self.punkte_gesamt = punkte_gesamt or 0
+        self.hat_ueberlebt = True if hat_ueberlebt is None else hat_ueberlebt
+        self.ausgeschieden_bei_frage = ausgeschieden_bei_frage or 0
+        self.dirty = False
+
+    @classmethod
+    def from_teilnahme(cls, teilnahme, username):
+        """Build player state from a persisted participation"""
+        return cls(
+            user_id=teilnahme.user_id,
+            username=username,
+            teilnahme_id=teilnahme.id,
+            score=teilnahme.aktueller_punktestand,
+            punkte_gesamt=teilnahme.punkte_multiplayer_gesamt,
+            hat_ueberlebt=teilnahme.hat_ueberlebt,
+            ausgeschieden_bei_frage=teilnahme.ausgeschieden_bei_frage
+        )
+
+    def to_dict(self):
+        """Public lobby/scoreboard representation"""
+        return {
+            'user_id': self.user_id,
+            'username': self.username,
+            'score': self.score
+        }
+
+class QuestionState:
+    """Read-only display snapshot of a question (grading uses utils.answer_keys)"""
+    __slots__ = (
+        'id', 'typ', 'zeitlimit_sek', 'punkte', 'text_de', 'text_en', 'antworten'
+    )
+
+    def __init__(self, frage, antworten):
+        self.id = frage.id
+        self.typ = frage.typ
+        self.zeitlimit_sek = frage.zeitlimit_sek
+        self.punkte = frage.get_points()
+        self.text_de = frage.frage_text_de
+        self.text_en = frage.frage_text_en
+        # (id, text_de, text_en) tuples in database order
+        self.antworten = tuple(
+            (a.id, a.antwort_text_de, a.antwort_text_en) for a in antworten
+        )
+
+    def get_text(self, lang='de'):
+        """Get question text in specified language"""
+        return self.text_de if lang == 'de' else self.text_en
+
+    def get_antworten(self, lang='de'):
+        """Get MC answer options in specified language"""
+        return [
+            {'id': a_id, 'text': text_de if lang == 'de' else text_en}
+            for a_id, text_de, text_en in self.antworten
+        ]
+
+def load_questions(frage_ids):
+    """Load question snapshots with their answer options in two queries"""
+    if not frage_ids:
+        return {}
+
+    fragen = Frage.query.filter(Frage.id.in_(frage_ids)).all()
+
+    antworten_by_frage = {}
+    for antwort in Antwort.query.filter(Antwort.frage_id.in_(frage_ids)).order_by(Antwort.id):
+        antworten_by_frage.setdefault(antwort.frage_id, []).append(antwort)
+
+    return {
+        frage.id: QuestionState(frage, antworten_by_frage.get(frage.id, []))
+        for frage in fragen
+    }
+
+def draw_deck(sitzung, limit):
+    """Draw a shuffled, non-repeating list of question IDs for a session"""
+    frage_ids = [
+        frage_id for (frage_id,) in db.session.query(Frage.id).filter_by(
+            lernfeld_id=sitzung.lernfeld_id,
+            schwierigkeit=sitzung.schwierigkeit_level
+        )
+    ]
+    random.shuffle(frage_ids)
+    return frage_ids[:limit]
+
+class GameRoom:
+    """Authoritative in-process state of one running game session
+
+    The room is loaded once when the game starts. Handlers read and mutate
+    it under ``lock`` and only ``checkpoint()`` writes back to the database.
+    """
+
+    def __init__(self, sitzung):
+        self.room_code = sitzung.raum_code
+        self.sitzung_id = sitzung.id
+        self.ersteller_id = sitzung.ersteller_id
+        self.modus = sitzung.modus
+        self.schwierigkeit = sitzung.schwierigkeit_level
+        self.lernfeld_id = sitzung.lernfeld_id
+        self.lernfeld_namen = {
+            'de': sitzung.lernfeld.get_name('de'),
+            'en': sitzung.lernfeld.get_name('en')
+        }
+        self.deck = list(sitzung.fragen_deck or [])
+        self.frage_index = sitzung.aktueller_frage_index or 0
+        self.current_frage_id = self.deck[self.frage_index - 1] if 0 < self.frage_index <= len(self.deck) else None
+        self.is_active = sitzung.ist_aktiv
+        self.players = {}
+        self.questions = {}
+        # Answer registration, scores and phase claims live in the shared
+        # room_store so that several workers agree on them
+        self.closed_questions = set()
+        # SpielAntwort rows not yet inserted
+        self._new_answers = []
+        # TEXT answers waiting to be graded at question close: frage_id -> [(user_id, lang, answer, time_elapsed)]
+        self.deferred = {}
+        self.lock = threading.RLock()
+        self._index_dirty = False
+        # Live ranking, updated with every score change
+        self.scoreboard = RoomScoreboard()
+
+    @classmethod
+    def load(cls, sitzung):
+        """Load session, participants and the question deck from the database"""
+        room = cls(sitzung)
+
+        rows = (
+            db.session.query(SpielTeilnahme, User.username)
+            .join(User, User.id == SpielTeilnahme.user_id)
+            .filter(SpielTeilnahme.sitzung_id == sitzung.id)
+            .all()
+        )
+        for teilnahme, username in rows:
+            room.players[teilnahme.user_id] = PlayerState.from_teilnahme(teilnahme, username)
+        
+        # Seed the shared store from persisted state, a no-op if it survived.
+        # The store is authoritative: its totals include answers scored after
+        # the previous owner's last checkpoint
+        room_store.seed_scores(room.room_code, {p.user_id: p.score for p in room.players.values()})
+        for user_id, score in room_store.scores(room.room_code).items():
+            player = room.players.get(user_id)
+            if player is not None and player.score != score:
+                player.punkte_gesamt += score - player.score
+                player.score = score
+                player.dirty = True
+        room.scoreboard = RoomScoreboard({p.user_id: p.score for p in room.players.values()})
+        answered_rows = (
+            db.session.query(SpielAntwort.frage_id, SpielAntwort.user_id)
+            .filter(SpielAntwort.sitzung_id == sitzung.id)
+        )
+        # One store write per question, not per answer
+        answered = {}
+        for frage_id, user_id in answered_rows:
+            answered.setdefault(frage_id, []).append(user_id)
+        for frage_id, user_ids in answered.items():
+            room_store.register_answers(room.room_code, frage_id, user_ids)
+
+        room.questions = load_questions(room.deck)
+        # Compile answer keys up front so grading never hits the database
+        answer_keys.warm(room.deck)
+
+        logger.info(f"Room {room.room_code} loaded: {len(room.players)} players, {len(room.questions)} questions")
+        return room
+
+    @property
+    def is_survival(self):
+        return self.modus.value in ['Survival_Normal', 'Survival_Hardcore']
+
+    def add_player(self, teilnahme, username):
+        """Register a participation that joined after the room was loaded"""
+        with self.lock:
+            player = self.players.get(teilnahme.user_id)
+            if player is None:
+                player = PlayerState.from_teilnahme(teilnahme, username)
+                self.players[player.user_id] = player
+                self.scoreboard.set(player.user_id, player.score)
+            return player
+
+    def get_player(self, user_id):
+        return self.players.get(user_id)
+
+    def get_question(self, frage_id):
+        return self.questions.get(frage_id)
+
+    def register_answer(self, user_id, frage_id):
+        """Mark a player as having answered, False if they already did"""
+        return room_store.register_answer(self.room_code, frage_id, user_id)
+
+    def add_points(self, player, points):
+        """Add points to a player, returns the score total kept in the shared store"""
+        total = room_store.add_score(self.room_code, player.user_id, points)
+        with self.lock:
+            player.score = total
+            player.punkte_gesamt += points
+            player.dirty = True
+            self.scoreboard.set(player.user_id, total)
+        return total
+
+    def record_answer(self, player, frage_id, answer, is_correct, points_earned, time_elapsed):
+        """Queue an answer for insertion at the next checkpoint"""
+        with self.lock:
+            self._new_answers.append({
+                'teilnahme_id': player.teilnahme_id,
+                'sitzung_id': self.sitzung_id,
+                'user_id': player.user_id,
+                'frage_id': frage_id,
+                'answer': answer,
+                'is_correct': is_correct,
+                'points_earned': points_earned,
+                'time_elapsed': time_elapsed
+            })
+            player.dirty = True
+
+    def defer_answer(self, frage_id, user_id, lang, answer, time_elapsed):
+        """Buffer an ungraded answer until the question closes"""
+        with self.lock:
+            self.deferred.setdefault(frage_id, []).append((user_id, lang, answer, time_elapsed))
+
+    def take_deferred(self, frage_id):
+        """Remove and return the buffered answers of a question"""
+        with self.lock:
+            return self.deferred.pop(frage_id, [])
+
+    def close_ranking_round(self):
+        """Ranks of all players with their change since the last question, see RoomScoreboard.close_round()"""
+        with self.lock:
+            return self.scoreboard.close_round()
+
+    def answer_progress(self, frage_id):
+        """(answered, total) player counts for a question"""
+        return room_store.answer_count(self.room_code, frage_id), len(self.players)
+
+    def is_open(self, frage_id):
+        """True while frage_id is the current question and not closed yet"""
+        with self.lock:
+            return frage_id == self.current_frage_id and frage_id not in self.closed_questions
+
+    def close_question(self, frage_id):
+        """Close the current question once, False if it is already closed or stale"""
+        with self.lock:
+            if frage_id != self.current_frage_id or frage_id in self.closed_questions:
+                return False
+            self.closed_questions.add(frage_id)
+        # Another worker may have closed it already
+        if not room_store.claim(self.room_code, f"close:{frage_id}"):
+            return False
+        room_store.set_phase(self.room_code, f"closed:{frage_id}")
+        return True
+
+    def advance(self):
+        """Move to the next question of the deck, None when the deck is exhausted"""
+        with self.lock:
+            while self.frage_index < len(self.deck):
+                frage = self.questions.get(self.deck[self.frage_index])
+                self.frage_index += 1
+                self._index_dirty = True
+                # Questions deleted since the draw are skipped
+                if frage is not None:
+                    self.current_frage_id = frage.id
+                    room_store.set_phase(self.room_code, f"question:{frage.id}")
+                    return frage
+            return None
+
+    def sync_phase(self):
+        """Catch up with the phase in the shared store after a takeover, returns (frage_id, closed)"""
+        state, _, frage_id = (room_store.get_phase(self.room_code) or '').partition(':')
+        frage_id = int(frage_id) if frage_id.isdigit() else None
+        with self.lock:
+            # The question index is only persisted at checkpoints and may lag one question behind
+            if frage_id is not None and frage_id != self.current_frage_id and frage_id in self.deck[self.frage_index:]:
+                self.frage_index = self.deck.index(frage_id, self.frage_index) + 1
+                self.current_frage_id = frage_id
+                self._index_dirty = True
+            closed = state == 'closed' and frage_id is not None and frage_id == self.current_frage_id
+            if closed:
+                self.closed_questions.add(frage_id)
+            return self.current_frage_id, closed
+
+    def finalize(self):
+        """Final checkpoint, then close the session and snapshot the results, None if already closed"""
+        self.checkpoint()
+        with self.lock:
+            self.is_active = False
+        return finalize_game(self.sitzung_id, self.deck[:self.frage_index], self.lernfeld_id)
+
+    def checkpoint(self):
+        """Write new answers, dirty participations and the question index to the database"""
+        with self.lock:
+            new_answers, self._new_answers = self._new_answers, []
+            if new_answers:
+                db.session.execute(insert(SpielAntwort), new_answers)
+            
+            mappings = []
+            for player in self.players.values():
+                if not player.dirty:
+                    continue
+                mappings.append({
+                    'id': player.teilnahme_id,
+                    'aktueller_punktestand': player.score,
+                    'punkte_multiplayer_gesamt': player.punkte_gesamt,
+                    'hat_ueberlebt': player.hat_ueberlebt,
+                    'ausgeschieden_bei_frage': player.ausgeschieden_bei_frage
+                })
+                player.dirty = False
+
+            if mappings:
+                db.session.execute(update(SpielTeilnahme), mappings)
+
+            if self._index_dirty:
+                db.session.execute(
+                    update(SpielSitzung)
+                    .where(SpielSitzung.id == self.sitzung_id)
+                    .values(aktueller_frage_index=self.frage_index)
+                )
+                self._index_dirty = False
+
+            db.session.commit()
+            logger.debug(f"Room {self.room_code} checkpoint: {len(new_answers)} answers, {len(mappings)} participations written")
+
+def rank_standings(rows):
+    """Add competition ranks (1, 2, 2, 4) to standings sorted by score"""
+    standings = []
+    for position, row in enumerate(rows, start=1):
+        rank = standings[-1]['rank'] if standings and standings[-1]['score'] == row['score'] else position
+        standings.append({'rank': rank, **row})
+    return standings
+
+def finalize_game(sitzung_id, gespielte_fragen, lernfeld_id):
+    """Close a session once, with a constant number of statements
+
+    A conditional UPDATE flips ist_aktiv; if another call already did, the
+    session is left alone and None is returned, so a repeated end_game
+    (double click, routed retry, resumed room) changes nothing. Otherwise
+    one UPDATE for games_played of all participants, one joined query for
+    the final standings, one UPDATE storing the immutable results snapshot
+    on the session and two statements adding the game's points to the
+    period leaderboards. Returns the standings.
+    """
+    ended_at = datetime.now(timezone.utc)
+    
+    closed = db.session.execute(
+        update(SpielSitzung)
+        .where(SpielSitzung.id == sitzung_id, SpielSitzung.ist_aktiv == True)
+        .values(ist_aktiv=False, ended_at=ended_at)
+    )
+    if closed.rowcount == 0:
+        db.session.rollback()
+        logger.info(f"Session {sitzung_id} was already finalized")
+        return None
+    
+    participants = select(SpielTeilnahme.user_id).where(SpielTeilnahme.sitzung_id == sitzung_id)
+    db.session.execute(
+        update(User)
+        .where(User.id.in_(participants))
+        .values(games_played=User.games_played + 1)
+    )
+    
+    rows = (
+        db.session.query(
+            SpielTeilnahme.user_id, User.username,
+            SpielTeilnahme.aktueller_punktestand, SpielTeilnahme.hat_ueberlebt
+        )
+        .join(User, User.id == SpielTeilnahme.user_id)
+        .filter(SpielTeilnahme.sitzung_id == sitzung_id)
+        .order_by(SpielTeilnahme.aktueller_punktestand.desc(), SpielTeilnahme.id)
+        .all()
+    )
+    standings = rank_standings([
+        {
+            'user_id': user_id,
+            'username': username,
+            'score': score or 0,
+            'hat_ueberlebt': hat_ueberlebt
+        }
+        for user_id, username, score, hat_ueberlebt in rows
+    ])
+    
+    db.session.execute(
+        update(SpielSitzung)
+        .where(SpielSitzung.id == sitzung_id)
+        .values(ergebnis={
+            'ended_at': ended_at.isoformat(),
+            'fragen': list(gespielte_fragen),
+            'standings': standings
+        })
+    )
+    period_leaderboard.record_game(sitzung_id, lernfeld_id, ended_at)
+    # The bulk UPDATE bypasses the model hooks of the admin counters
+    admin_stats.count('active_games', -1)
+    db.session.commit()
+    return standings
+
+def get_room(room_code):
+    """Get a running game room by code"""
+    return _rooms.get(room_code)
+
+def open_room(sitzung):
+    """Load a game room and register it as running"""
+    room = GameRoom.load(sitzung)
+    with _rooms_lock:
+        _rooms[room.room_code] = room
+    return room
+
+def load_room(room_code):
+    """Get a running room, restoring it from the database after a worker restart"""
+    room = _rooms.get(room_code)
+    if room is not None:
+        return room
+    
+    sitzung = SpielSitzung.query.filter_by(raum_code=room_code, ist_aktiv=True).first()
+    if not sitzung or sitzung.started_at is None or sitzung.fragen_deck is None:
+        return None
+    
+    logger.info(f"Restoring room {room_code} from database")
+    room = open_room(sitzung)
+    if on_restore:
+        on_restore(room_code)
+    return room
+
+def restore_running_rooms():
+    """Restore all started rooms of the database, run once at startup without sharding"""
+    running = (
+        db.session.query(SpielSitzung.raum_code)
+        .filter(SpielSitzung.ist_aktiv == True, SpielSitzung.started_at.isnot(None))
+        .all()
+    )
+    for (room_code,) in running:
+        load_room(room_code)
+
+def close_room(room_code):
+    """Remove a finished room from memory"""
+    room_store.clear_room(room_code)
+    with _rooms_lock:
+        return _rooms.pop(room_code, None)
+
+def release_room(room_code):
+    """Checkpoint a running room and drop it from memory, its shared state stays for the next owner"""
+    room = _rooms.get(room_code)
+    if room is None:
+        return None
+    room.checkpoint()
+    with _rooms_lock:
+        return _rooms.pop(room_code, None)
+
+def active_rooms():
+    """Snapshot of all running rooms"""
+    return list(_rooms.values())
@@ -0,0 +1,220 @@
+# utils/leaderboard.py - Global FiSi-Punkte leaderboard kept in memory, rolled up in ranglisten_eintrag
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, insert, literal, select
+from extensions import db
+from models import RanglistenEintrag, User
+from utils.rank_index import RankIndex
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Keys sort by points descending, then user ID ascending: -points * ID_SPACE + user_id
+ID_SPACE = 1 << 40
+
+def make_key(user_id, points):
+    return -points * ID_SPACE + user_id
+
+def split_key(key):
+    """(user_id, points) of a key"""
+    return key % ID_SPACE, -(key // ID_SPACE)
+
+def upsert_rows(select_stmt):
+    """Insert or update ranglisten_eintrag rows from a (user_id, punkte, aktualisiert_am) select"""
+    columns = ['user_id', 'punkte', 'aktualisiert_am']
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(RanglistenEintrag).from_select(columns, select_stmt)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={'punkte': stmt.excluded.punkte, 'aktualisiert_am': stmt.excluded.aktualisiert_am}
+        )
+        db.session.execute(stmt)
+        return
+    # Other databases: replace the rows
+    user_ids = select_stmt.with_only_columns(select_stmt.selected_columns[0])
+    db.session.execute(delete(RanglistenEintrag).where(RanglistenEintrag.user_id.in_(user_ids)))
+    db.session.execute(insert(RanglistenEintrag).from_select(columns, select_stmt))
+
+class Leaderboard:
+    """All players with points in a RankIndex, ranked by FiSi-Punkte
+
+    Points change in memory as answers are scored, including points the
+    user stats buffer has not written yet. The buffer's flush upserts the
+    new totals into ranglisten_eintrag in the same transaction; the table
+    is read once on first use and then every sync_sek for rows changed by
+    other workers. Top-k, rank and the window around a player are O(log n).
+    Ties share a rank: the rank is 1 + the number of players with more points.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.sync_sek = 30
+        self._index = None
+        # User ID -> points of every ranked player
+        self._points = {}
+        self._synced_at = None
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.app = app
+        self.sync_sek = app.config.get('LEADERBOARD_SYNC_SEK', 30)
+
+    # Loading and syncing
+
+    def load(self):
+        """Build the index from ranglisten_eintrag, backfilling it from user on first run"""
+        start = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        if not db.session.query(RanglistenEintrag.user_id).limit(1).first():
+            upsert_rows(
+                select(User.id, User.fisi_punkte, literal(now, db.DateTime)).where(User.fisi_punkte > 0)
+            )
+            db.session.commit()
+
+        points = {
+            user_id: punkte
+            for user_id, punkte in db.session.query(RanglistenEintrag.user_id, RanglistenEintrag.punkte)
+            .filter(RanglistenEintrag.punkte > 0)
+        }
+        from utils.user_stats import user_stats
+        for user_id, pending in user_stats.pending_points().items():
+            points[user_id] = points.get(user_id, 0) + pending
+
+        with self._lock:
+            self._points = {user_id: p for user_id, p in points.items() if p > 0}
+            self._index = RankIndex(make_key(user_id, p) for user_id, p in self._points.items())
+            self._synced_at = now
+        logger.info(f"Leaderboard loaded: {len(self._points)} players in {time.perf_counter() - start:.2f}s")
+
+        if self.sync_sek and self.app is not None:
+            from utils.room_scheduler import scheduler
+            scheduler.schedule(self.sync_sek, 'leaderboard', self.sync)
+
+    def _ensure_loaded(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self.load()
+
+    def sync(self):
+        """Apply rows other workers changed since the last sync, then reschedule"""
+        from utils.room_scheduler import scheduler
+        from utils.user_stats import user_stats
+        try:
+            # Overlap one interval, rows committed late still carry an older timestamp
+            since = self._synced_at - timedelta(seconds=self.sync_sek)
+            now = datetime.now(timezone.utc)
+            rows = (
+                db.session.query(RanglistenEintrag.user_id, RanglistenEintrag.punkte)
+                .filter(RanglistenEintrag.aktualisiert_am >= since)
+                .all()
+            )
+            pending = user_stats.pending_points()
+            with self._lock:
+                for user_id, punkte in rows:
+                    self._set(user_id, punkte + pending.get(user_id, 0))
+                self._synced_at = now
+            if rows:
+                logger.debug(f"Leaderboard synced {len(rows)} rows")
+        except Exception as e:
+            logger.error(f"Leaderboard sync failed: {e}")
+        scheduler.schedule(self.sync_sek, 'leaderboard', self.sync)
+
+    def persist(self, user_ids):
+        """Upsert the current user.fisi_punkte of these users, committed by the caller"""
+        if not user_ids:
+            return
+        upsert_rows(
+            select(User.id, User.fisi_punkte, literal(datetime.now(timezone.utc), db.DateTime))
+            .where(User.id.in_(list(user_ids)))
+        )
+
+    # Updates
+
+    def _set(self, user_id, points):
+        old = self._points.get(user_id)
+        if old == points:
+            return
+        if old is not None:
+            self._index.remove(make_key(user_id, old))
+            del self._points[user_id]
+        if points > 0:
+            self._index.add(make_key(user_id, points))
+            self._points[user_id] = points
+
+    def add_points(self, user_id, delta):
+        """Apply a points change as soon as it is scored"""
+        if not delta or self._index is None:
+            # Not loaded yet: the load reads flushed and buffered points
+            return
+        with self._lock:
+            self._set(user_id, self._points.get(user_id, 0) + delta)
+
+    # Queries
+
+    def _rank_of_points(self, points):
+        return self._index.index(make_key(0, points)) + 1
+
+    def _rows(self, start, stop):
+        """[(rank, user_id, points)] of the positions start to stop - 1"""
+        rows = []
+        previous_points = None
+        rank = None
+        for offset, key in enumerate(self._index.slice(start, stop)):
+            user_id, points = split_key(key)
+            if points != previous_points:
+                rank = self._rank_of_points(points) if previous_points is None else max(start, 0) + offset + 1
+                previous_points = points
+            rows.append((rank, user_id, points))
+        return rows
+
+    def size(self):
+        self._ensure_loaded()
+        return len(self._index)
+
+    def points(self, user_id):
+        self._ensure_loaded()
+        return self._points.get(user_id, 0)
+
+    def rank(self, user_id):
+        """Rank of a player, None without points"""
+        self._ensure_loaded()
+        with self._lock:
+            points = self._points.get(user_id)
+            return self._rank_of_points(points) if points else None
+
+    def top(self, limit=10):
+        """[(rank, user_id, points)] of the best players"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._rows(0, limit)
+
+    def around(self, user_id, radius=5):
+        """[(rank, user_id, points)] of up to radius players above and below a player"""
+        self._ensure_loaded()
+        with self._lock:
+            points = self._points.get(user_id)
+            if not points:
+                return []
+            position = self._index.index(make_key(user_id, points))
+            return self._rows(position - radius, position + radius + 1)
+
+def with_usernames(rows):
+    """Leaderboard rows as dicts with usernames, one query for all of them"""
+    if not rows:
+        return []
+    names = dict(db.session.query(User.id, User.username).filter(User.id.in_([r[1] for r in rows])))
+    return [
+        {'rank': rank, 'user_id': user_id, 'username': names[user_id], 'fisi_punkte': points}
+        for rank, user_id, points in rows
+        if user_id in names
+    ]
+
+leaderboard = Leaderboard()
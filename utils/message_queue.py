@@ -0,0 +1,196 @@
+# utils/message_queue.py - Local pub/sub message queue for multi-worker SocketIO
+
+from socketio import PubSubManager
+import socketio
+from urllib.parse import urlparse
+import argparse
+import logging
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 6390
+
+_HEADER = struct.Struct('!I')
+
+def send_frame(sock, payload):
+    """Send one length-prefixed frame"""
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+def recv_frame(sock):
+    """Receive one length-prefixed frame, None when the peer closed the connection"""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    return _recv_exact(sock, _HEADER.unpack(header)[0])
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+class _Subscriber:
+    """Subscriber connection, frames from several publishers must not interleave"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def send(self, frame):
+        with self.lock:
+            send_frame(self.sock, frame)
+
+class _BrokerHandler(socketserver.BaseRequestHandler):
+    """One client connection, opened with a 'pub:<channel>' or 'sub:<channel>' frame"""
+
+    def handle(self):
+        hello = recv_frame(self.request)
+        if hello is None:
+            return
+        role, _, channel = hello.decode('utf-8').partition(':')
+
+        if role == 'sub':
+            subscriber = _Subscriber(self.request)
+            self.server.subscribe(channel, subscriber)
+            try:
+                # Subscribers never send, wait for the connection to close
+                while self.request.recv(1024):
+                    pass
+            except OSError:
+                pass
+            finally:
+                self.server.unsubscribe(channel, subscriber)
+            return
+
+        while True:
+            frame = recv_frame(self.request)
+            if frame is None:
+                return
+            self.server.publish(channel, frame)
+
+class LocalBroker(socketserver.ThreadingTCPServer):
+    """Minimal pub/sub broker fanning frames out to all subscribers of a channel
+
+    Stand-in for Redis or RabbitMQ when several workers run on one host,
+    and in tests. Frames are forwarded as opaque bytes.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT):
+        super().__init__((host, port), _BrokerHandler)
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel, subscriber):
+        with self.lock:
+            self.subscribers.setdefault(channel, set()).add(subscriber)
+
+    def unsubscribe(self, channel, subscriber):
+        with self.lock:
+            self.subscribers.get(channel, set()).discard(subscriber)
+
+    def publish(self, channel, frame):
+        with self.lock:
+            targets = list(self.subscribers.get(channel, ()))
+        for subscriber in targets:
+            try:
+                subscriber.send(frame)
+            except OSError:
+                self.unsubscribe(channel, subscriber)
+
+class LocalQueueManager(PubSubManager):
+    """SocketIO client manager using a LocalBroker, URL format local://host:port"""
+    name = 'local'
+
+    def __init__(self, url='local://127.0.0.1:6390', channel='socketio', write_only=False, logger=None):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or '127.0.0.1', parsed.port or DEFAULT_PORT)
+        self._pub_sock = None
+        self._pub_lock = threading.Lock()
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+    def _connect(self, role):
+        sock = socket.create_connection(self.address)
+        send_frame(sock, f"{role}:{self.channel}".encode('utf-8'))
+        return sock
+
+    def _publish(self, data):
+        payload = pickle.dumps(data)
+        with self._pub_lock:
+            # Reconnect once if the broker was restarted
+            for _ in range(2):
+                try:
+                    if self._pub_sock is None:
+                        self._pub_sock = self._connect('pub')
+                    send_frame(self._pub_sock, payload)
+                    return
+                except OSError as e:
+                    logger.warning(f"Message queue publish failed: {e}")
+                    if self._pub_sock is not None:
+                        self._pub_sock.close()
+                        self._pub_sock = None
+        logger.error(f"Dropped {data.get('method')} message, broker at {self.address} unreachable")
+
+    def _listen(self):
+        retry_sek = 1
+        while True:
+            try:
+                sock = self._connect('sub')
+                retry_sek = 1
+                while True:
+                    frame = recv_frame(sock)
+                    if frame is None:
+                        break
+                    yield frame
+                sock.close()
+                logger.warning("Message queue broker closed the connection")
+            except OSError as e:
+                logger.error(f"Message queue subscribe failed: {e}")
+            self.server.sleep(retry_sek)
+            retry_sek = min(retry_sek * 2, 30)
+
+def create_client_manager(url, channel, routing=False):
+    """Client manager for local:// queues, None leaves other URLs to Flask-SocketIO
+
+    With routing every queue type gets a manager built here, which also
+    carries socket events forwarded between room shards (utils/sharding.py).
+    """
+    if url.startswith('local://'):
+        manager_class = LocalQueueManager
+    elif not routing:
+        return None
+    # Same choice of manager as Flask-SocketIO
+    elif url.startswith(('redis://', 'rediss://')):
+        manager_class = socketio.RedisManager
+    elif url.startswith('kafka://'):
+        manager_class = socketio.KafkaManager
+    elif url.startswith('zmq'):
+        manager_class = socketio.ZmqManager
+    else:
+        manager_class = socketio.KombuManager
+    
+    if routing:
+        from utils.sharding import routing_manager
+        manager_class = routing_manager(manager_class)
+    return manager_class(url, channel=channel)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the local SocketIO message queue broker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    broker = LocalBroker(args.host, args.port)
+    logger.info(f"Message queue broker listening on {args.host}:{args.port}")
+    broker.serve_forever()
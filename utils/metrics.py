@@ -0,0 +1,234 @@
+# utils/metrics.py - Latency, error and query metrics of socket events and routes, Prometheus export
+
+from bisect import bisect_left
+from functools import wraps
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils.query_profiler import query_profiler
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets in seconds (+Inf is implicit)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Seconds over which answers_per_second is averaged
+ANSWER_RATE_WINDOW_SEK = 10
+
+# SQLAlchemy statements executed by the current thread, read before and after a handler
+_local = threading.local()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    _local.queries = getattr(_local, 'queries', 0) + 1
+
+def query_count():
+    return getattr(_local, 'queries', 0)
+
+class Series:
+    """Totals of one socket event or route"""
+    __slots__ = ('buckets', 'duration_sum', 'count', 'errors', 'queries', 'payload_bytes')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.count = 0
+        self.errors = 0
+        self.queries = 0
+        self.payload_bytes = 0
+
+def payload_size(data):
+    """Approximate wire size of an event payload in bytes"""
+    if data is None:
+        return 0
+    if isinstance(data, (str, bytes)):
+        return len(data)
+    try:
+        return len(json.dumps(data, separators=(',', ':')))
+    except (TypeError, ValueError):
+        return 0
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metrics:
+    """Per-process registry of socket event and HTTP route metrics
+
+    Socket handlers are wrapped with @metrics.socket_event, routes are
+    measured by request hooks registered in init_app(). The wrapper also
+    opens the query profiler's scope of the handler. Recording one call
+    costs a lock, a bisect and a few additions, cheap enough to leave on.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._series = {'socket': {}, 'http': {}}
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.answers_total = 0
+        # Answer counts per second over the last ANSWER_RATE_WINDOW_SEK seconds
+        self._answer_seconds = [0] * ANSWER_RATE_WINDOW_SEK
+        self._answer_counts = [0] * ANSWER_RATE_WINDOW_SEK
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', False)
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    # Recording
+
+    def record(self, kind, name, duration, error, queries, payload_bytes):
+        index = bisect_left(BUCKETS, duration)
+        with self._lock:
+            series = self._series[kind].get(name)
+            if series is None:
+                series = self._series[kind][name] = Series()
+            series.buckets[index] += 1
+            series.duration_sum += duration
+            series.count += 1
+            series.errors += error
+            series.queries += queries
+            series.payload_bytes += payload_bytes
+
+    def socket_event(self, handler):
+        """Decorator for SocketIO handlers, the event name is the handler name without handle_"""
+        name = handler.__name__.removeprefix('handle_')
+        # connect may be called with an auth argument the handler does not take
+        arity = handler.__code__.co_argcount
+
+        @wraps(handler)
+        def wrapper(*args):
+            args = args[:arity]
+            scope = query_profiler.socket_scope(name, handler)
+            if not self.enabled and scope is None:
+                return handler(*args)
+            queries = query_count()
+            start = time.perf_counter()
+            error = True
+            try:
+                result = handler(*args)
+                error = False
+            finally:
+                if self.enabled:
+                    self.record(
+                        'socket', name, time.perf_counter() - start, error,
+                        query_count() - queries, payload_size(args[0]) if args else 0
+                    )
+                if scope is not None:
+                    # Budget checks only after a handler that did not raise
+                    query_profiler.end(scope, record=not error)
+            return result
+        return wrapper
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = query_count()
+
+    def _after_request(self, response):
+        g.metrics_status = response.status_code
+        g.metrics_bytes = response.calculate_content_length() or 0
+        return response
+
+    def _teardown_request(self, exc):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        status = g.pop('metrics_status', 500)
+        self.record(
+            'http', request.endpoint or 'unmatched', time.perf_counter() - start,
+            exc is not None or status >= 500, query_count() - g.pop('metrics_queries', 0),
+            g.pop('metrics_bytes', 0)
+        )
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def connection_closed(self):
+        with self._lock:
+            self.connections = max(0, self.connections - 1)
+
+    def answer(self):
+        """Count one graded answer"""
+        now = int(time.monotonic())
+        slot = now % ANSWER_RATE_WINDOW_SEK
+        with self._lock:
+            self.answers_total += 1
+            if self._answer_seconds[slot] != now:
+                self._answer_seconds[slot] = now
+                self._answer_counts[slot] = 0
+            self._answer_counts[slot] += 1
+
+    def answers_per_second(self):
+        """Average over the last ANSWER_RATE_WINDOW_SEK seconds"""
+        now = int(time.monotonic())
+        with self._lock:
+            total = sum(
+                count for second, count in zip(self._answer_seconds, self._answer_counts)
+                if now - second < ANSWER_RATE_WINDOW_SEK
+            )
+        return total / ANSWER_RATE_WINDOW_SEK
+
+    # Export
+
+    def render(self, active_rooms=0):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            snapshot = {
+                kind: {name: (list(s.buckets), s.duration_sum, s.count, s.errors, s.queries, s.payload_bytes)
+                       for name, s in series.items()}
+                for kind, series in self._series.items()
+            }
+            connections = self.connections
+            answers_total = self.answers_total
+
+        for kind, label, prefix, what, failed, payload in (
+            ('socket', 'event', 'socketio_event', 'SocketIO event handlers', 'that raised', 'incoming event payloads'),
+            ('http', 'endpoint', 'http_request', 'HTTP routes', 'that raised or answered 5xx', 'response bodies'),
+        ):
+            series = sorted(snapshot[kind].items())
+            lines += [
+                f"# HELP {prefix}_duration_seconds Latency of {what}",
+                f"# TYPE {prefix}_duration_seconds histogram",
+            ]
+            for name, (buckets, duration_sum, count, _, _, _) in series:
+                labels = f'{label}="{escape_label(name)}"'
+                cumulative = 0
+                for bound, bucket in zip(BUCKETS + ('+Inf',), buckets):
+                    cumulative += bucket
+                    lines.append(f'{prefix}_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}_duration_seconds_sum{{{labels}}} {duration_sum:.6f}")
+                lines.append(f"{prefix}_duration_seconds_count{{{labels}}} {count}")
+            for metric, index, help_text in (
+                ('errors_total', 3, f"Calls of {what} {failed}"),
+                ('queries_total', 4, f"SQL statements executed by {what}"),
+                ('payload_bytes_total', 5, f"Size of {payload}"),
+            ):
+                lines += [f"# HELP {prefix}_{metric} {help_text}", f"# TYPE {prefix}_{metric} counter"]
+                for name, values in series:
+                    lines.append(f'{prefix}_{metric}{{{label}="{escape_label(name)}"}} {values[index]}')
+
+        lines += [
+            "# HELP active_rooms Running game rooms held by this worker",
+            "# TYPE active_rooms gauge",
+            f"active_rooms {active_rooms}",
+            "# HELP active_connections Connected SocketIO clients of this worker",
+            "# TYPE active_connections gauge",
+            f"active_connections {connections}",
+            "# HELP answers_total Graded answers",
+            "# TYPE answers_total counter",
+            f"answers_total {answers_total}",
+            f"# HELP answers_per_second Graded answers per second over the last {ANSWER_RATE_WINDOW_SEK} s",
+            "# TYPE answers_per_second gauge",
+            f"answers_per_second {self.answers_per_second():.2f}",
+        ]
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
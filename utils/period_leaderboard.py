@@ -0,0 +1,196 @@
+# utils/period_leaderboard.py - Daily, weekly, monthly and per-Lernfeld leaderboards from zeitraum_punkte
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import SpielAntwort, User, ZeitraumPunkte
+import logging
+
+logger = logging.getLogger(__name__)
+
+ZEITRAEUME = ('tag', 'woche', 'monat', 'gesamt')
+# lernfeld_id of the rows summing all Lernfelder
+ALLE_LERNFELDER = 0
+
+def upsert_add(rows):
+    """Add punkte to zeitraum_punkte rows, inserting missing ones"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(ZeitraumPunkte)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['zeitraum', 'bucket', 'lernfeld_id', 'user_id'],
+            set_={'punkte': ZeitraumPunkte.punkte + stmt.excluded.punkte}
+        )
+        db.session.execute(stmt, rows)
+        return
+    # Other databases: update, insert where nothing was updated
+    for row in rows:
+        result = db.session.execute(
+            update(ZeitraumPunkte)
+            .where(
+                ZeitraumPunkte.zeitraum == row['zeitraum'], ZeitraumPunkte.bucket == row['bucket'],
+                ZeitraumPunkte.lernfeld_id == row['lernfeld_id'], ZeitraumPunkte.user_id == row['user_id']
+            )
+            .values(punkte=ZeitraumPunkte.punkte + row['punkte'])
+        )
+        if result.rowcount == 0:
+            db.session.add(ZeitraumPunkte(**row))
+
+class PeriodLeaderboard:
+    """Leaderboards of the current day, week and month, overall and per Lernfeld
+
+    finalize_game() adds each player's FiSi-Punkte of the game to the
+    current buckets in the same transaction: tag, woche and monat for the
+    game's Lernfeld and for all Lernfelder, gesamt for the Lernfeld (the
+    all-time ranking over all Lernfelder is utils.leaderboard). Buckets
+    follow the calendar of `zone`. A page reads one bucket through the
+    ranking index: top-k and one player's rank, never the game history.
+    Buckets older than the retention are deleted every expire_sek.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.zone = timezone.utc
+        # Buckets kept per zeitraum, counting the current one
+        self.keep = {'tag': 14, 'woche': 8, 'monat': 12}
+        self.expire_sek = 3600
+        self._expire_started = False
+
+    def init_app(self, app):
+        self.app = app
+        zone_name = app.config.get('LEADERBOARD_TIMEZONE', 'Europe/Berlin')
+        try:
+            self.zone = ZoneInfo(zone_name)
+        except Exception as e:
+            logger.warning(f"Unknown LEADERBOARD_TIMEZONE {zone_name!r} ({e}), using UTC")
+            self.zone = timezone.utc
+        self.keep = {
+            'tag': app.config.get('LEADERBOARD_KEEP_DAYS', 14),
+            'woche': app.config.get('LEADERBOARD_KEEP_WEEKS', 8),
+            'monat': app.config.get('LEADERBOARD_KEEP_MONTHS', 12),
+        }
+        self.expire_sek = app.config.get('LEADERBOARD_EXPIRE_SEK', 3600)
+        # One expire loop per process, also when several apps are created
+        if self.expire_sek and not self._expire_started:
+            self._expire_started = True
+            from utils.room_scheduler import scheduler
+            scheduler.schedule(self.expire_sek, 'period_leaderboard', self._periodic_expire)
+
+    # Buckets
+
+    def bucket(self, zeitraum, moment=None):
+        """Bucket key of a zeitraum at moment (default now); keys sort chronologically"""
+        local = (moment or datetime.now(timezone.utc)).astimezone(self.zone)
+        if zeitraum == 'tag':
+            return local.strftime('%Y-%m-%d')
+        if zeitraum == 'woche':
+            year, week, _ = local.isocalendar()
+            return f"{year}-W{week:02d}"
+        if zeitraum == 'monat':
+            return local.strftime('%Y-%m')
+        return ''
+
+    def oldest_bucket(self, zeitraum, now=None):
+        """Oldest bucket still kept"""
+        now = (now or datetime.now(timezone.utc)).astimezone(self.zone)
+        keep = self.keep[zeitraum] - 1
+        if zeitraum == 'tag':
+            return self.bucket('tag', now - timedelta(days=keep))
+        if zeitraum == 'woche':
+            return self.bucket('woche', now - timedelta(weeks=keep))
+        months = now.year * 12 + now.month - 1 - keep
+        return f"{months // 12:04d}-{months % 12 + 1:02d}"
+
+    # Updates
+
+    def record_game(self, sitzung_id, lernfeld_id, ended_at):
+        """Add the points of a finished game to the current buckets, committed by the caller"""
+        points = (
+            db.session.query(SpielAntwort.user_id, func.sum(SpielAntwort.points_earned))
+            .filter(SpielAntwort.sitzung_id == sitzung_id, SpielAntwort.points_earned > 0)
+            .group_by(SpielAntwort.user_id)
+            .all()
+        )
+        if not points:
+            return
+        targets = [('gesamt', '', lernfeld_id)]
+        for zeitraum in ('tag', 'woche', 'monat'):
+            bucket = self.bucket(zeitraum, ended_at)
+            targets += [(zeitraum, bucket, lernfeld_id), (zeitraum, bucket, ALLE_LERNFELDER)]
+        upsert_add([
+            {'zeitraum': zeitraum, 'bucket': bucket, 'lernfeld_id': lf, 'user_id': user_id, 'punkte': punkte}
+            for zeitraum, bucket, lf in targets
+            for user_id, punkte in points
+        ])
+
+    def expire(self):
+        """Delete buckets older than the retention, returns the number of rows"""
+        result = db.session.execute(
+            delete(ZeitraumPunkte).where(or_(*(
+                and_(ZeitraumPunkte.zeitraum == zeitraum, ZeitraumPunkte.bucket < self.oldest_bucket(zeitraum))
+                for zeitraum in self.keep
+            )))
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def _periodic_expire(self):
+        from utils.room_scheduler import scheduler
+        try:
+            deleted = self.expire()
+            if deleted:
+                logger.info(f"Expired {deleted} leaderboard bucket rows")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Expiring leaderboard buckets failed: {e}")
+        scheduler.schedule(self.expire_sek, 'period_leaderboard', self._periodic_expire)
+
+    # Queries
+
+    def _in_bucket(self, entry, zeitraum, lernfeld_id):
+        return and_(
+            entry.zeitraum == zeitraum,
+            entry.bucket == self.bucket(zeitraum),
+            entry.lernfeld_id == lernfeld_id
+        )
+
+    def top(self, zeitraum, lernfeld_id=ALLE_LERNFELDER, limit=10):
+        """[{rank, user_id, username, fisi_punkte}] of the current bucket, one query"""
+        rows = (
+            db.session.query(ZeitraumPunkte.user_id, User.username, ZeitraumPunkte.punkte)
+            .join(User, User.id == ZeitraumPunkte.user_id)
+            .filter(self._in_bucket(ZeitraumPunkte, zeitraum, lernfeld_id))
+            .order_by(ZeitraumPunkte.punkte.desc(), ZeitraumPunkte.user_id)
+            .limit(limit)
+            .all()
+        )
+        entries = []
+        for position, (user_id, username, punkte) in enumerate(rows, start=1):
+            rank = entries[-1]['rank'] if entries and entries[-1]['fisi_punkte'] == punkte else position
+            entries.append({'rank': rank, 'user_id': user_id, 'username': username, 'fisi_punkte': punkte})
+        return entries
+
+    def rank(self, user_id, zeitraum, lernfeld_id=ALLE_LERNFELDER):
+        """(rank, points) of a player in the current bucket, (None, 0) without points, one query"""
+        mine = aliased(ZeitraumPunkte)
+        higher = (
+            select(func.count())
+            .select_from(ZeitraumPunkte)
+            .where(self._in_bucket(ZeitraumPunkte, zeitraum, lernfeld_id), ZeitraumPunkte.punkte > mine.punkte)
+            .scalar_subquery()
+        )
+        row = db.session.execute(
+            select(mine.punkte, higher)
+            .where(self._in_bucket(mine, zeitraum, lernfeld_id), mine.user_id == user_id)
+        ).first()
+        if not row or not row[0]:
+            return None, 0
+        return row[1] + 1, row[0]
+
+period_leaderboard = PeriodLeaderboard()
@@ -0,0 +1,248 @@
+# utils/query_profiler.py - SQL statements per route and socket event, N+1 detection and query budgets
+
+from contextlib import contextmanager
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists differ only in their number of placeholders
+_IN_LIST = re.compile(r'\(\?(?:,\s*\?)*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+# Open scopes of the current thread, innermost last
+_local = threading.local()
+
+def normalize(statement):
+    """Statement text with whitespace and IN lists collapsed, the key for repeats"""
+    return _IN_LIST.sub('(?...)', _WHITESPACE.sub(' ', statement).strip())
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _on_statement(conn, cursor, statement, parameters, context, executemany):
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        key = normalize(statement)
+        for scope in stack:
+            scope.add(key)
+
+class QueryBudgetExceeded(AssertionError):
+    """A route, socket event or test block ran more statements than declared"""
+
+class Scope:
+    """Statements of one route call, socket event or query_budget block"""
+    __slots__ = ('kind', 'name', 'budget', 'statements', 'total')
+
+    def __init__(self, kind, name, budget=None):
+        self.kind = kind
+        self.name = name
+        self.budget = budget
+        # Normalized statement -> executions
+        self.statements = {}
+        self.total = 0
+
+    def add(self, statement):
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        self.total += 1
+
+    def repeated(self, threshold):
+        """(statement, count) executed at least threshold times, most frequent first"""
+        return sorted(
+            ((s, c) for s, c in self.statements.items() if c >= threshold),
+            key=lambda item: -item[1]
+        )
+
+    def describe(self, threshold):
+        lines = [f"{self.kind} {self.name}: {self.total} statements"
+                 + (f" (budget {self.budget})" if self.budget is not None else "")]
+        for statement, count in self.repeated(threshold):
+            lines.append(f"  {count}x {statement[:200]}")
+        return '\n'.join(lines)
+
+class ScopeStats:
+    """Totals of all calls of one route or socket event"""
+    __slots__ = ('calls', 'queries', 'max_queries', 'over_budget', 'repeated')
+
+    def __init__(self):
+        self.calls = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.over_budget = 0
+        # Statement -> highest repeat count seen in one call
+        self.repeated = {}
+
+class QueryProfiler:
+    """Attributes SQL statements to routes and socket events
+
+    Scopes are opened by request hooks (routes) and @metrics.socket_event
+    (socket handlers). At the end of a scope, statements repeated at least
+    repeat_threshold times are logged as N+1 suspects, and a budget
+    declared with @query_profiler.budget(n) is checked: a warning, or
+    QueryBudgetExceeded if strict (tests). Off by default; query_budget()
+    works without enabling it.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.strict = False
+        self.repeat_threshold = 5
+        self.report_sek = 0
+        self._stats = {}
+        self._reported = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('QUERY_PROFILER_ENABLED', False)
+        self.strict = app.config.get('QUERY_BUDGET_STRICT', False)
+        self.repeat_threshold = app.config.get('QUERY_REPEAT_THRESHOLD', 5)
+        self.report_sek = app.config.get('QUERY_PROFILER_REPORT_SEK', 300)
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if self.report_sek:
+            from utils.room_scheduler import scheduler
+            scheduler.schedule(self.report_sek, 'query_profiler', self._periodic_report)
+        logger.info(f"Query profiler enabled (repeat threshold {self.repeat_threshold}, strict {self.strict})")
+
+    def budget(self, max_queries):
+        """Decorator declaring the statement budget of a view or socket handler"""
+        def decorator(func):
+            func.query_budget = max_queries
+            return func
+        return decorator
+
+    # Scopes
+
+    def begin(self, kind, name, budget=None):
+        scope = Scope(kind, name, budget)
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(scope)
+        return scope
+
+    def end(self, scope, record=True):
+        """Close a scope, record and check it; raises QueryBudgetExceeded if strict"""
+        stack = getattr(_local, 'stack', [])
+        if scope in stack:
+            stack.remove(scope)
+        if not record:
+            return
+        repeated = scope.repeated(self.repeat_threshold)
+        over_budget = scope.budget is not None and scope.total > scope.budget
+        self._record(scope, repeated, over_budget)
+
+        for statement, count in repeated:
+            key = (scope.kind, scope.name, statement)
+            if key not in self._reported:
+                self._reported.add(key)
+                logger.warning(f"N+1 suspect in {scope.kind} {scope.name}: {count}x {statement[:200]}")
+        if over_budget:
+            message = scope.describe(self.repeat_threshold)
+            if self.strict:
+                raise QueryBudgetExceeded(f"Query budget exceeded, {message}")
+            logger.warning(f"Query budget exceeded, {message}")
+
+    def _record(self, scope, repeated, over_budget):
+        with self._lock:
+            stats = self._stats.get((scope.kind, scope.name))
+            if stats is None:
+                stats = self._stats[(scope.kind, scope.name)] = ScopeStats()
+            stats.calls += 1
+            stats.queries += scope.total
+            stats.max_queries = max(stats.max_queries, scope.total)
+            stats.over_budget += over_budget
+            for statement, count in repeated:
+                stats.repeated[statement] = max(stats.repeated.get(statement, 0), count)
+
+    def socket_scope(self, name, handler):
+        """Scope for a socket handler call, None when disabled"""
+        if not self.enabled:
+            return None
+        return self.begin('socket', name, getattr(handler, 'query_budget', None))
+
+    # Route hooks
+
+    def _before_request(self):
+        view = current_app.view_functions.get(request.endpoint)
+        g.query_scope = self.begin('http', request.endpoint or 'unmatched', getattr(view, 'query_budget', None))
+
+    def _after_request(self, response):
+        scope = g.pop('query_scope', None)
+        if scope is not None:
+            self.end(scope)
+        return response
+
+    def _teardown_request(self, exc):
+        # Requests that failed before after_request
+        scope = g.pop('query_scope', None)
+        if scope is not None:
+            self.end(scope, record=exc is None)
+
+    # Reports
+
+    def top_offenders(self, limit=10):
+        """[(kind, name, ScopeStats)] by average statements per call, highest first"""
+        with self._lock:
+            items = [(kind, name, stats) for (kind, name), stats in self._stats.items()]
+        items.sort(key=lambda item: -item[2].queries / item[2].calls)
+        return items[:limit]
+
+    def log_top_offenders(self, limit=10):
+        offenders = self.top_offenders(limit)
+        if not offenders:
+            return
+        lines = []
+        for kind, name, stats in offenders:
+            line = (f"  {kind} {name}: {stats.queries / stats.calls:.1f} statements/call "
+                    f"(max {stats.max_queries}, {stats.calls} calls")
+            if stats.over_budget:
+                line += f", {stats.over_budget} over budget"
+            if stats.repeated:
+                line += f", {len(stats.repeated)} repeated statements"
+            lines.append(line + ")")
+        logger.info("Top query offenders:\n" + '\n'.join(lines))
+
+    def _periodic_report(self):
+        from utils.room_scheduler import scheduler
+        self.log_top_offenders()
+        scheduler.schedule(self.report_sek, 'query_profiler', self._periodic_report)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._reported.clear()
+
+query_profiler = QueryProfiler()
+
+@contextmanager
+def query_budget(max_queries, max_repeats=None):
+    """Test helper: fail if the block runs more than max_queries statements
+
+    With max_repeats, also fail if one statement runs more often than that
+    (an N+1 loop). Yields the Scope, whose statements can be inspected.
+
+        with query_budget(8, max_repeats=2):
+            client.get('/profile/stats')
+    """
+    scope = query_profiler.begin('test', 'query_budget', max_queries)
+    try:
+        yield scope
+    finally:
+        query_profiler.end(scope, record=False)
+    problems = []
+    if scope.total > max_queries:
+        problems.append(f"{scope.total} statements, budget {max_queries}")
+    if max_repeats is not None:
+        repeats = scope.repeated(max_repeats + 1)
+        if repeats:
+            problems.append(f"statement repeated {repeats[0][1]}x, allowed {max_repeats}")
+    if problems:
+        raise QueryBudgetExceeded(
+            f"{'; '.join(problems)}\n{scope.describe(max_repeats + 1 if max_repeats is not None else query_profiler.repeat_threshold)}"
+        )
@@ -0,0 +1,64 @@
+# utils/question_payloads.py - Cached localized new_question payloads
+
+from models import Fragetyp
+from utils.answer_keys import LANGUAGES
+import random
+import threading
+
+class QuestionPayload:
+    """new_question payload of one question in one language, built once"""
+    __slots__ = ('base', 'antworten')
+
+    def __init__(self, frage, lang):
+        self.base = {
+            'frage_id': frage.id,
+            'frage_text': frage.get_text(lang),
+            'typ': frage.typ.value,
+            'zeitlimit_sek': frage.zeitlimit_sek,
+            'punkte': frage.punkte
+        }
+        # MC answer options in database order, shuffled per send by render()
+        self.antworten = tuple(frage.get_antworten(lang)) if frage.typ == Fragetyp.MC else None
+
+    def render(self, frage_nummer, order=None):
+        """Payload for one send, answer options permuted by order"""
+        payload = dict(self.base, frage_nummer=frage_nummer)
+        if self.antworten is not None:
+            if order is None:
+                payload['antworten'] = list(self.antworten)
+            else:
+                payload['antworten'] = [self.antworten[i] for i in order]
+        return payload
+
+def shuffled_order(frage):
+    """Random answer order, shared by all languages of one send"""
+    order = list(range(len(frage.antworten)))
+    random.shuffle(order)
+    return order
+
+class QuestionPayloadCache:
+    """Payloads per (frage_id, lang), built from a room's question snapshot on first use"""
+
+    def __init__(self):
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    def get(self, frage, lang='de'):
+        payload = self._payloads.get((frage.id, lang))
+        if payload is None:
+            payload = QuestionPayload(frage, lang)
+            with self._lock:
+                self._payloads[(frage.id, lang)] = payload
+        return payload
+
+    def invalidate(self, frage_id):
+        """Forget payloads after a question was edited or deleted"""
+        with self._lock:
+            for lang in LANGUAGES:
+                self._payloads.pop((frage_id, lang), None)
+
+    def clear(self):
+        with self._lock:
+            self._payloads.clear()
+
+question_payloads = QuestionPayloadCache()
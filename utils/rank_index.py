@@ -0,0 +1,159 @@
+# utils/rank_index.py - Sorted key index with O(log n) rank and position lookups
+
+from bisect import bisect_left, insort
+
+class RankIndex:
+    """Sorted multiset of keys supporting rank queries
+
+    Keys live in sorted buckets of load to 2 * load entries. A Fenwick tree
+    over the bucket sizes maps a bucket to the number of keys before it and
+    a global position back to (bucket, offset), so add, remove, index and
+    at cost O(log n) plus a memmove of at most one bucket. Buckets are split
+    or dropped only when they overflow or empty; the tree is then rebuilt.
+    """
+
+    def __init__(self, keys=(), load=512):
+        self.load = load
+        keys = sorted(keys)
+        self._buckets = [keys[i:i + load] for i in range(0, len(keys), load)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(keys)
+        self._build_tree()
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
+
+    def __contains__(self, key):
+        b = bisect_left(self._maxes, key)
+        if b == len(self._maxes):
+            return False
+        bucket = self._buckets[b]
+        i = bisect_left(bucket, key)
+        return i < len(bucket) and bucket[i] == key
+
+    # Fenwick tree over bucket sizes
+
+    def _build_tree(self):
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket, delta):
+        i = bucket + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _before(self, bucket):
+        """Number of keys in the buckets before bucket"""
+        total = 0
+        i = bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index):
+        """(bucket, offset) of a global position 0 <= index < len"""
+        bucket = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = bucket + step
+            if nxt < len(self._tree) and self._tree[nxt] <= index:
+                bucket = nxt
+                index -= self._tree[nxt]
+            step >>= 1
+        return bucket, index
+
+    # Updates
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._build_tree()
+            return
+
+        b = bisect_left(self._maxes, key)
+        if b == len(self._maxes):
+            b -= 1
+        bucket = self._buckets[b]
+        insort(bucket, key)
+        self._maxes[b] = bucket[-1]
+        self._len += 1
+
+        if len(bucket) > 2 * self.load:
+            self._buckets[b:b + 1] = [bucket[:self.load], bucket[self.load:]]
+            self._maxes[b:b + 1] = [self._buckets[b][-1], self._buckets[b + 1][-1]]
+            self._build_tree()
+        else:
+            self._tree_add(b, 1)
+
+    def remove(self, key):
+        """Remove one occurrence of key, KeyError if it is not present"""
+        b = bisect_left(self._maxes, key)
+        if b == len(self._maxes):
+            raise KeyError(key)
+        bucket = self._buckets[b]
+        i = bisect_left(bucket, key)
+        if i == len(bucket) or bucket[i] != key:
+            raise KeyError(key)
+
+        del bucket[i]
+        self._len -= 1
+        if bucket:
+            self._maxes[b] = bucket[-1]
+            self._tree_add(b, -1)
+        else:
+            del self._buckets[b]
+            del self._maxes[b]
+            self._build_tree()
+
+    def discard(self, key):
+        try:
+            self.remove(key)
+        except KeyError:
+            pass
+
+    # Queries
+
+    def index(self, key):
+        """Number of keys smaller than key"""
+        b = bisect_left(self._maxes, key)
+        if b == len(self._maxes):
+            return self._len
+        return self._before(b) + bisect_left(self._buckets[b], key)
+
+    def at(self, index):
+        """Key at a position, negative positions count from the end"""
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError(index)
+        b, offset = self._locate(index)
+        return self._buckets[b][offset]
+
+    def slice(self, start, stop):
+        """Keys at positions start to stop - 1, clamped to the index"""
+        start = max(start, 0)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        b, offset = self._locate(start)
+        keys = []
+        remaining = stop - start
+        while remaining > 0:
+            chunk = self._buckets[b][offset:offset + remaining]
+            keys.extend(chunk)
+            remaining -= len(chunk)
+            b += 1
+            offset = 0
+        return keys
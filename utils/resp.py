@@ -0,0 +1,257 @@
+# utils/resp.py - Minimal Redis protocol (RESP2) client and in-memory stand-in server
+
+from urllib.parse import urlparse
+import argparse
+import logging
+import socket
+import socketserver
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 6379
+
+class RespError(Exception):
+    """Error reply from the server"""
+
+def encode_command(*args):
+    """Encode a command as RESP array of bulk strings"""
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+        parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b''.join(parts)
+
+def encode_reply(value):
+    """Encode a Python value as RESP reply"""
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RespError):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, bool):
+        return f":{int(value)}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, (list, tuple)):
+        return f"*{len(value)}\r\n".encode() + b''.join(encode_reply(v) for v in value)
+    if isinstance(value, str) and value == 'OK':
+        return b"+OK\r\n"
+    data = value if isinstance(value, bytes) else str(value).encode('utf-8')
+    return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+def read_reply(stream):
+    """Read one RESP value from a buffered binary stream"""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError('Connection closed')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest.decode('utf-8')
+    if kind == b'-':
+        return RespError(rest.decode('utf-8'))
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        size = int(rest)
+        if size < 0:
+            return None
+        data = stream.read(size + 2)
+        return data[:-2]
+    if kind == b'*':
+        count = int(rest)
+        if count < 0:
+            return None
+        return [read_reply(stream) for _ in range(count)]
+    raise RespError(f"Unknown reply type {kind!r}")
+
+class RespClient:
+    """Blocking RESP client, one connection shared under a lock
+
+    Speaks to Redis or any server implementing the same protocol, such as
+    ``RespStandIn`` below. URL format: redis://host:port/db
+    """
+
+    def __init__(self, url='redis://127.0.0.1:6379/0', timeout=5):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or '127.0.0.1', parsed.port or DEFAULT_PORT)
+        self.db = int(parsed.path.strip('/') or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self._sock = None
+        self._stream = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._stream = self._sock.makefile('rb')
+        if self.password:
+            self._roundtrip([('AUTH', self.password)])
+        if self.db:
+            self._roundtrip([('SELECT', self.db)])
+
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+        self._stream = None
+
+    def _roundtrip(self, commands):
+        self._sock.sendall(b''.join(encode_command(*c) for c in commands))
+        return [read_reply(self._stream) for _ in commands]
+
+    def pipeline(self, *commands):
+        """Send several commands in one round trip, returns their replies"""
+        payload = b''.join(encode_command(*c) for c in commands)
+        with self._lock:
+            # A stale connection fails on send, before anything was applied
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(payload)
+                    break
+                except OSError:
+                    self._close()
+                    if attempt:
+                        raise
+            try:
+                replies = [read_reply(self._stream) for _ in commands]
+            except (OSError, ConnectionError):
+                self._close()
+                raise
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline(args)[0]
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+class _StandInHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            if not isinstance(command, list) or not command:
+                self.wfile.write(encode_reply(RespError('ERR protocol error')))
+                continue
+            name = command[0].decode('utf-8').upper()
+            args = command[1:]
+            with self.server.lock:
+                try:
+                    reply = self.server.dispatch(name, args)
+                except Exception as e:
+                    reply = RespError(f"ERR {e}")
+            self.wfile.write(encode_reply(reply))
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    """In-memory server for the RESP commands used by this app
+
+    Stand-in for Redis in tests and local multi-worker runs. Every command
+    runs under one lock, so single commands are atomic as in Redis. Keys
+    never expire.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT):
+        super().__init__((host, port), _StandInHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def dispatch(self, name, args):
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            return RespError(f"ERR unknown command '{name}'")
+        return handler(*args)
+
+    def cmd_ping(self, *args):
+        return 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_get(self, key):
+        return self.data.get(key)
+
+    def cmd_set(self, key, value, *options):
+        options = [o.upper() for o in options]
+        if b'NX' in options and key in self.data:
+            return None
+        self.data[key] = value
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def cmd_expire(self, key, seconds):
+        return int(key in self.data)
+
+    def cmd_sadd(self, key, *members):
+        members_set = self.data.setdefault(key, set())
+        added = [m for m in members if m not in members_set]
+        members_set.update(added)
+        return len(added)
+
+    def cmd_sismember(self, key, member):
+        return int(member in self.data.get(key, ()))
+
+    def cmd_smembers(self, key):
+        return list(self.data.get(key, ()))
+
+    def cmd_scard(self, key):
+        return len(self.data.get(key, ()))
+
+    def cmd_hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def cmd_hset(self, key, *pairs):
+        fields = self.data.setdefault(key, {})
+        added = sum(field not in fields for field in pairs[::2])
+        fields.update(zip(pairs[::2], pairs[1::2]))
+        return added
+
+    def cmd_hdel(self, key, *names):
+        fields = self.data.get(key, {})
+        return sum(fields.pop(name, None) is not None for name in names)
+
+    def cmd_hsetnx(self, key, field, value):
+        fields = self.data.setdefault(key, {})
+        if field in fields:
+            return 0
+        fields[field] = value
+        return 1
+
+    def cmd_hincrby(self, key, field, amount):
+        fields = self.data.setdefault(key, {})
+        value = int(fields.get(field, 0)) + int(amount)
+        fields[field] = str(value).encode()
+        return value
+
+    def cmd_hgetall(self, key):
+        result = []
+        for field, value in self.data.get(key, {}).items():
+            result.extend((field, value))
+        return result
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        return 'OK'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the in-memory RESP stand-in server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = RespStandIn(args.host, args.port)
+    logger.info(f"RESP stand-in listening on {args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,87 @@
+# utils/room_scheduler.py - Deadline scheduler for game room phases
+
+from extensions import socketio
+from utils.query_profiler import query_profiler
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class RoomScheduler:
+    """Single background loop owning question open/close/reveal deadlines
+
+    Deadlines of all rooms live in one heap that a single background task
+    drains every tick, so event handlers never sleep and a room costs one
+    heap entry per pending phase instead of a parked greenlet.
+    """
+
+    def __init__(self, tick=0.1):
+        self.tick = tick
+        self.app = None
+        self._heap = []
+        self._seq = itertools.count()
+        # Room code -> generation; dropping it invalidates pending entries
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._task = None
+
+    def init_app(self, app):
+        self.app = app
+        self.tick = app.config.get('SCHEDULER_TICK_MS', 100) / 1000
+
+    def schedule(self, delay, room_code, callback, *args):
+        """Run callback(*args) in an app context after delay seconds"""
+        with self._lock:
+            generation = self._generations.get(room_code)
+            if generation is None:
+                generation = self._generations[room_code] = next(self._seq)
+            heapq.heappush(self._heap, (
+                time.monotonic() + delay, next(self._seq),
+                room_code, generation, callback, args
+            ))
+            if self._task is None:
+                self._task = socketio.start_background_task(self._run)
+
+    def cancel_room(self, room_code):
+        """Drop all pending deadlines of a room"""
+        with self._lock:
+            self._generations.pop(room_code, None)
+
+    def pending(self):
+        """Number of queued deadlines"""
+        return len(self._heap)
+
+    def run_pending(self, now=None):
+        """Run every callback whose deadline has passed"""
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, room_code, generation, callback, args = heapq.heappop(self._heap)
+                if self._generations.get(room_code) == generation:
+                    due.append((room_code, callback, args))
+
+        for room_code, callback, args in due:
+            # Statements of timer callbacks are profiled like socket events
+            scope = query_profiler.begin('task', callback.__name__) if query_profiler.enabled else None
+            try:
+                with self.app.app_context():
+                    callback(*args)
+                if scope is not None:
+                    query_profiler.end(scope)
+            except Exception as e:
+                if scope is not None:
+                    query_profiler.end(scope, record=False)
+                logger.exception(f"Scheduled {callback.__name__} failed for room {room_code}: {e}")
+        return len(due)
+
+    def _run(self):
+        logger.info("Room scheduler started")
+        while True:
+            socketio.sleep(self.tick)
+            self.run_pending()
+
+scheduler = RoomScheduler()
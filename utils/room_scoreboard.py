@@ -0,0 +1,72 @@
+# utils/room_scoreboard.py - Live ranking of the players in one game room
+
+from utils.leaderboard import make_key, split_key
+from utils.rank_index import RankIndex
+
+class RoomScoreboard:
+    """Players of a room sorted by score, kept by GameRoom under its lock
+
+    Every scored answer moves one key in a RankIndex (O(log n)), so a
+    player's live rank is one index lookup. At question close, close_round()
+    walks the sorted keys once and compares each rank with the previous
+    round's snapshot; a 1000-player room costs about a millisecond.
+    Ties share a rank: the rank is 1 + the number of players with more points.
+    """
+
+    def __init__(self, scores=None):
+        # User ID -> score of every player
+        self._scores = dict(scores or {})
+        self._index = RankIndex((make_key(user_id, score) for user_id, score in self._scores.items()), load=128)
+        # User ID -> rank at the last close_round()
+        self._round_ranks = {}
+
+    def __len__(self):
+        return len(self._index)
+
+    def set(self, user_id, score):
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._index.remove(make_key(user_id, old))
+        self._index.add(make_key(user_id, score))
+        self._scores[user_id] = score
+
+    def rank(self, user_id):
+        """Current rank of a player, None if unknown"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._index.index(make_key(0, score)) + 1
+
+    def ranked(self, limit=None):
+        """[(rank, user_id, score)] best first"""
+        keys = self._index.slice(0, len(self._index) if limit is None else limit)
+        rows = []
+        for position, key in enumerate(keys, start=1):
+            user_id, score = split_key(key)
+            rank = rows[-1][0] if rows and rows[-1][2] == score else position
+            rows.append((rank, user_id, score))
+        return rows
+
+    def close_round(self):
+        """[(rank, user_id, score, previous_rank, points_to_next)] of all players, snapshots the ranks
+
+        previous_rank is None for a player's first round, points_to_next is
+        the gap to the next better score (0 for the leaders).
+        """
+        rows = []
+        ranks = {}
+        better_score = None
+        previous_score = None
+        for rank, user_id, score in self.ranked():
+            if previous_score is not None and score != previous_score:
+                better_score = previous_score
+            previous_score = score
+            rows.append((
+                rank, user_id, score, self._round_ranks.get(user_id),
+                better_score - score if better_score is not None else 0
+            ))
+            ranks[user_id] = rank
+        self._round_ranks = ranks
+        return rows
@@ -0,0 +1,430 @@
+# utils/room_store.py - Shared room state for several worker processes
+
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+class RoomStateStore(ABC):
+    """Per-room state that every worker must agree on
+
+    All operations are atomic on their own, so two workers racing on the
+    same room see exactly one winner:
+    - ``register_answer`` accepts the first answer of a player per question
+    - ``add_score`` increments a player's score and returns the new total
+    - ``claim`` succeeds once per named phase transition, e.g. closing a question
+    Connection records map SocketIO session IDs to users, the worker
+    registry holds the last heartbeat of every worker (see utils/sharding.py).
+    """
+
+    @abstractmethod
+    def register_answer(self, room_code, frage_id, user_id):
+        """True if this is the player's first answer to the question"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def register_answers(self, room_code, frage_id, user_ids):
+        """Mark several players as having answered a question, e.g. after a restore"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def answer_count(self, room_code, frage_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_score(self, room_code, user_id, points):
+        """Add points to a player's score, returns the new total"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def seed_scores(self, room_code, scores):
+        """Set scores of players that have none yet, e.g. after a restore"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def scores(self, room_code):
+        """{user_id: score} of a room"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, room_code, transition):
+        """True for exactly one caller per (room, transition)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_phase(self, room_code, phase):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_phase(self, room_code):
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear_room(self, room_code):
+        """Forget all state of a finished room"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_connection(self, sid, user_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def pop_connection(self, sid):
+        """Remove a connection record, returns its user ID or None"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def heartbeat(self, worker_id, timestamp):
+        """Record that a worker is alive"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def workers(self):
+        """{worker_id: last heartbeat timestamp}"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_worker(self, worker_id):
+        raise NotImplementedError
+
+class MemoryRoomStore(RoomStateStore):
+    """Dict-based store, only valid within one process"""
+
+    def __init__(self):
+        self._answers = {}
+        self._scores = {}
+        self._claims = {}
+        self._phases = {}
+        self._connections = {}
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    def register_answer(self, room_code, frage_id, user_id):
+        with self._lock:
+            answered = self._answers.setdefault(room_code, {}).setdefault(frage_id, set())
+            if user_id in answered:
+                return False
+            answered.add(user_id)
+            return True
+
+    def register_answers(self, room_code, frage_id, user_ids):
+        with self._lock:
+            self._answers.setdefault(room_code, {}).setdefault(frage_id, set()).update(user_ids)
+
+    def answer_count(self, room_code, frage_id):
+        return len(self._answers.get(room_code, {}).get(frage_id, ()))
+
+    def add_score(self, room_code, user_id, points):
+        with self._lock:
+            scores = self._scores.setdefault(room_code, {})
+            scores[user_id] = scores.get(user_id, 0) + points
+            return scores[user_id]
+
+    def seed_scores(self, room_code, scores):
+        with self._lock:
+            room_scores = self._scores.setdefault(room_code, {})
+            for user_id, score in scores.items():
+                room_scores.setdefault(user_id, score)
+
+    def scores(self, room_code):
+        return dict(self._scores.get(room_code, {}))
+
+    def claim(self, room_code, transition):
+        with self._lock:
+            claims = self._claims.setdefault(room_code, set())
+            if transition in claims:
+                return False
+            claims.add(transition)
+            return True
+
+    def set_phase(self, room_code, phase):
+        self._phases[room_code] = phase
+
+    def get_phase(self, room_code):
+        return self._phases.get(room_code)
+
+    def clear_room(self, room_code):
+        with self._lock:
+            for states in (self._answers, self._scores, self._claims, self._phases):
+                states.pop(room_code, None)
+
+    def set_connection(self, sid, user_id):
+        self._connections[sid] = user_id
+
+    def pop_connection(self, sid):
+        return self._connections.pop(sid, None)
+
+    def heartbeat(self, worker_id, timestamp):
+        self._workers[worker_id] = timestamp
+
+    def workers(self):
+        return dict(self._workers)
+
+    def remove_worker(self, worker_id):
+        self._workers.pop(worker_id, None)
+
+class SQLiteRoomStore(RoomStateStore):
+    """Store in a SQLite file shared by all workers of one host
+
+    Put the file on a tmpfs such as /dev/shm to keep it in shared memory.
+    Each thread uses its own connection; writes run in IMMEDIATE
+    transactions, which serialize them across processes.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS room_answer (room TEXT, frage_id INTEGER, user_id INTEGER, "
+        "PRIMARY KEY (room, frage_id, user_id)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS room_score (room TEXT, user_id INTEGER, score INTEGER NOT NULL, "
+        "PRIMARY KEY (room, user_id)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS room_claim (room TEXT, transition TEXT, "
+        "PRIMARY KEY (room, transition)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS room_phase (room TEXT PRIMARY KEY, phase TEXT)",
+        "CREATE TABLE IF NOT EXISTS room_connection (sid TEXT PRIMARY KEY, user_id INTEGER)",
+        "CREATE TABLE IF NOT EXISTS room_worker (worker_id TEXT PRIMARY KEY, seen REAL)",
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, statements):
+        """Run (sql, params) pairs in one IMMEDIATE transaction, returns rows of the last one"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = []
+            for sql, params in statements:
+                rows = conn.execute(sql, params).fetchall()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def register_answer(self, room_code, frage_id, user_id):
+        cursor = self._conn().execute(
+            "INSERT OR IGNORE INTO room_answer VALUES (?, ?, ?)", (room_code, frage_id, user_id)
+        )
+        return cursor.rowcount == 1
+
+    def register_answers(self, room_code, frage_id, user_ids):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO room_answer VALUES (?, ?, ?)",
+                [(room_code, frage_id, user_id) for user_id in user_ids]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def answer_count(self, room_code, frage_id):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM room_answer WHERE room = ? AND frage_id = ?", (room_code, frage_id)
+        ).fetchone()[0]
+
+    def add_score(self, room_code, user_id, points):
+        rows = self._write([
+            ("INSERT INTO room_score VALUES (?, ?, ?) "
+             "ON CONFLICT (room, user_id) DO UPDATE SET score = score + excluded.score",
+             (room_code, user_id, points)),
+            ("SELECT score FROM room_score WHERE room = ? AND user_id = ?", (room_code, user_id)),
+        ])
+        return rows[0][0]
+
+    def seed_scores(self, room_code, scores):
+        self._write([
+            ("INSERT OR IGNORE INTO room_score VALUES (?, ?, ?)", (room_code, user_id, score))
+            for user_id, score in scores.items()
+        ])
+
+    def scores(self, room_code):
+        return dict(self._conn().execute(
+            "SELECT user_id, score FROM room_score WHERE room = ?", (room_code,)
+        ))
+
+    def claim(self, room_code, transition):
+        cursor = self._conn().execute(
+            "INSERT OR IGNORE INTO room_claim VALUES (?, ?)", (room_code, transition)
+        )
+        return cursor.rowcount == 1
+
+    def set_phase(self, room_code, phase):
+        self._conn().execute("INSERT OR REPLACE INTO room_phase VALUES (?, ?)", (room_code, phase))
+
+    def get_phase(self, room_code):
+        row = self._conn().execute("SELECT phase FROM room_phase WHERE room = ?", (room_code,)).fetchone()
+        return row[0] if row else None
+
+    def clear_room(self, room_code):
+        self._write([
+            (f"DELETE FROM {table} WHERE room = ?", (room_code,))
+            for table in ('room_answer', 'room_score', 'room_claim', 'room_phase')
+        ])
+
+    def set_connection(self, sid, user_id):
+        self._conn().execute("INSERT OR REPLACE INTO room_connection VALUES (?, ?)", (sid, user_id))
+
+    def pop_connection(self, sid):
+        rows = self._write([
+            ("DELETE FROM room_connection WHERE sid = ? RETURNING user_id", (sid,)),
+        ])
+        return rows[0][0] if rows else None
+
+    def heartbeat(self, worker_id, timestamp):
+        self._conn().execute("INSERT OR REPLACE INTO room_worker VALUES (?, ?)", (worker_id, timestamp))
+
+    def workers(self):
+        return dict(self._conn().execute("SELECT worker_id, seen FROM room_worker"))
+
+    def remove_worker(self, worker_id):
+        self._conn().execute("DELETE FROM room_worker WHERE worker_id = ?", (worker_id,))
+
+class RedisRoomStore(RoomStateStore):
+    """Store on Redis or any server speaking its protocol (see utils/resp.py)
+
+    Answers are one set of user IDs per question: SADD decides the first
+    answer and SCARD counts the same set, so there is no second counter to
+    drift. An index set lists those questions for clear_room(). Claims are
+    set members, scores a hash.
+    """
+
+    def __init__(self, url, prefix='fisi-quiz', ttl_sek=86400):
+        from utils.resp import RespClient
+        self.client = RespClient(url)
+        self.prefix = prefix
+        self.ttl_sek = ttl_sek
+
+    def _key(self, room_code, name):
+        return f"{self.prefix}:room:{room_code}:{name}"
+
+    def _keys(self, room_code):
+        return [self._key(room_code, name) for name in ('answered', 'scores', 'claims', 'phase')]
+
+    def register_answer(self, room_code, frage_id, user_id):
+        key = self._key(room_code, f"answers:{frage_id}")
+        index_key = self._key(room_code, 'answered')
+        added, _, _, _ = self.client.pipeline(
+            ('SADD', key, user_id),
+            ('EXPIRE', key, self.ttl_sek),
+            ('SADD', index_key, frage_id),
+            ('EXPIRE', index_key, self.ttl_sek)
+        )
+        return bool(added)
+
+    def register_answers(self, room_code, frage_id, user_ids):
+        if not user_ids:
+            return
+        key = self._key(room_code, f"answers:{frage_id}")
+        index_key = self._key(room_code, 'answered')
+        self.client.pipeline(
+            ('SADD', key, *user_ids),
+            ('EXPIRE', key, self.ttl_sek),
+            ('SADD', index_key, frage_id),
+            ('EXPIRE', index_key, self.ttl_sek)
+        )
+
+    def answer_count(self, room_code, frage_id):
+        return self.client.execute('SCARD', self._key(room_code, f"answers:{frage_id}"))
+
+    def add_score(self, room_code, user_id, points):
+        key = self._key(room_code, 'scores')
+        total, _ = self.client.pipeline(
+            ('HINCRBY', key, user_id, points),
+            ('EXPIRE', key, self.ttl_sek)
+        )
+        return total
+
+    def seed_scores(self, room_code, scores):
+        if not scores:
+            return
+        key = self._key(room_code, 'scores')
+        self.client.pipeline(*[
+            ('HSETNX', key, user_id, score) for user_id, score in scores.items()
+        ], ('EXPIRE', key, self.ttl_sek))
+
+    def scores(self, room_code):
+        flat = self.client.execute('HGETALL', self._key(room_code, 'scores'))
+        return {int(flat[i]): int(flat[i + 1]) for i in range(0, len(flat), 2)}
+
+    def claim(self, room_code, transition):
+        key = self._key(room_code, 'claims')
+        added, _ = self.client.pipeline(
+            ('SADD', key, transition),
+            ('EXPIRE', key, self.ttl_sek)
+        )
+        return bool(added)
+
+    def set_phase(self, room_code, phase):
+        self.client.execute('SET', self._key(room_code, 'phase'), phase, 'EX', self.ttl_sek)
+
+    def get_phase(self, room_code):
+        phase = self.client.execute('GET', self._key(room_code, 'phase'))
+        return phase.decode('utf-8') if phase is not None else None
+
+    def clear_room(self, room_code):
+        frage_ids = self.client.execute('SMEMBERS', self._key(room_code, 'answered'))
+        answer_keys = [self._key(room_code, f"answers:{frage_id.decode('utf-8')}") for frage_id in frage_ids]
+        self.client.execute('DEL', *self._keys(room_code), *answer_keys)
+
+    def set_connection(self, sid, user_id):
+        self.client.execute('SET', f"{self.prefix}:conn:{sid}", user_id, 'EX', self.ttl_sek)
+
+    def pop_connection(self, sid):
+        key = f"{self.prefix}:conn:{sid}"
+        user_id, _ = self.client.pipeline(('GET', key), ('DEL', key))
+        return int(user_id) if user_id is not None else None
+
+    def heartbeat(self, worker_id, timestamp):
+        self.client.execute('HSET', f"{self.prefix}:workers", worker_id, timestamp)
+
+    def workers(self):
+        flat = self.client.execute('HGETALL', f"{self.prefix}:workers")
+        return {flat[i].decode('utf-8'): float(flat[i + 1]) for i in range(0, len(flat), 2)}
+
+    def remove_worker(self, worker_id):
+        self.client.execute('HDEL', f"{self.prefix}:workers", worker_id)
+
+def create_room_store(url):
+    """Store for memory://, sqlite:///path or redis://host:port/db"""
+    scheme = urlparse(url).scheme
+    if scheme == 'memory':
+        return MemoryRoomStore()
+    if scheme == 'sqlite':
+        return SQLiteRoomStore(url[len('sqlite:///'):])
+    if scheme in ('redis', 'resp'):
+        return RedisRoomStore(url)
+    raise ValueError(f"Unsupported ROOM_STORE_URL: {url}")
+
+class RoomStoreProxy:
+    """Module-level handle on the configured store, bound by init_app"""
+
+    def __init__(self):
+        self.backend = MemoryRoomStore()
+
+    def init_app(self, app):
+        url = app.config.get('ROOM_STORE_URL', 'memory://')
+        self.backend = create_room_store(url)
+        logger.info(f"Room state store: {type(self.backend).__name__}")
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+room_store = RoomStoreProxy()
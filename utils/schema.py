@@ -0,0 +1,99 @@
+# utils/schema.py - Lightweight schema upgrades for existing databases
+
+from sqlalchemy import inspect, insert, text, update
+from sqlalchemy.exc import DBAPIError
+from extensions import db
+from models import SpielTeilnahme, SpielAntwort
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns added after the initial release: (table, column, SQL type)
+ADDED_COLUMNS = [
+    ('spiel_sitzung', 'fragen_deck', 'JSON'),
+    ('spiel_sitzung', 'ergebnis', 'JSON'),
+]
+
+def upgrade_schema():
+    """Add missing columns to tables created by an older version
+
+    Every worker runs this at startup. Each column is committed on its own;
+    when another worker added it first, the ALTER fails and is only logged.
+    """
+    inspector = inspect(db.engine)
+    table_names = set(inspector.get_table_names())
+    
+    for table, column, sql_type in ADDED_COLUMNS:
+        if table not in table_names:
+            continue
+        
+        existing = {c['name'] for c in inspector.get_columns(table)}
+        if column in existing:
+            continue
+        try:
+            db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {sql_type}'))
+            db.session.commit()
+            logger.info(f"Schema upgrade: added {table}.{column}")
+        except DBAPIError:
+            db.session.rollback()
+            if column not in {c['name'] for c in inspect(db.engine).get_columns(table)}:
+                raise
+            logger.info(f"Schema upgrade: {table}.{column} was added by another worker")
+
+def migrate_answers_data(batch_size=500):
+    """Move legacy SpielTeilnahme.answers_data JSON lists into SpielAntwort rows"""
+    already_migrated = {
+        teilnahme_id for (teilnahme_id,) in
+        db.session.query(SpielAntwort.teilnahme_id).distinct()
+    }
+    
+    moved = 0
+    last_id = 0
+    while True:
+        teilnahmen = (
+            SpielTeilnahme.query
+            .filter(SpielTeilnahme.id > last_id, SpielTeilnahme.answers_data.isnot(None))
+            .order_by(SpielTeilnahme.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not teilnahmen:
+            break
+        last_id = teilnahmen[-1].id
+        
+        rows = []
+        seen = set()
+        for teilnahme in teilnahmen:
+            if teilnahme.id in already_migrated:
+                continue
+            for entry in teilnahme.answers_data or []:
+                key = (teilnahme.id, entry.get('frage_id'))
+                if key[1] is None or key in seen:
+                    continue
+                seen.add(key)
+                rows.append({
+                    'teilnahme_id': teilnahme.id,
+                    'sitzung_id': teilnahme.sitzung_id,
+                    'user_id': teilnahme.user_id,
+                    'frage_id': entry['frage_id'],
+                    'answer': entry.get('answer'),
+                    'is_correct': bool(entry.get('is_correct')),
+                    'points_earned': entry.get('points_earned') or 0,
+                    'time_elapsed': entry.get('time_elapsed') or 0
+                })
+        
+        if rows:
+            db.session.execute(insert(SpielAntwort), rows)
+            moved += len(rows)
+        
+        # Clear the blob so the participation is not migrated twice
+        db.session.execute(
+            update(SpielTeilnahme)
+            .where(SpielTeilnahme.id.in_([t.id for t in teilnahmen]))
+            .values(answers_data=db.null())
+        )
+        db.session.commit()
+    
+    if moved:
+        logger.info(f"Migrated {moved} answers from answers_data to spiel_antwort")
+    return moved
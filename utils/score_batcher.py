@@ -0,0 +1,57 @@
+# utils/score_batcher.py - Coalesced score broadcasting per room
+
+from extensions import socketio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class ScoreBatcher:
+    """Collect score changes per room and broadcast them as one scores_batch event
+
+    Several answers of the same player between two flushes collapse into a
+    single entry carrying the latest score and the summed points change.
+    """
+
+    def __init__(self):
+        # Room code -> {user_id: entry}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, room_code, user_id, username, score, points_change):
+        """Queue a score change, True if it opened a new batch for the room"""
+        with self._lock:
+            batch = self._pending.get(room_code)
+            is_new = batch is None
+            if is_new:
+                batch = self._pending[room_code] = {}
+
+            entry = batch.get(user_id)
+            if entry is None:
+                batch[user_id] = {
+                    'user_id': user_id,
+                    'username': username,
+                    'score': score,
+                    'points_change': points_change
+                }
+            else:
+                entry['score'] = score
+                entry['points_change'] += points_change
+            return is_new
+
+    def flush(self, room_code):
+        """Broadcast pending changes of a room, returns the number of entries sent"""
+        with self._lock:
+            batch = self._pending.pop(room_code, None)
+        if not batch:
+            return 0
+
+        socketio.emit('scores_batch', {'scores': list(batch.values())}, room=room_code)
+        return len(batch)
+
+    def discard(self, room_code):
+        """Drop pending changes of a room without sending them"""
+        with self._lock:
+            self._pending.pop(room_code, None)
+
+score_batcher = ScoreBatcher()
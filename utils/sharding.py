@@ -0,0 +1,233 @@
+# utils/sharding.py - Room ownership and socket event routing across worker processes
+
+from functools import wraps
+from flask import request, session
+from extensions import socketio, db
+from models import SpielSitzung
+from utils.game_room import get_room, load_room, release_room, active_rooms
+from utils.room_scheduler import scheduler
+from utils.room_store import room_store
+import hashlib
+import logging
+import os
+import pickle
+import queue
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+def shard_weight(worker_id, room_code):
+    """Stable pseudo-random weight of a (worker, room) pair, equal in every process"""
+    digest = hashlib.blake2b(f"{worker_id}/{room_code}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+def owner_of(room_code, workers):
+    """Owning worker of a room by rendezvous hashing, None without workers
+
+    Every worker computes the same owner from the same worker list. When a
+    worker leaves, only its own rooms move, spread evenly over the others.
+    """
+    if not workers:
+        return None
+    return max(workers, key=lambda worker_id: shard_weight(worker_id, room_code))
+
+def routing_manager(manager_class):
+    """Subclass of a SocketIO PubSubManager that also carries routed socket events"""
+
+    class RoutingManager(manager_class):
+
+        def route(self, message):
+            self._publish({'method': 'route', 'host_id': self.host_id, **message})
+
+        def _listen(self):
+            for message in super()._listen():
+                data = message
+                if isinstance(message, bytes):
+                    try:
+                        data = pickle.loads(message)
+                    except Exception:
+                        pass
+                if isinstance(data, dict) and data.get('method') == 'route':
+                    shard_router.receive(data)
+                    continue
+                # Decoded messages are accepted as is by the listener thread
+                yield data
+
+    RoutingManager.__name__ = f"Routing{manager_class.__name__}"
+    return RoutingManager
+
+class ShardRouter:
+    """Route the socket events of each running room to the worker owning it
+
+    Workers announce themselves with heartbeats in the shared room store.
+    The owner of a room follows from its code and the live workers (see
+    ``owner_of``); only the owner keeps the room in memory and runs its
+    timers. Events for rooms owned elsewhere are forwarded through the
+    SocketIO message queue and handled by the owner on behalf of the
+    original connection, whose replies travel back the same way.
+
+    When a worker misses heartbeats for ``timeout_sek`` its rooms move to
+    the remaining workers, which restore them from the database and the
+    shared store and re-arm their timers.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.worker_id = None
+        self.workers = ()
+        self.heartbeat_sek = 2
+        self.timeout_sek = 6
+        self.handlers = {}
+        # Set by socketio_events: hand a room over to its new owner
+        self.on_release = None
+        self._inbox = queue.Queue()
+        self._stable = False
+
+    def init_app(self, app):
+        self.app = app
+        self.worker_id = app.config.get('WORKER_ID') or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_sek = app.config.get('SHARD_HEARTBEAT_SEK', 2)
+        self.timeout_sek = app.config.get('SHARD_WORKER_TIMEOUT_SEK', 6)
+        self.enabled = app.config.get('SHARDING_ENABLED', False)
+        if not self.enabled:
+            return
+
+        if app.config.get('SOCKETIO_ASYNC_MODE') == 'asgi':
+            logger.warning("Room sharding is not available with SOCKETIO_ASYNC_MODE=asgi, disabled")
+            self.enabled = False
+            return
+        if not app.config.get('SOCKETIO_MESSAGE_QUEUE'):
+            logger.warning("SHARDING_ENABLED needs SOCKETIO_MESSAGE_QUEUE, room sharding disabled")
+            self.enabled = False
+            return
+        if app.config.get('ROOM_STORE_URL', 'memory://').startswith('memory://'):
+            logger.warning("SHARDING_ENABLED with a memory:// room store only sees this worker")
+
+        logger.info(f"Room sharding enabled, worker {self.worker_id}")
+        scheduler.schedule(0, 'shards', self.heartbeat)
+        socketio.start_background_task(self._drain_inbox)
+
+    def owner(self, room_code):
+        return owner_of(room_code, self.workers)
+
+    def owns(self, room_code):
+        """True if this worker handles the room, also before the first heartbeat"""
+        owner = self.owner(room_code)
+        return owner is None or owner == self.worker_id
+
+    # Membership
+
+    def heartbeat(self):
+        """Scheduled: announce this worker, refresh the live worker list and rebalance"""
+        now = time.time()
+        room_store.heartbeat(self.worker_id, now)
+
+        live = []
+        for worker_id, seen in room_store.workers().items():
+            if now - seen <= self.timeout_sek:
+                live.append(worker_id)
+            else:
+                logger.warning(f"Worker {worker_id} missed its heartbeats, moving its rooms")
+                room_store.remove_worker(worker_id)
+        live = tuple(sorted(live))
+
+        if live != self.workers:
+            logger.info(f"Live workers: {', '.join(live)}")
+            self.workers = live
+            self._stable = False
+            self.release_foreign_rooms()
+        elif not self._stable:
+            # Adopt only after the worker list held for one heartbeat, so a
+            # previous owner has seen the same list and released the room
+            self._stable = True
+            self.adopt_orphaned_rooms()
+
+        scheduler.schedule(self.heartbeat_sek, 'shards', self.heartbeat)
+
+    def release_foreign_rooms(self):
+        """Hand over rooms that moved to another worker"""
+        for room in active_rooms():
+            if self.owns(room.room_code):
+                continue
+            if self.on_release:
+                self.on_release(room.room_code)
+            release_room(room.room_code)
+            logger.info(f"Room {room.room_code} handed over to worker {self.owner(room.room_code)}")
+
+    def adopt_orphaned_rooms(self):
+        """Restore running rooms this worker owns but has not loaded"""
+        running = (
+            db.session.query(SpielSitzung.raum_code)
+            .filter(SpielSitzung.ist_aktiv == True, SpielSitzung.started_at.isnot(None))
+        )
+        for (room_code,) in running:
+            # Rooms without a phase in the shared store are not running anywhere
+            if self.owns(room_code) and get_room(room_code) is None and room_store.get_phase(room_code):
+                self.adopt(room_code)
+
+    def adopt(self, room_code):
+        """Load a room this worker now owns, load_room resumes its timers"""
+        if get_room(room_code) is not None:
+            return
+        if load_room(room_code) is not None:
+            logger.info(f"Worker {self.worker_id} adopted room {room_code}")
+
+    # Event routing
+
+    def routed(self, handler):
+        """Decorator for socket event handlers taking a room_code, runs them on the room's owner"""
+        self.handlers[handler.__name__] = handler
+
+        @wraps(handler)
+        def wrapper(data):
+            room_code = data.get('room_code') if isinstance(data, dict) else None
+            if not self.enabled or not room_code:
+                return handler(data)
+            if not self.owns(room_code):
+                self.forward(handler.__name__, room_code, data)
+                return
+            self.adopt(room_code)
+            return handler(data)
+        return wrapper
+
+    def forward(self, handler_name, room_code, data):
+        """Publish an event for the owner of its room, with the sender's identity"""
+        socketio.server.manager.route({
+            'target': self.owner(room_code),
+            'handler': handler_name,
+            'room_code': room_code,
+            'data': data,
+            'sid': request.sid,
+            'namespace': request.namespace,
+            'session': dict(session)
+        })
+
+    def receive(self, message):
+        """Queue a routed event addressed to this worker, called by the listener thread"""
+        if message.get('target') == self.worker_id:
+            self._inbox.put(message)
+
+    def _drain_inbox(self):
+        # One consumer keeps events of a connection in order
+        while True:
+            message = self._inbox.get()
+            try:
+                self.dispatch(message)
+            except Exception as e:
+                logger.exception(f"Routed {message.get('handler')} failed for room {message.get('room_code')}: {e}")
+
+    def dispatch(self, message):
+        """Run a routed event as if its connection were local"""
+        handler = self.handlers.get(message['handler'])
+        if handler is None:
+            return
+        with self.app.test_request_context('/socket.io/'):
+            request.sid = message['sid']
+            request.namespace = message['namespace']
+            session.update(message['session'])
+            self.adopt(message['room_code'])
+            handler(message['data'])
+
+shard_router = ShardRouter()
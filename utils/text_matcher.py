@@ -0,0 +1,137 @@
+# utils/text_matcher.py - Bounded fuzzy matching for text answers
+
+from difflib import SequenceMatcher
+import re
+import unicodedata
+
+MODES = ('damerau', 'levenshtein', 'difflib')
+
+_FOLD = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+_WHITESPACE = re.compile(r'\s+')
+
+def fold_text(text):
+    """Lowercase, fold umlauts and ß, strip accents and collapse whitespace"""
+    text = str(text).strip().lower().translate(_FOLD)
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _WHITESPACE.sub(' ', text)
+
+def bounded_distance(a, b, max_dist, transpositions=True):
+    """Edit distance of a and b, or max_dist + 1 as soon as it must exceed max_dist
+
+    Levenshtein distance, or optimal string alignment (adjacent swaps cost
+    one edit) with ``transpositions``. Only the diagonal band of width
+    2 * max_dist + 1 is computed and the scan stops once a whole row is
+    above the bound.
+    """
+    over = max_dist + 1
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    if lb - la > max_dist:
+        return over
+
+    # Common prefix and suffix never change the distance
+    start = 0
+    while start < la and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < la - start and a[la - 1 - end] == b[lb - 1 - end]:
+        end += 1
+    a = a[start:la - end]
+    b = b[start:lb - end]
+    la, lb = len(a), len(b)
+    if la == 0:
+        return lb if lb <= max_dist else over
+
+    prev_prev = None
+    prev = [j if j <= max_dist else over for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        ca = a[i - 1]
+        cur = [over] * (lb + 1)
+        if i <= max_dist:
+            cur[0] = i
+        row_min = cur[0]
+        for j in range(max(1, i - max_dist), min(lb, i + max_dist) + 1):
+            cb = b[j - 1]
+            v = prev[j - 1] + (ca != cb)
+            if prev[j] + 1 < v:
+                v = prev[j] + 1
+            if cur[j - 1] + 1 < v:
+                v = cur[j - 1] + 1
+            if (transpositions and i > 1 and j > 1 and ca == b[j - 2]
+                    and a[i - 2] == cb and prev_prev[j - 2] + 1 < v):
+                v = prev_prev[j - 2] + 1
+            if v > over:
+                v = over
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > max_dist:
+            return over
+        prev_prev, prev = prev, cur
+
+    return prev[lb] if prev[lb] <= max_dist else over
+
+def similarity(a, b, transpositions=True):
+    """Normalized edit similarity in [0, 1]"""
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return 1.0
+    return 1 - bounded_distance(a, b, longest, transpositions) / longest
+
+class TextMatcher:
+    """Match answers against keyword lists with a configurable algorithm
+
+    ``damerau`` and ``levenshtein`` fold umlauts/ß and compare normalized
+    edit similarity ``1 - distance / max(len)``. ``difflib`` reproduces the
+    original SequenceMatcher decisions exactly, with its cheap upper bounds
+    checked first.
+    """
+
+    def __init__(self, mode='damerau'):
+        self.set_mode(mode)
+
+    def init_app(self, app):
+        self.set_mode(app.config.get('TEXT_MATCH_MODE', 'damerau'))
+
+    def set_mode(self, mode):
+        if mode not in MODES:
+            raise ValueError(f"Unknown text match mode: {mode}")
+        self.mode = mode
+
+    def normalize(self, text):
+        """Normalization applied to both answers and keywords"""
+        if self.mode == 'difflib':
+            return str(text).strip().lower()
+        return fold_text(text)
+
+    def matches(self, answer, keyword, threshold):
+        """Whether two normalized strings are at least threshold similar"""
+        if self.mode == 'difflib':
+            sm = SequenceMatcher(None, answer, keyword)
+            return (sm.real_quick_ratio() >= threshold
+                    and sm.quick_ratio() >= threshold
+                    and sm.ratio() >= threshold)
+
+        longest = max(len(answer), len(keyword))
+        if longest == 0:
+            return threshold <= 1
+        # Largest distance that still reaches the threshold
+        max_dist = int((1 - threshold) * longest + 1e-9)
+        if abs(len(answer) - len(keyword)) > max_dist:
+            return False
+        distance = bounded_distance(answer, keyword, max_dist, self.mode == 'damerau')
+        return distance <= max_dist
+
+    def match(self, answer, keywords):
+        """First (normalized, original, threshold) keyword matching a normalized answer"""
+        for keyword, original, threshold in keywords:
+            if self.matches(answer, keyword, threshold):
+                return original
+        return None
+
+text_matcher = TextMatcher()
@@ -0,0 +1,212 @@
+# utils/user_stats.py - Write-behind buffer for User statistics
+
+from sqlalchemy import bindparam, case, update
+from extensions import db
+from models import User
+from utils.leaderboard import leaderboard
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class StatsDelta:
+    """Pending stat changes of one user since the last flush"""
+    __slots__ = (
+        'questions_answered', 'correct_answers', 'fisi_punkte',
+        'run', 'head_run', 'best_run', 'reset'
+    )
+
+    def __init__(self):
+        self.questions_answered = 0
+        self.correct_answers = 0
+        self.fisi_punkte = 0
+        # Streak bookkeeping: correct answers since the last reset (run),
+        # before the first reset (head_run) and the best run after a reset
+        self.run = 0
+        self.head_run = 0
+        self.best_run = 0
+        self.reset = False
+
+    def add_answer(self, is_correct, points_earned):
+        self.questions_answered += 1
+        if is_correct:
+            self.correct_answers += 1
+            self.fisi_punkte += points_earned
+            self.run += 1
+            if self.reset:
+                self.best_run = max(self.best_run, self.run)
+            else:
+                self.head_run = self.run
+        else:
+            self.reset = True
+            self.run = 0
+
+    def current_streak(self, current_streak):
+        """Streak after applying this delta to a persisted value"""
+        return self.run if self.reset else current_streak + self.run
+
+    def best_streak(self, current_streak, best_streak):
+        """Best streak after applying this delta to persisted values"""
+        return max(best_streak, current_streak + self.head_run, self.best_run)
+
+    def to_params(self, user_id):
+        return {
+            'b_id': user_id,
+            'b_answered': self.questions_answered,
+            'b_correct': self.correct_answers,
+            'b_punkte': self.fisi_punkte,
+            'b_run': self.run,
+            'b_head_run': self.head_run,
+            'b_best_run': self.best_run,
+            'b_reset': self.reset
+        }
+
+def _flush_statement():
+    """Batched UPDATE applying one StatsDelta per parameter set"""
+    t = User.__table__
+    head_streak = t.c.current_streak + bindparam('b_head_run')
+    streak_candidate = case(
+        (head_streak > bindparam('b_best_run'), head_streak),
+        else_=bindparam('b_best_run')
+    )
+    return (
+        update(t)
+        .where(t.c.id == bindparam('b_id'))
+        .values(
+            questions_answered=t.c.questions_answered + bindparam('b_answered'),
+            correct_answers=t.c.correct_answers + bindparam('b_correct'),
+            fisi_punkte=t.c.fisi_punkte + bindparam('b_punkte'),
+            # SET expressions see the old row, so both streaks use the old current_streak
+            current_streak=case(
+                (bindparam('b_reset') == True, bindparam('b_run')),
+                else_=t.c.current_streak + bindparam('b_run')
+            ),
+            best_streak=case(
+                (streak_candidate > t.c.best_streak, streak_candidate),
+                else_=t.c.best_streak
+            )
+        )
+    )
+
+class UserStatsBuffer:
+    """Accumulate per-user deltas in memory and write them in batched UPDATEs"""
+
+    def __init__(self):
+        self.app = None
+        self._pending = {}
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        # Do not lose buffered stats on interpreter shutdown
+        atexit.register(self.flush_on_exit)
+
+    def record_answer(self, user_id, is_correct, points_earned):
+        """Buffer one answer, True if the caller should schedule a flush"""
+        with self._lock:
+            is_new = not self._flush_scheduled
+            self._flush_scheduled = True
+            delta = self._pending.get(user_id)
+            if delta is None:
+                delta = self._pending[user_id] = StatsDelta()
+            delta.add_answer(is_correct, points_earned)
+        leaderboard.add_points(user_id, points_earned if is_correct else 0)
+        return is_new
+
+    def flush(self):
+        """Write all pending deltas in one executemany UPDATE"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+        if not pending:
+            return 0
+
+        try:
+            db.session.execute(
+                _flush_statement(),
+                [delta.to_params(user_id) for user_id, delta in pending.items()]
+            )
+            # Leaderboard rollup of the new totals, same transaction
+            leaderboard.persist([user_id for user_id, delta in pending.items() if delta.fisi_punkte])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"User stats flush failed, keeping {len(pending)} deltas: {e}")
+            self._restore(pending)
+            return 0
+
+        logger.debug(f"Flushed stats of {len(pending)} users")
+        return len(pending)
+
+    def _restore(self, pending):
+        """Put deltas of a failed flush back in front of newer ones"""
+        with self._lock:
+            for user_id, newer in self._pending.items():
+                older = pending.get(user_id)
+                if older is None:
+                    pending[user_id] = newer
+                    continue
+                older.questions_answered += newer.questions_answered
+                older.correct_answers += newer.correct_answers
+                older.fisi_punkte += newer.fisi_punkte
+                if newer.reset:
+                    older.best_run = max(older.best_run, older.run + newer.head_run, newer.best_run)
+                    older.run = newer.run
+                    if not older.reset:
+                        older.head_run += newer.head_run
+                    older.reset = True
+                else:
+                    older.run += newer.run
+                    if older.reset:
+                        older.best_run = max(older.best_run, older.run)
+                    else:
+                        older.head_run = older.run
+            self._pending = pending
+
+    def flush_on_exit(self):
+        if not self._pending or self.app is None:
+            return
+        try:
+            with self.app.app_context():
+                count = self.flush()
+            logger.info(f"Flushed stats of {count} users on shutdown")
+        except Exception as e:
+            logger.error(f"User stats flush on shutdown failed: {e}")
+
+    def merged_stats(self, user):
+        """Stats of a user including deltas that are not flushed yet"""
+        stats = {
+            'fisi_punkte': user.fisi_punkte or 0,
+            'games_played': user.games_played or 0,
+            'questions_answered': user.questions_answered or 0,
+            'correct_answers': user.correct_answers or 0,
+            'current_streak': user.current_streak or 0,
+            'best_streak': user.best_streak or 0
+        }
+        delta = self._pending.get(user.id)
+        if delta is not None:
+            stats['fisi_punkte'] += delta.fisi_punkte
+            stats['questions_answered'] += delta.questions_answered
+            stats['correct_answers'] += delta.correct_answers
+            stats['best_streak'] = delta.best_streak(stats['current_streak'], stats['best_streak'])
+            stats['current_streak'] = delta.current_streak(stats['current_streak'])
+
+        if stats['questions_answered']:
+            stats['accuracy'] = round((stats['correct_answers'] / stats['questions_answered']) * 100, 2)
+        else:
+            stats['accuracy'] = 0
+        return stats
+
+    def pending_points(self):
+        """{user_id: FiSi-Punkte not flushed yet}"""
+        with self._lock:
+            return {user_id: delta.fisi_punkte for user_id, delta in self._pending.items() if delta.fisi_punkte}
+
+    def merged_points(self, user):
+        """FiSi-Punkte of a user including unflushed points"""
+        delta = self._pending.get(user.id)
+        return (user.fisi_punkte or 0) + (delta.fisi_punkte if delta else 0)
+
+user_stats = UserStatsBuffer()
@@ -6,6 +6,10 @@ from models import (
     TextAntwortSchluessel, Fragetyp, Schwierigkeit
 )
 from extensions import db
+from utils.admin_stats import admin_stats
+from utils.answer_keys import answer_keys
+from utils.question_payloads import question_payloads
+from utils.query_profiler import query_profiler
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,6 +23,7 @@ def is_admin():
     return 'user_id' in session
 
 @admin_bp.route('/')
+@query_profiler.budget(3)
 def index():
     """Admin dashboard"""
     if not is_admin():
@@ -28,19 +33,13 @@ def index():
     user = User.query.get(session['user_id'])
     lang = session.get('lang', user.sprache)
     
-    # Get statistics
-    stats = {
-        'total_users': User.query.count(),
-        'total_games': SpielSitzung.query.count(),
-        'active_games': SpielSitzung.query.filter_by(ist_aktiv=True).count(),
-        'total_questions': Frage.query.count(),
-        'total_lernfelder': Lernfeld.query.count()
-    }
+    # Cached counters, recounted every ADMIN_STATS_RECONCILE_SEK
+    stats, stats_updated_at = admin_stats.snapshot()
     
-    # Get recent games
+    # Get recent games, IDs follow creation order and use the primary key index
     recent_games = (
         SpielSitzung.query
-        .order_by(SpielSitzung.created_at.desc())
+        .order_by(SpielSitzung.id.desc())
         .limit(10)
         .all()
     )
@@ -48,6 +47,7 @@ def index():
     return render_template(
         'admin/dashboard.html',
         stats=stats,
+        stats_updated_at=stats_updated_at,
         recent_games=recent_games,
         user=user,
         lang=lang
@@ -212,6 +212,8 @@ def edit_question(frage_id):
             frage.schwierigkeit = Schwierigkeit[request.form.get('schwierigkeit')]
             
             db.session.commit()
+            answer_keys.invalidate(frage_id)
+            question_payloads.invalidate(frage_id)
             logger.info(f"Question updated: {frage_id}")
             flash('Frage aktualisiert' if lang == 'de' else 'Question updated', 'success')
             return redirect(url_for('admin.questions'))
@@ -242,6 +244,8 @@ def delete_question(frage_id):
         frage = Frage.query.get_or_404(frage_id)
         db.session.delete(frage)
         db.session.commit()
+        answer_keys.invalidate(frage_id)
+        question_payloads.invalidate(frage_id)
         logger.info(f"Question deleted: {frage_id}")
         flash('Frage gelöscht', 'success')
         return redirect(url_for('admin.questions'))
@@ -2,10 +2,12 @@
 
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
 from models import (
-    SpielSitzung, SpielTeilnahme, User, Lernfeld, Frage, 
+    SpielSitzung, SpielTeilnahme, SpielAntwort, User, Lernfeld, Frage, 
     Spielmodus, Schwierigkeit
 )
 from extensions import db
+from utils.game_room import rank_standings
+from utils.query_profiler import query_profiler
 import logging
 import random
 import string
@@ -63,6 +65,7 @@ def join():
     return render_template('game/join.html', lang=lang)
 
 @game_bp.route('/lobby/<room_code>')
+@query_profiler.budget(6)
 def lobby(room_code):
     """Game lobby - waiting for game to start"""
     if 'user_id' not in session:
@@ -133,6 +136,7 @@ def play(room_code):
     )
 
 @game_bp.route('/create', methods=['GET', 'POST'])
+@query_profiler.budget(8)
 def create():
     """Create a new game session"""
     if 'user_id' not in session:
@@ -263,6 +267,7 @@ def solo():
     )
 
 @game_bp.route('/results/<room_code>')
+@query_profiler.budget(8)
 def results(room_code):
     """Display game results"""
     if 'user_id' not in session:
@@ -276,14 +281,29 @@ def results(room_code):
     user = User.query.get(session['user_id'])
     lang = session.get('lang', user.sprache)
     
-    # Get all participants with scores
-    teilnehmer_results = (
-        db.session.query(User, SpielTeilnahme)
-        .join(SpielTeilnahme, User.id == SpielTeilnahme.user_id)
-        .filter(SpielTeilnahme.sitzung_id == sitzung.id)
-        .order_by(SpielTeilnahme.aktueller_punktestand.desc())
-        .all()
-    )
+    # Finished games are served from their results snapshot
+    if sitzung.ergebnis:
+        teilnehmer_results = sitzung.ergebnis['standings']
+    else:
+        # Get all participants with scores
+        teilnehmer_results = rank_standings([
+            {
+                'user_id': t_user_id,
+                'username': username,
+                'score': score or 0,
+                'hat_ueberlebt': hat_ueberlebt
+            }
+            for t_user_id, username, score, hat_ueberlebt in (
+                db.session.query(
+                    User.id, User.username,
+                    SpielTeilnahme.aktueller_punktestand, SpielTeilnahme.hat_ueberlebt
+                )
+                .join(SpielTeilnahme, User.id == SpielTeilnahme.user_id)
+                .filter(SpielTeilnahme.sitzung_id == sitzung.id)
+                .order_by(SpielTeilnahme.aktueller_punktestand.desc(), SpielTeilnahme.id)
+                .all()
+            )
+        ])
     
     # Get current user's result
     user_teilnahme = SpielTeilnahme.query.filter_by(
@@ -291,11 +311,44 @@ def results(room_code):
         user_id=session['user_id']
     ).first()
     
+    # Replay the question deck in the order it was played
+    if sitzung.ergebnis:
+        gespielt = sitzung.ergebnis['fragen']
+    else:
+        gespielt = (sitzung.fragen_deck or [])[:sitzung.aktueller_frage_index]
+    deck_fragen = []
+    if gespielt:
+        fragen_by_id = {f.id: f for f in Frage.query.filter(Frage.id.in_(gespielt))}
+        deck_fragen = [fragen_by_id[frage_id] for frage_id in gespielt if frage_id in fragen_by_id]
+    
+    # Per-question answer statistics
+    frage_stats = {
+        frage_id: {'answered': answered, 'correct': int(correct or 0)}
+        for frage_id, answered, correct in (
+            db.session.query(
+                SpielAntwort.frage_id,
+                db.func.count(SpielAntwort.id),
+                db.func.sum(db.case((SpielAntwort.is_correct == True, 1), else_=0))
+            )
+            .filter(SpielAntwort.sitzung_id == sitzung.id)
+            .group_by(SpielAntwort.frage_id)
+            .all()
+        )
+    }
+    
+    # Current user's answers by question
+    user_antworten = {}
+    if user_teilnahme:
+        user_antworten = {a.frage_id: a for a in user_teilnahme.antworten}
+    
     return render_template(
         'game/results.html',
         sitzung=sitzung,
         teilnehmer_results=teilnehmer_results,
         user_teilnahme=user_teilnahme,
+        deck_fragen=deck_fragen,
+        frage_stats=frage_stats,
+        user_antworten=user_antworten,
         user=user,
         lang=lang
     )
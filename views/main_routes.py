@@ -1,8 +1,15 @@
 # views/main_routes.py - Main application routes
 
-from flask import Blueprint, render_template, session, redirect, url_for, request
+from flask import Blueprint, render_template, session, redirect, url_for, request, current_app, abort, Response
 from models import User, Lernfeld, SpielSitzung, Achievement
 from extensions import db
+from utils.user_stats import user_stats
+from utils.leaderboard import leaderboard as leaderboard_index, with_usernames
+from utils.period_leaderboard import period_leaderboard, ZEITRAEUME, ALLE_LERNFELDER
+from utils.metrics import metrics
+from utils.game_room import active_rooms
+from utils.query_profiler import query_profiler
+import hmac
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,6 +42,7 @@ def set_language(lang_code):
     return redirect(request.referrer or url_for('main.index'))
 
 @main_bp.route('/dashboard')
+@query_profiler.budget(4)
 def dashboard():
     """Main dashboard after login"""
     if 'user_id' not in session:
@@ -47,13 +55,14 @@ def dashboard():
     
     lang = session.get('lang', user.sprache)
     
-    # Get user stats
+    # Get user stats, including answers not yet written back
+    merged = user_stats.merged_stats(user)
     stats = {
-        'fisi_punkte': user.fisi_punkte,
-        'games_played': user.games_played,
-        'accuracy': user.accuracy,
-        'current_streak': user.current_streak,
-        'best_streak': user.best_streak
+        'fisi_punkte': merged['fisi_punkte'],
+        'games_played': merged['games_played'],
+        'accuracy': merged['accuracy'],
+        'current_streak': merged['current_streak'],
+        'best_streak': merged['best_streak']
     }
     
     # Get available Lernfelder
@@ -66,7 +75,7 @@ def dashboard():
         .join(AchievementStatus, Achievement.id == AchievementStatus.achievement_id)
         .filter(AchievementStatus.user_id == user.id)
         .filter(AchievementStatus.is_unlocked == True)
-        .order_by(AchievementStatus.unlocked_at.desc())
+        .order_by(AchievementStatus.erreicht_am.desc())
         .limit(5)
         .all()
     )
@@ -81,32 +90,42 @@ def dashboard():
     )
 
 @main_bp.route('/leaderboard')
+@query_profiler.budget(3)
 def leaderboard():
-    """Display top players leaderboard"""
+    """Display top players leaderboard, all-time or of the current day/week/month, optionally per Lernfeld"""
     lang = session.get('lang', 'de')
+    zeitraum = request.args.get('zeitraum', 'gesamt')
+    if zeitraum not in ZEITRAEUME:
+        zeitraum = 'gesamt'
+    lernfeld_id = request.args.get('lernfeld', ALLE_LERNFELDER, type=int)
+    user_id = session.get('user_id')
     
-    # Get top 10 players by FiSi-Punkte
-    top_players = (
-        User.query
-        .filter(User.fisi_punkte > 0)
-        .order_by(User.fisi_punkte.desc())
-        .limit(10)
-        .all()
-    )
-    
-    # Get current user rank if logged in
     current_user_rank = None
-    if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-        if user and user.fisi_punkte > 0:
-            # Calculate rank
-            higher_ranked = User.query.filter(User.fisi_punkte > user.fisi_punkte).count()
-            current_user_rank = higher_ranked + 1
+    players_around = []
+    if zeitraum == 'gesamt' and lernfeld_id == ALLE_LERNFELDER:
+        # Top 10 and ranks from the in-memory index, buffered points included
+        top_players = with_usernames(leaderboard_index.top(10))
+        if user_id:
+            current_user_rank = leaderboard_index.rank(user_id)
+            if current_user_rank and current_user_rank > 10:
+                players_around = with_usernames(leaderboard_index.around(user_id, 5))
+    else:
+        # One bucket of the rollup table, points of finished games
+        top_players = period_leaderboard.top(zeitraum, lernfeld_id, 10)
+        if user_id:
+            current_user_rank, _ = period_leaderboard.rank(user_id, zeitraum, lernfeld_id)
+    player_points = {p['user_id']: p['fisi_punkte'] for p in top_players}
     
     return render_template(
         'leaderboard.html',
         top_players=top_players,
+        player_points=player_points,
         current_user_rank=current_user_rank,
+        players_around=players_around,
+        zeitraum=zeitraum,
+        zeitraeume=ZEITRAEUME,
+        lernfeld_id=lernfeld_id,
+        lernfelder=Lernfeld.query.all(),
         lang=lang
     )
 
@@ -155,3 +174,24 @@ def help():
     """Help/FAQ page"""
     lang = session.get('lang', 'de')
     return render_template('help.html', lang=lang)
+
+def metrics_authorized():
+    """True if the request may read /metrics: right bearer token, or no token configured (development)"""
+    token = current_app.config['METRICS_TOKEN']
+    if not token:
+        return True
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+
+@main_bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics of this worker"""
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    
+    if not metrics_authorized():
+        abort(401)
+    
+    return Response(
+        metrics.render(active_rooms=len(active_rooms())),
+        mimetype='text/plain; version=0.0.4'
+    )
@@ -3,6 +3,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
 from models import User, AvatarPart
 from extensions import db
+from utils.query_profiler import query_profiler
 import logging
 
 logger = logging.getLogger(__name__)
@@ -133,6 +134,7 @@ def settings():
     )
 
 @profile_bp.route('/stats')
+@query_profiler.budget(5)
 def stats():
     """Detailed user statistics"""
     if 'user_id' not in session:
@@ -144,18 +146,14 @@ def stats():
     # Calculate detailed stats
     from models import SpielTeilnahme, SpielSitzung, Spielmodus
     
-    # Games by mode
-    games_by_mode = {}
-    for mode in Spielmodus:
-        count = (
-            db.session.query(SpielTeilnahme)
-            .join(SpielSitzung)
-            .filter(
-                SpielTeilnahme.user_id == user.id,
-                SpielSitzung.modus == mode
-            )
-            .count()
-        )
+    # Games by mode, counted in one grouped query
+    games_by_mode = {mode.value: 0 for mode in Spielmodus}
+    for mode, count in (
+        db.session.query(SpielSitzung.modus, db.func.count(SpielTeilnahme.id))
+        .join(SpielTeilnahme, SpielTeilnahme.sitzung_id == SpielSitzung.id)
+        .filter(SpielTeilnahme.user_id == user.id)
+        .group_by(SpielSitzung.modus)
+    ):
         games_by_mode[mode.value] = count
     
     # Total points earned